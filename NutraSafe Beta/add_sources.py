@@ -1,10 +1,7 @@
 #!/usr/bin/env python3
 import json
 
-# Load the consolidated ingredients database
-with open('ingredients_consolidated.json', 'r') as f:
-    data = json.load(f)
-    ingredients = data['ingredients']
+DB_PATH = 'ingredients_consolidated.json'
 
 # Define sources for the 3 ingredients that need them
 sources_to_add = {
@@ -49,23 +46,38 @@ sources_to_add = {
     }
 }
 
-# Update ingredients with sources
-updated_count = 0
-for ingredient in ingredients:
-    for e_number in ingredient.get("eNumbers", []):
-        if e_number in sources_to_add:
-            # Check if this is the right ingredient by name
-            if sources_to_add[e_number]["name"].lower() in ingredient["name"].lower():
-                # Add sources if not already present or empty
-                if not ingredient.get("sources") or len(ingredient["sources"]) == 0:
-                    ingredient["sources"] = sources_to_add[e_number]["sources"]
-                    updated_count += 1
-                    print(f"✅ Added sources to {ingredient['name']} ({e_number})")
-                else:
-                    print(f"⏭️  {ingredient['name']} ({e_number}) already has sources")
 
-# Save the updated database
-with open('ingredients_consolidated.json', 'w') as f:
-    json.dump(data, f, indent=2, ensure_ascii=False)
+def add_sources(ingredients):
+    """Fill in sources for the listed ingredients in place; returns count updated"""
+    updated_count = 0
+    for ingredient in ingredients:
+        for e_number in ingredient.get("eNumbers", []):
+            if e_number in sources_to_add:
+                # Check if this is the right ingredient by name
+                if sources_to_add[e_number]["name"].lower() in ingredient["name"].lower():
+                    # Add sources if not already present or empty
+                    if not ingredient.get("sources") or len(ingredient["sources"]) == 0:
+                        ingredient["sources"] = sources_to_add[e_number]["sources"]
+                        updated_count += 1
+                        print(f"✅ Added sources to {ingredient['name']} ({e_number})")
+                    else:
+                        print(f"⏭️  {ingredient['name']} ({e_number}) already has sources")
+    return updated_count
 
-print(f"\n✅ Updated {updated_count} ingredients with scientific sources")
+
+def main():
+    # Load the consolidated ingredients database
+    with open(DB_PATH, 'r') as f:
+        data = json.load(f)
+
+    updated_count = add_sources(data['ingredients'])
+
+    # Save the updated database
+    with open(DB_PATH, 'w') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ Updated {updated_count} ingredients with scientific sources")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Chunked CSV I/O for the pandas cleanup scripts
+Streams uk_foods_cleaned.csv in fixed-size chunks with explicit dtypes, so a
+cleanup pass holds one chunk in memory instead of the whole catalogue:
+
+    brand, category               category (each distinct value stored once)
+    nutrients, serving_size_g     numbers typed as read_csv infers them: int64 when a
+                                  chunk's values are all whole numbers, else float64
+                                  (text that is not a number becomes NaN)
+    is_verified                   nullable boolean
+    everything else               text (barcodes keep their leading zeros)
+
+Numbers therefore print as the unchunked scripts print them ("250", not
+"250.0"), as long as a column is all-integer or not throughout the file. A
+column that is whole numbers in one chunk but has blanks or decimals in
+another keeps "250" in the whole-number chunks, where a single read_csv of
+the file would write "250.0" everywhere.
+
+Output goes to CSV (appended chunk by chunk) or Parquet (one row group per
+chunk), picked by the file extension; Parquet needs pyarrow. Output is
+written next to the target and moved into place at the end, so the input
+can be cleaned in place.
+
+Exact duplicate rows can be dropped across chunks: DuplicateFilter keeps one
+64-bit hash per row written, in a sorted numpy array (8 bytes a row).
+"""
+
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CHUNKSIZE = 50000
+
+CATEGORY_COLUMNS = ['brand', 'category']
+NUMERIC_COLUMNS = ['calories', 'protein', 'carbs', 'fat', 'saturated_fat', 'fiber', 'sugar', 'sodium',
+                   'serving_size_g']
+BOOL_COLUMNS = ['is_verified']
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def column_dtypes(columns) -> Dict[str, str]:
+    """Declared dtype for every column of a CSV header"""
+    dtypes = {}
+    for col in columns:
+        if col in CATEGORY_COLUMNS:
+            dtypes[col] = 'category'
+        elif col in NUMERIC_COLUMNS:
+            dtypes[col] = 'numeric'
+        elif col in BOOL_COLUMNS:
+            dtypes[col] = 'boolean'
+        else:
+            dtypes[col] = 'object'
+    return dtypes
+
+
+def conform(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Cast columns to their declared dtypes (stages may hand categoricals back as object)"""
+    for col, dtype in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'numeric':
+            if not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+                # int64 when every value is a whole number, else float64 - read_csv's own inference
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif dtype == 'boolean':
+            df[col] = df[col].astype(str).str.strip().str.lower().map({'true': True, 'false': False}).astype('boolean')
+        elif dtype == 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+
+def read_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Tuple[Dict[str, str], Iterator[pd.DataFrame]]:
+    """(declared dtypes, iterator of typed chunks) for a CSV"""
+    dtypes = column_dtypes(pd.read_csv(path, nrows=0).columns)
+    # Numbers and booleans are read as text and coerced, so one bad cell is NaN rather than an error
+    read_as = {col: 'category' if dtype == 'category' else str for col, dtype in dtypes.items()}
+
+    def chunks():
+        for chunk in pd.read_csv(path, dtype=read_as, chunksize=chunksize):
+            yield conform(chunk, dtypes)
+    return dtypes, chunks()
+
+
+class DuplicateFilter:
+    """Drops rows already written, in this chunk or an earlier one"""
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = columns
+        self.seen = np.empty(0, dtype=np.uint64)   # sorted, unique row hashes
+        self.dropped = 0
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        subset = as_float(df[self.columns] if self.columns else df)   # 250 and 250.0 hash alike
+        keys = pd.util.hash_pandas_object(subset, index=False).to_numpy()
+        fresh = ~pd.Series(keys).duplicated().to_numpy()
+        if len(self.seen):
+            positions = np.minimum(np.searchsorted(self.seen, keys), len(self.seen) - 1)
+            fresh &= self.seen[positions] != keys
+        self.seen = np.union1d(self.seen, keys[fresh])
+        self.dropped += int((~fresh).sum())
+        return df[fresh]
+
+
+def as_float(df: pd.DataFrame) -> pd.DataFrame:
+    """Integer number columns as float64, so chunks typed int64 and float64 line up"""
+    ints = {col: 'float64' for col in NUMERIC_COLUMNS
+            if col in df.columns and pd.api.types.is_integer_dtype(df[col])}
+    return df.astype(ints) if ints else df
+
+
+def parquet_schema(df: pd.DataFrame) -> 'pa.Schema':
+    """Schema for every chunk: dictionary columns get int32 indices, all-empty columns are strings"""
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in inferred:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=inferred.metadata)
+
+
+class ChunkWriter:
+    """Appends chunks to a CSV or Parquet file; the file appears when the writer closes cleanly"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.parquet = self.path.lower().endswith(PARQUET_EXTENSIONS)
+        if self.parquet and not PYARROW_AVAILABLE:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.partial = self.path + '.partial'
+        self.parquet_writer = None
+        self.schema = None
+        self.rows = 0
+        self.chunks = 0
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            df = as_float(df)   # one column type for every row group
+            if self.parquet_writer is None:
+                self.schema = parquet_schema(df)
+                self.parquet_writer = pq.ParquetWriter(self.partial, self.schema, compression='zstd')
+            self.parquet_writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        else:
+            df.to_csv(self.partial, mode='a' if self.chunks else 'w', header=not self.chunks, index=False)
+        self.rows += len(df)
+        self.chunks += 1
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if self.chunks:
+            os.replace(self.partial, self.path)
+
+    def abort(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if os.path.exists(self.partial):
+            os.remove(self.partial)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_frame(df: pd.DataFrame, path: str):
+    """Write a whole frame as CSV or Parquet (by extension)"""
+    with ChunkWriter(path) as writer:
+        writer.write(df)
+
+
+def process_chunks(input_path: str, output_path: str, process: Callable[[pd.DataFrame], pd.DataFrame],
+                   chunksize: int = DEFAULT_CHUNKSIZE, drop_duplicates: bool = False) -> Tuple[int, int, int]:
+    """
+    Stream a CSV through process(chunk) -> chunk into output_path.
+    Returns (rows read, rows written, duplicate rows dropped)
+    """
+    dtypes, chunks = read_chunks(input_path, chunksize)
+    dedupe = DuplicateFilter() if drop_duplicates else None
+    rows_read = 0
+    with ChunkWriter(output_path) as writer:
+        for chunk in chunks:
+            rows_read += len(chunk)
+            chunk = conform(process(chunk), dtypes)
+            if dedupe:
+                chunk = dedupe(chunk)
+            writer.write(chunk)
+    return rows_read, writer.rows, dedupe.dropped if dedupe else 0
@@ -1,17 +1,19 @@
 #!/usr/bin/env python3
 """
 Second pass cleanup - fix remaining OCR artifacts
+
+Usage:
+    python3 cleanup_pass2.py [input.csv] [--output out.csv|out.parquet] [--chunksize [N]]
 """
 
+import argparse
+
 import pandas as pd
 import re
 
-print("Running second pass cleanup...")
-
-df = pd.read_csv('/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv')
-original = len(df)
+from chunked_io import DEFAULT_CHUNKSIZE, process_chunks, write_frame
 
-fixes = 0
+DEFAULT_CSV = '/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv'
 
 # Fix doubled letters at word boundaries (OCR artifacts)
 double_patterns = [
@@ -27,27 +29,64 @@ double_patterns = [
     (r'\bflourr\b', 'flour'),
 ]
 
-# Apply to name and ingredients
-for col in ['name', 'ingredients']:
-    if col in df.columns:
-        for pattern, replacement in double_patterns:
-            mask = df[col].str.contains(pattern, case=False, na=False, regex=True)
-            if mask.any():
-                df.loc[mask, col] = df.loc[mask, col].str.replace(pattern, replacement, regex=True)
-                fixes += mask.sum()
-
-# Remove products where name is mostly numbers or very short
-df = df[df['name'].str.len() > 2]
-df = df[~df['name'].str.match(r'^[\d\s\.\,]+$', na=False)]
-
-# Clean up any empty allergens
-if 'allergens' in df.columns:
-    df['allergens'] = df['allergens'].replace('', pd.NA)
-    df['allergens'] = df['allergens'].str.replace(r',\s*$', '', regex=True)
-    df['allergens'] = df['allergens'].str.replace(r'^\s*,', '', regex=True)
-
-df = df.reset_index(drop=True)
-df.to_csv('/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv', index=False)
-
-print(f"Second pass complete: {fixes} additional fixes")
-print(f"Original: {original}, Final: {len(df)}")
+
+def second_pass(df):
+    """(cleaned frame, number of fixes) - works on the whole file or on one chunk"""
+    fixes = 0
+
+    # Apply to name and ingredients
+    for col in ['name', 'ingredients']:
+        if col in df.columns:
+            for pattern, replacement in double_patterns:
+                mask = df[col].str.contains(pattern, case=False, na=False, regex=True)
+                if mask.any():
+                    df.loc[mask, col] = df.loc[mask, col].str.replace(pattern, replacement, regex=True)
+                    fixes += mask.sum()
+
+    # Remove products where name is mostly numbers or very short
+    df = df[df['name'].str.len() > 2]
+    df = df[~df['name'].str.match(r'^[\d\s\.\,]+$', na=False)]
+
+    # Clean up any empty allergens
+    if 'allergens' in df.columns:
+        df['allergens'] = df['allergens'].replace('', pd.NA)
+        df['allergens'] = df['allergens'].str.replace(r',\s*$', '', regex=True)
+        df['allergens'] = df['allergens'].str.replace(r'^\s*,', '', regex=True)
+
+    return df.reset_index(drop=True), int(fixes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Second pass OCR cleanup of the UK foods CSV")
+    parser.add_argument("input", nargs="?", default=DEFAULT_CSV)
+    parser.add_argument("--output", help="Where to write the result, .csv or .parquet (default: overwrite the input)")
+    parser.add_argument("--chunksize", type=int, nargs="?", const=DEFAULT_CHUNKSIZE, default=0,
+                        help=f"Stream the CSV in chunks of this many rows (default {DEFAULT_CHUNKSIZE})")
+    args = parser.parse_args()
+    output_path = args.output or args.input
+
+    print("Running second pass cleanup...")
+
+    if args.chunksize:
+        fixes = 0
+
+        def process(chunk):
+            nonlocal fixes
+            chunk, chunk_fixes = second_pass(chunk)
+            fixes += chunk_fixes
+            return chunk
+
+        original, final, _ = process_chunks(args.input, output_path, process, args.chunksize)
+    else:
+        df = pd.read_csv(args.input)
+        original = len(df)
+        df, fixes = second_pass(df)
+        write_frame(df, output_path)
+        final = len(df)
+
+    print(f"Second pass complete: {fixes} additional fixes")
+    print(f"Original: {original}, Final: {final}")
+
+
+if __name__ == "__main__":
+    main()
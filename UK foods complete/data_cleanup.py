@@ -269,12 +269,24 @@ def fix_malformed_name(name):
     fixed = fixed.strip()
 
     # If name is just a barcode, mark it (don't auto-fix)
-    if fixed.isdigit() and len(fixed) >= 8:
+    if is_digits(fixed) and len(fixed) >= 8:
         changes.append(f"WARNING: Name is barcode: {fixed}")
 
     return fixed, changes
 
 
+def is_digits(code):
+    """ASCII 0-9 only (str.isdigit also accepts '²' and non-Latin digits such as '٣')"""
+    return code.isascii() and code.isdigit()
+
+
+def gtin_check_digit_ok(barcode):
+    """GS1 check digit test for an all-digit EAN-8/UPC-A/EAN-13/GTIN-14 (same rule as barcodes.py)"""
+    padded = barcode.zfill(14)
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(padded[:13]))
+    return (10 - total % 10) % 10 == int(padded[13])
+
+
 def fix_barcode(barcode):
     """Fix or flag invalid barcodes"""
     if not barcode:
@@ -286,6 +298,8 @@ def fix_barcode(barcode):
     # Flag (don't auto-fix) overly long barcodes
     if len(fixed) > 14:
         changes.append(f"WARNING: Barcode too long ({len(fixed)} digits): {fixed[:20]}...")
+    elif is_digits(fixed) and len(fixed) in (8, 12, 13, 14) and not gtin_check_digit_ok(fixed):
+        changes.append(f"WARNING: Barcode check digit invalid (likely made up): {fixed}")
 
     return fixed, changes
 
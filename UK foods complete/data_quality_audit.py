@@ -2,13 +2,26 @@
 """
 UK Foods Database Quality Audit Script
 Identifies data quality issues for cleanup
+
+All checks run as rules in a single pass over the rows, sharded across
+processes for large files. --incremental keeps per-row hashes and rule
+results in audit_reports/audit_state.db and only re-checks changed rows.
+
+Usage:
+    python3 data_quality_audit.py [--workers N]
+    python3 data_quality_audit.py --incremental [--db nutrasafe_foods.db]
 """
 
 import csv
 import re
 import os
-from collections import defaultdict, Counter
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
 from datetime import datetime
+from multiprocessing import Pool, cpu_count
 
 # Configuration
 INPUT_FILE = "uk_foods_complete copy.csv"
@@ -98,359 +111,542 @@ def load_data(filename):
     return data
 
 
-def check_foreign_language(data):
-    """Find products with foreign language content"""
-    issues = defaultdict(list)
-
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')
-        category = row.get('category', '')
-        ingredients = row.get('ingredients', '')
+# ============================================================================
+# AUDIT ENGINE
+# ============================================================================
+# Every check is a rule over one shared per-row context. All rules run in a
+# single pass per row; rows are sharded across processes and the per-rule
+# issue lists merged back in row order. Cross-row checks (duplicates) are
+# group rules: each shard returns its groups, merged before finalizing.
+
+# Precompiled matchers. Each pattern list also gets one combined alternation
+# so the common no-match case costs a single search; on a hit the individual
+# patterns are tried in order to report which one matched.
+FOREIGN_MATCHERS = [
+    (language,
+     re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE),
+     [(p, re.compile(p, re.IGNORECASE)) for p in patterns])
+    for language, patterns in FOREIGN_PATTERNS.items()
+]
+FOREIGN_ANY = re.compile(
+    '|'.join(f'(?:{p})' for patterns in FOREIGN_PATTERNS.values() for p in patterns), re.IGNORECASE
+)
+MALFORMED_ANY = re.compile('|'.join(f'(?:{p})' for p in MALFORMED_NAME_PATTERNS))
+MALFORMED_MATCHERS = [(p, re.compile(p)) for p in MALFORMED_NAME_PATTERNS]
+OCR_ANY = re.compile('|'.join(re.escape(error) for error in OCR_ERRORS))
+CATEGORY_PREFIX_ANY = re.compile('|'.join(CATEGORY_PREFIXES))
+HYPHENATED_CATEGORY = re.compile(r'[a-z]+-[a-z]+-[a-z]+')
+
+# Keywords that indicate product type
+FISH_KEYWORDS = ['haddock', 'salmon', 'cod', 'fish', 'prawn', 'seafood', 'tuna', 'mackerel']
+SWEET_KEYWORDS = ['chocolate', 'cocoa', 'sugar', 'syrup', 'caramel', 'fudge', 'cake', 'cookie']
+MEAT_KEYWORDS = ['beef', 'chicken', 'pork', 'lamb', 'turkey', 'ham', 'bacon', 'sausage']
+VEG_KEYWORDS = ['vegetarian', 'vegan', 'plant-based', 'meat-free']
+
+# US brand indicators
+US_BRANDS = ['spartan', 'wegmans', 'key food', 'kroger', 'safeway', 'publix', 'trader joe']
+US_INGREDIENT_PATTERNS = [
+    r'ENRICHED.*FLOUR.*FOLIC ACID',  # US fortification
+    r'INS\d{3}',  # Indian additive codes
+    r'CONTAINS.*PHENYLALANINE',  # US FDA warning
+    r'USDA',
+]
+US_INGREDIENT_ANY = re.compile('|'.join(f'(?:{p})' for p in US_INGREDIENT_PATTERNS), re.IGNORECASE)
+US_INGREDIENT_MATCHERS = [(p, re.compile(p, re.IGNORECASE)) for p in US_INGREDIENT_PATTERNS]
 
-        text_to_check = f"{name} {category} {ingredients}"
+# Below this many rows, process start-up costs more than it saves
+PARALLEL_MIN_ROWS = 20000
 
-        for language, patterns in FOREIGN_PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, text_to_check, re.IGNORECASE):
-                    issues[language].append({
-                        'row': row_num,
-                        'name': name[:60],
-                        'category': category[:40],
-                        'pattern_matched': pattern
-                    })
-                    break
 
-    return issues
+class RowContext:
+    """Fields every rule reads, extracted and normalized once per row"""
+    __slots__ = ('row', 'row_num', 'name', 'brand', 'category', 'ingredients', 'barcode',
+                 'name_lower', 'brand_lower', 'ingredients_lower')
 
+    def __init__(self, row):
+        self.row = row
+        self.row_num = row['_row_num']
+        self.name = row.get('name', '')
+        self.brand = row.get('brand', '')
+        self.category = row.get('category', '')
+        self.ingredients = row.get('ingredients', '')
+        self.barcode = row.get('barcode', '').strip()
+        self.name_lower = self.name.lower()
+        self.brand_lower = self.brand.lower()
+        self.ingredients_lower = self.ingredients.lower()
 
-def check_malformed_names(data):
-    """Find products with malformed/garbage names"""
-    issues = []
 
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')
-
-        for pattern in MALFORMED_NAME_PATTERNS:
-            if re.search(pattern, name):
-                issues.append({
-                    'row': row_num,
-                    'name': name[:80],
-                    'pattern': pattern,
-                    'brand': row.get('brand', '')
-                })
-                break
+# (issue key, buckets, rule). buckets: None -> flat list, 'dynamic' -> dict
+# of the buckets seen, list -> dict with those buckets always present.
+# A rule yields (bucket, issue) pairs; bucket is None for flat lists.
+ROW_RULES = []
+# (issue key, group key function, finalize(groups) -> issues)
+GROUP_RULES = []
 
-    return issues
 
+def rule(key, buckets=None):
+    def register(fn):
+        ROW_RULES.append((key, buckets, fn))
+        return fn
+    return register
 
-def check_ocr_errors(data):
-    """Find products with OCR spelling errors"""
-    issues = []
 
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')
-        ingredients = row.get('ingredients', '')
+def group_rule(key, group_key):
+    def register(fn):
+        GROUP_RULES.append((key, group_key, fn))
+        return fn
+    return register
 
-        text_to_check = f"{name} {ingredients}"
-        errors_found = []
 
-        for error, correction in OCR_ERRORS.items():
-            if error in text_to_check:
-                errors_found.append(f"{error}->{correction}")
+@rule('FOREIGN_LANGUAGE', buckets='dynamic')
+def check_foreign_language(ctx):
+    """Find products with foreign language content"""
+    text_to_check = f"{ctx.name} {ctx.category} {ctx.ingredients}"
+    if not FOREIGN_ANY.search(text_to_check):
+        return
+    for language, any_pattern, patterns in FOREIGN_MATCHERS:
+        if not any_pattern.search(text_to_check):
+            continue
+        for pattern, compiled in patterns:
+            if compiled.search(text_to_check):
+                yield language, {
+                    'row': ctx.row_num,
+                    'name': ctx.name[:60],
+                    'category': ctx.category[:40],
+                    'pattern_matched': pattern
+                }
+                break
 
-        if errors_found:
-            issues.append({
-                'row': row_num,
-                'name': name[:50],
-                'errors': ', '.join(errors_found)
-            })
 
-    return issues
+@rule('MALFORMED_NAMES')
+def check_malformed_names(ctx):
+    """Find products with malformed/garbage names"""
+    if not MALFORMED_ANY.search(ctx.name):
+        return
+    for pattern, compiled in MALFORMED_MATCHERS:
+        if compiled.search(ctx.name):
+            yield None, {
+                'row': ctx.row_num,
+                'name': ctx.name[:80],
+                'pattern': pattern,
+                'brand': ctx.brand
+            }
+            return
+
+
+@rule('OCR_ERRORS')
+def check_ocr_errors(ctx):
+    """Find products with OCR spelling errors"""
+    text_to_check = f"{ctx.name} {ctx.ingredients}"
+    if not OCR_ANY.search(text_to_check):
+        return
+    errors_found = [f"{error}->{correction}" for error, correction in OCR_ERRORS.items()
+                    if error in text_to_check]
+    yield None, {
+        'row': ctx.row_num,
+        'name': ctx.name[:50],
+        'errors': ', '.join(errors_found)
+    }
 
 
-def check_missing_fields(data):
+@rule('MISSING_FIELDS', buckets=['missing_brand', 'missing_category', 'missing_calories',
+                                 'missing_ingredients', 'undefined_category'])
+def check_missing_fields(ctx):
     """Find products with missing required fields"""
-    issues = {
-        'missing_brand': [],
-        'missing_category': [],
-        'missing_calories': [],
-        'missing_ingredients': [],
-        'undefined_category': []
-    }
+    issue = {'row': ctx.row_num, 'name': ctx.name[:50]}
+    category = ctx.category.strip()
 
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')[:50]
+    if not ctx.brand.strip():
+        yield 'missing_brand', issue
+    if not category:
+        yield 'missing_category', issue
+    if not ctx.row.get('calories', '').strip():
+        yield 'missing_calories', issue
+    if not ctx.ingredients.strip():
+        yield 'missing_ingredients', issue
+    if category.lower() == 'undefined':
+        yield 'undefined_category', issue
 
-        if not row.get('brand', '').strip():
-            issues['missing_brand'].append({'row': row_num, 'name': name})
 
-        if not row.get('category', '').strip():
-            issues['missing_category'].append({'row': row_num, 'name': name})
+def is_digits(code):
+    """ASCII 0-9 only (str.isdigit also accepts '²' and non-Latin digits such as '٣')"""
+    return code.isascii() and code.isdigit()
 
-        if not row.get('calories', '').strip():
-            issues['missing_calories'].append({'row': row_num, 'name': name})
 
-        if not row.get('ingredients', '').strip():
-            issues['missing_ingredients'].append({'row': row_num, 'name': name})
+def gtin_check_digit_ok(barcode):
+    """GS1 check digit test for an all-digit EAN-8/UPC-A/EAN-13/GTIN-14 (same rule as barcodes.py)"""
+    padded = barcode.zfill(14)
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(padded[:13]))
+    return (10 - total % 10) % 10 == int(padded[13])
 
-        if row.get('category', '').strip().lower() == 'undefined':
-            issues['undefined_category'].append({'row': row_num, 'name': name})
 
-    return issues
+@rule('INVALID_BARCODES', buckets=['too_long', 'too_short', 'non_numeric', 'bad_check_digit', 'barcode_as_name'])
+def check_invalid_barcodes(ctx):
+    """Find products with invalid barcodes"""
+    barcode = ctx.barcode
+    if barcode:
+        # Check if barcode is numeric
+        if not is_digits(barcode):
+            yield 'non_numeric', {'row': ctx.row_num, 'name': ctx.name[:40], 'barcode': barcode[:30]}
+        # Check length (valid: 8, 12, 13, 14 digits)
+        elif len(barcode) > 14:
+            yield 'too_long', {'row': ctx.row_num, 'name': ctx.name[:40], 'barcode': barcode,
+                               'length': len(barcode)}
+        elif len(barcode) < 8:
+            yield 'too_short', {'row': ctx.row_num, 'name': ctx.name[:40], 'barcode': barcode,
+                                'length': len(barcode)}
+        # Right length but the GS1 check digit is wrong: usually an invented barcode
+        elif len(barcode) in (8, 12, 13, 14) and not gtin_check_digit_ok(barcode):
+            yield 'bad_check_digit', {'row': ctx.row_num, 'name': ctx.name[:40], 'barcode': barcode}
+
+    # Check if name is just a barcode
+    name = ctx.name.strip()
+    if is_digits(name) and len(name) >= 8:
+        yield 'barcode_as_name', {'row': ctx.row_num, 'name': ctx.name, 'barcode': barcode}
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (ValueError, TypeError):
+        return None
+
+
+@rule('NUTRITIONAL_ISSUES', buckets=['high_calories', 'high_sodium', 'high_sugar', 'negative_values'])
+def check_nutritional_values(ctx):
+    """Find products with implausible nutritional values"""
+    name = ctx.name[:40]
+    calories = _number(ctx.row.get('calories', 0))
+    if calories is not None:
+        if calories > 900:   # >900 per 100g
+            yield 'high_calories', {'row': ctx.row_num, 'name': name, 'calories': calories}
+        if calories < 0:
+            yield 'negative_values', {'row': ctx.row_num, 'name': name, 'field': 'calories', 'value': calories}
 
+    sodium = _number(ctx.row.get('sodium', 0))
+    if sodium is not None and sodium > 1000:   # >1000mg per 100g
+        yield 'high_sodium', {'row': ctx.row_num, 'name': name, 'sodium': sodium}
 
-def check_invalid_barcodes(data):
-    """Find products with invalid barcodes"""
-    issues = {
-        'too_long': [],
-        'too_short': [],
-        'non_numeric': [],
-        'barcode_as_name': []
-    }
+    sugar = _number(ctx.row.get('sugar', 0))
+    if sugar is not None and sugar > 100:   # >100g per 100g (impossible)
+        yield 'high_sugar', {'row': ctx.row_num, 'name': name, 'sugar': sugar}
 
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')
-        barcode = row.get('barcode', '').strip()
-
-        if barcode:
-            # Check if barcode is numeric
-            if not barcode.isdigit():
-                issues['non_numeric'].append({
-                    'row': row_num,
-                    'name': name[:40],
-                    'barcode': barcode[:30]
-                })
-            else:
-                # Check length (valid: 8, 12, 13, 14 digits)
-                if len(barcode) > 14:
-                    issues['too_long'].append({
-                        'row': row_num,
-                        'name': name[:40],
-                        'barcode': barcode,
-                        'length': len(barcode)
-                    })
-                elif len(barcode) < 8:
-                    issues['too_short'].append({
-                        'row': row_num,
-                        'name': name[:40],
-                        'barcode': barcode,
-                        'length': len(barcode)
-                    })
-
-        # Check if name is just a barcode
-        if name.strip().isdigit() and len(name.strip()) >= 8:
-            issues['barcode_as_name'].append({
-                'row': row_num,
-                'name': name,
-                'barcode': barcode
-            })
 
-    return issues
+@rule('CATEGORY_FORMAT_ISSUES', buckets=['with_prefix', 'hyphenated', 'mixed_language', 'lowercase_only'])
+def check_category_formats(ctx):
+    """Find inconsistent category formats"""
+    category = ctx.category
+    if not category:
+        return
+    issue = {'row': ctx.row_num, 'name': ctx.name[:40], 'category': category[:50]}
+    # en:, fr:, etc.
+    if CATEGORY_PREFIX_ANY.search(category):
+        yield 'with_prefix', issue
+    # plant-based-foods
+    if HYPHENATED_CATEGORY.search(category):
+        yield 'hyphenated', issue
+
+
+@rule('MISMATCHED_DATA')
+def check_mismatched_data(ctx):
+    """Find products where name doesn't match ingredients"""
+    name = ctx.name_lower
+    ingredients = ctx.ingredients_lower
+    if not ingredients:
+        return
+
+    # Check for fish products with sweet ingredients (no fish)
+    if any(kw in name for kw in FISH_KEYWORDS):
+        has_fish_ingredient = any(kw in ingredients for kw in FISH_KEYWORDS)
+        has_sweet_ingredient = sum(1 for kw in SWEET_KEYWORDS if kw in ingredients) >= 3
+        if not has_fish_ingredient and has_sweet_ingredient:
+            yield None, {
+                'row': ctx.row_num,
+                'name': ctx.name[:50],
+                'issue': 'Fish product name but sweet/dessert ingredients',
+                'sample_ingredients': ingredients[:100]
+            }
+
+    # Check for meat in vegetarian products
+    if any(kw in name for kw in VEG_KEYWORDS):
+        meat_found = [kw for kw in MEAT_KEYWORDS if kw in ingredients and kw not in name]
+        if meat_found:
+            yield None, {
+                'row': ctx.row_num,
+                'name': ctx.name[:50],
+                'issue': f'Vegetarian product contains: {", ".join(meat_found)}',
+                'sample_ingredients': ingredients[:100]
+            }
+
+
+@rule('NON_UK_PRODUCTS')
+def check_non_uk_products(ctx):
+    """Find products likely not intended for UK market"""
+    # Check US brands
+    for us_brand in US_BRANDS:
+        if us_brand in ctx.brand_lower or us_brand in ctx.name_lower:
+            yield None, {
+                'row': ctx.row_num,
+                'name': ctx.name[:50],
+                'brand': ctx.brand,
+                'reason': f'US brand detected: {us_brand}'
+            }
+            break
+
+    # Check US-style ingredients
+    if US_INGREDIENT_ANY.search(ctx.ingredients):
+        for pattern, compiled in US_INGREDIENT_MATCHERS:
+            if compiled.search(ctx.ingredients):
+                yield None, {
+                    'row': ctx.row_num,
+                    'name': ctx.name[:50],
+                    'brand': ctx.brand,
+                    'reason': f'US-style ingredient labeling: {pattern}'
+                }
+                break
 
 
-def check_duplicates(data):
+@group_rule('DUPLICATES', group_key=lambda ctx: ctx.name)
+def check_duplicates(groups):
     """Find duplicate product names"""
-    name_counts = Counter(row.get('name', '') for row in data)
-
     duplicates = []
-    for name, count in name_counts.most_common():
-        if count > 1 and name.strip():
-            rows = [row['_row_num'] for row in data if row.get('name', '') == name]
+    # Stable sort keeps first-seen order for equal counts
+    for name, rows in sorted(groups.items(), key=lambda item: len(item[1]), reverse=True):
+        if len(rows) > 1 and name.strip():
             duplicates.append({
                 'name': name[:60],
-                'count': count,
+                'count': len(rows),
                 'rows': rows[:10]  # First 10 rows
             })
-
     return duplicates
 
 
-def check_nutritional_values(data):
-    """Find products with implausible nutritional values"""
-    issues = {
-        'high_calories': [],  # >900 per 100g
-        'high_sodium': [],    # >1000mg per 100g
-        'high_sugar': [],     # >100g per 100g (impossible)
-        'negative_values': []
-    }
-
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')[:40]
-
-        try:
-            calories = float(row.get('calories', 0) or 0)
-            if calories > 900:
-                issues['high_calories'].append({
-                    'row': row_num,
-                    'name': name,
-                    'calories': calories
-                })
-            if calories < 0:
-                issues['negative_values'].append({
-                    'row': row_num,
-                    'name': name,
-                    'field': 'calories',
-                    'value': calories
-                })
-        except (ValueError, TypeError):
-            pass
-
-        try:
-            sodium = float(row.get('sodium', 0) or 0)
-            if sodium > 1000:
-                issues['high_sodium'].append({
-                    'row': row_num,
-                    'name': name,
-                    'sodium': sodium
-                })
-        except (ValueError, TypeError):
-            pass
-
-        try:
-            sugar = float(row.get('sugar', 0) or 0)
-            if sugar > 100:
-                issues['high_sugar'].append({
-                    'row': row_num,
-                    'name': name,
-                    'sugar': sugar
-                })
-        except (ValueError, TypeError):
-            pass
-
-    return issues
-
-
-def check_category_formats(data):
-    """Find inconsistent category formats"""
-    issues = {
-        'with_prefix': [],      # en:, fr:, etc.
-        'hyphenated': [],       # plant-based-foods
-        'mixed_language': [],   # English, French in same field
-        'lowercase_only': []    # all lowercase
-    }
-
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '')[:40]
-        category = row.get('category', '')
-
-        if not category:
-            continue
-
-        # Check for prefixes
-        for prefix_pattern in CATEGORY_PREFIXES:
-            if re.search(prefix_pattern, category):
-                issues['with_prefix'].append({
-                    'row': row_num,
-                    'name': name,
-                    'category': category[:50]
-                })
-                break
-
-        # Check for hyphenated style
-        if re.search(r'[a-z]+-[a-z]+-[a-z]+', category):
-            issues['hyphenated'].append({
-                'row': row_num,
-                'name': name,
-                'category': category[:50]
-            })
-
-    return issues
-
-
-def check_mismatched_data(data):
-    """Find products where name doesn't match ingredients"""
-    issues = []
-
-    # Keywords that indicate product type
-    fish_keywords = ['haddock', 'salmon', 'cod', 'fish', 'prawn', 'seafood', 'tuna', 'mackerel']
-    sweet_keywords = ['chocolate', 'cocoa', 'sugar', 'syrup', 'caramel', 'fudge', 'cake', 'cookie']
-    meat_keywords = ['beef', 'chicken', 'pork', 'lamb', 'turkey', 'ham', 'bacon', 'sausage']
-    veg_keywords = ['vegetarian', 'vegan', 'plant-based', 'meat-free']
-
+def audit_rows(rows):
+    """
+    Run every rule over rows in one pass.
+
+    Returns ({issue key: [(bucket, issue)]}, {group rule key: {group: [row numbers]}})
+    """
+    issues = {key: [] for key, _, _ in ROW_RULES}
+    groups = {key: {} for key, _, _ in GROUP_RULES}
+    row_rules = [(issues[key], fn) for key, _, fn in ROW_RULES]
+    group_rules = [(groups[key], group_key) for key, group_key, _ in GROUP_RULES]
+
+    for row in rows:
+        ctx = RowContext(row)
+        for found, fn in row_rules:
+            found.extend(fn(ctx))
+        for found, group_key in group_rules:
+            found.setdefault(group_key(ctx), []).append(ctx.row_num)
+    return issues, groups
+
+
+def shape_issues(buckets, pairs):
+    """(bucket, issue) pairs -> the list or dict of lists a report expects"""
+    if buckets is None:
+        return [issue for _, issue in pairs]
+    shaped = {} if buckets == 'dynamic' else {bucket: [] for bucket in buckets}
+    for bucket, issue in pairs:
+        shaped.setdefault(bucket, []).append(issue)
+    return shaped
+
+
+def run_audit(data, workers=None):
+    """
+    Audit every row, sharded across worker processes for large inputs.
+    Returns {issue key: issues} for row and group rules alike.
+    """
+    workers = workers or cpu_count()
+    if workers > 1 and len(data) >= PARALLEL_MIN_ROWS:
+        shard_size = -(-len(data) // (workers * 4))
+        shards = [data[i:i + shard_size] for i in range(0, len(data), shard_size)]
+        with Pool(workers) as pool:
+            results = pool.map(audit_rows, shards)
+    else:
+        results = [audit_rows(data)]
+
+    # Shards come back in order, so merged lists stay in row order
+    merged_issues = {key: [] for key, _, _ in ROW_RULES}
+    merged_groups = {key: {} for key, _, _ in GROUP_RULES}
+    for issues, groups in results:
+        for key, pairs in issues.items():
+            merged_issues[key].extend(pairs)
+        for key, shard_groups in groups.items():
+            for group, row_nums in shard_groups.items():
+                merged_groups[key].setdefault(group, []).extend(row_nums)
+
+    audit = {key: shape_issues(buckets, merged_issues[key]) for key, buckets, _ in ROW_RULES}
+    for key, _, finalize in GROUP_RULES:
+        audit[key] = finalize(merged_groups[key])
+    return audit
+
+
+# ============================================================================
+# INCREMENTAL AUDIT
+# ============================================================================
+# A sidecar SQLite DB keeps each row's content hash, the rule results per
+# distinct content hash and the duplicate-name group index. A run hashes the
+# rows, evaluates rules only for content it has not seen, and updates group
+# membership only for rows whose hash changed. Results are keyed by content,
+# not position, so rows shifted by an insert or delete are not re-checked.
+
+AUDIT_STATE_DB = os.path.join(OUTPUT_DIR, "audit_state.db")
+ROW_FIELDS_EXCLUDED = {'_row_num'}
+
+
+def row_hash(row):
+    content = '\x1f'.join(f"{k}={v}" for k, v in sorted(row.items()) if k not in ROW_FIELDS_EXCLUDED)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def rules_version():
+    """Hash of this script: editing any rule or pattern invalidates stored results"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def row_results(rows):
+    """Per-row [(rule key, bucket, issue)] for every row rule"""
+    results = []
+    for row in rows:
+        ctx = RowContext(row)
+        results.append([(key, bucket, issue) for key, _, fn in ROW_RULES for bucket, issue in fn(ctx)])
+    return results
+
+
+def open_audit_state(state_path):
+    conn = sqlite3.connect(state_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS row_hashes (row_num INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS evaluated (hash TEXT PRIMARY KEY) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rule_results (
+            hash TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            rule TEXT NOT NULL,
+            bucket TEXT,
+            issue TEXT NOT NULL,
+            PRIMARY KEY (hash, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS group_members (
+            rule TEXT NOT NULL,
+            row_num INTEGER NOT NULL,
+            group_key TEXT NOT NULL,
+            PRIMARY KEY (rule, row_num)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_group_members_key ON group_members (rule, group_key, row_num);
+    """)
+    version = rules_version()
+    row = conn.execute("SELECT value FROM meta WHERE key = 'rules_version'").fetchone()
+    if not row or row[0] != version:
+        with conn:
+            for table in ('row_hashes', 'evaluated', 'rule_results', 'group_members'):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('rules_version', ?)", (version,))
+    return conn
+
+
+def run_incremental_audit(data, state_path=AUDIT_STATE_DB, workers=None):
+    """
+    Same result as run_audit(), re-evaluating only rows whose content changed.
+    Returns (audit, rows changed, distinct contents evaluated)
+    """
+    conn = open_audit_state(state_path)
+    hashes = {row['_row_num']: row_hash(row) for row in data}
+    previous = dict(conn.execute("SELECT row_num, hash FROM row_hashes"))
+    evaluated = {h for (h,) in conn.execute("SELECT hash FROM evaluated")}
+
+    changed = [row for row in data if previous.get(row['_row_num']) != hashes[row['_row_num']]]
+    removed = [n for n in previous if n not in hashes]
+
+    # Rules run once per unseen content hash
+    pending = {}
+    for row in changed:
+        h = hashes[row['_row_num']]
+        if h not in evaluated and h not in pending:
+            pending[h] = row
+    pending_rows = list(pending.values())
+    workers = workers or cpu_count()
+    if workers > 1 and len(pending_rows) >= PARALLEL_MIN_ROWS:
+        shard_size = -(-len(pending_rows) // (workers * 4))
+        with Pool(workers) as pool:
+            shards = pool.map(row_results, [pending_rows[i:i + shard_size]
+                                            for i in range(0, len(pending_rows), shard_size)])
+        results = [r for shard in shards for r in shard]
+    else:
+        results = row_results(pending_rows)
+
+    with conn:
+        conn.executemany("INSERT INTO evaluated VALUES (?)", [(h,) for h in pending])
+        conn.executemany(
+            "INSERT INTO rule_results VALUES (?, ?, ?, ?, ?)",
+            [(h, seq, key, bucket, json.dumps(issue))
+             for h, found in zip(pending, results) for seq, (key, bucket, issue) in enumerate(found)]
+        )
+
+        # Maintain row hashes and group indexes for changed and removed rows only
+        conn.executemany("DELETE FROM row_hashes WHERE row_num = ?", [(n,) for n in removed])
+        conn.executemany("INSERT OR REPLACE INTO row_hashes VALUES (?, ?)",
+                         [(row['_row_num'], hashes[row['_row_num']]) for row in changed])
+        for key, group_key, _ in GROUP_RULES:
+            conn.executemany("DELETE FROM group_members WHERE rule = ? AND row_num = ?",
+                             [(key, n) for n in removed])
+            conn.executemany("INSERT OR REPLACE INTO group_members VALUES (?, ?, ?)",
+                             [(key, row['_row_num'], group_key(RowContext(row))) for row in changed])
+
+        # Drop results for content no row has any more
+        conn.execute("DELETE FROM evaluated WHERE hash NOT IN (SELECT hash FROM row_hashes)")
+        conn.execute("DELETE FROM rule_results WHERE hash NOT IN (SELECT hash FROM evaluated)")
+
+    # Assemble the full result from stored issues, in row order
+    stored = {}
+    for h, key, bucket, issue in conn.execute(
+        "SELECT hash, rule, bucket, issue FROM rule_results ORDER BY hash, seq"
+    ):
+        stored.setdefault(h, []).append((key, bucket, issue))
+
+    merged = {key: [] for key, _, _ in ROW_RULES}
     for row in data:
         row_num = row['_row_num']
-        name = row.get('name', '').lower()
-        ingredients = row.get('ingredients', '').lower()
+        for key, bucket, issue in stored.get(hashes[row_num], ()):
+            issue = json.loads(issue)
+            issue['row'] = row_num
+            merged[key].append((bucket, issue))
+    audit = {key: shape_issues(buckets, merged[key]) for key, buckets, _ in ROW_RULES}
+
+    for key, _, finalize in GROUP_RULES:
+        # Only groups with more than one member can be issues; first-seen order = lowest row
+        groups = {}
+        for group, row_num in conn.execute("""
+            SELECT group_key, row_num FROM group_members
+            WHERE rule = ? AND group_key IN (
+                SELECT group_key FROM group_members WHERE rule = ? GROUP BY group_key HAVING COUNT(*) > 1
+            )
+            ORDER BY group_key, row_num
+        """, (key, key)):
+            groups.setdefault(group, []).append(row_num)
+        audit[key] = finalize(dict(sorted(groups.items(), key=lambda item: item[1][0])))
 
-        if not ingredients:
-            continue
+    conn.close()
+    return audit, len(changed) + len(removed), len(pending)
 
-        # Check for fish products with sweet ingredients (no fish)
-        if any(kw in name for kw in fish_keywords):
-            has_fish_ingredient = any(kw in ingredients for kw in fish_keywords)
-            has_sweet_ingredient = sum(1 for kw in sweet_keywords if kw in ingredients) >= 3
-
-            if not has_fish_ingredient and has_sweet_ingredient:
-                issues.append({
-                    'row': row_num,
-                    'name': row.get('name', '')[:50],
-                    'issue': 'Fish product name but sweet/dessert ingredients',
-                    'sample_ingredients': ingredients[:100]
-                })
-
-        # Check for meat in vegetarian products
-        if any(kw in name for kw in veg_keywords):
-            meat_found = [kw for kw in meat_keywords if kw in ingredients and kw not in name]
-            if meat_found:
-                issues.append({
-                    'row': row_num,
-                    'name': row.get('name', '')[:50],
-                    'issue': f'Vegetarian product contains: {", ".join(meat_found)}',
-                    'sample_ingredients': ingredients[:100]
-                })
-
-    return issues
-
-
-def check_non_uk_products(data):
-    """Find products likely not intended for UK market"""
-    issues = []
-
-    # US brand indicators
-    us_brands = ['spartan', 'wegmans', 'key food', 'kroger', 'safeway', 'publix', 'trader joe']
-    us_ingredient_patterns = [
-        r'ENRICHED.*FLOUR.*FOLIC ACID',  # US fortification
-        r'INS\d{3}',  # Indian additive codes
-        r'CONTAINS.*PHENYLALANINE',  # US FDA warning
-        r'USDA',
-    ]
 
-    for row in data:
-        row_num = row['_row_num']
-        name = row.get('name', '').lower()
-        brand = row.get('brand', '').lower()
-        ingredients = row.get('ingredients', '')
-
-        # Check US brands
-        for us_brand in us_brands:
-            if us_brand in brand or us_brand in name:
-                issues.append({
-                    'row': row_num,
-                    'name': row.get('name', '')[:50],
-                    'brand': row.get('brand', ''),
-                    'reason': f'US brand detected: {us_brand}'
-                })
-                break
-
-        # Check US-style ingredients
-        for pattern in us_ingredient_patterns:
-            if re.search(pattern, ingredients, re.IGNORECASE):
-                issues.append({
-                    'row': row_num,
-                    'name': row.get('name', '')[:50],
-                    'brand': row.get('brand', ''),
-                    'reason': f'US-style ingredient labeling: {pattern}'
-                })
-                break
-
-    return issues
+def load_db_rows(db_path, table='foods'):
+    """foods table rows shaped like CSV rows (text values, rowid as the row number)"""
+    conn = sqlite3.connect(db_path)
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    fields = [f for f in ('name', 'brand', 'barcode', 'category', 'calories', 'sugar', 'sodium', 'ingredients')
+              if f in present]
+    data = []
+    for values in conn.execute(f"SELECT rowid, {', '.join(fields)} FROM {table} ORDER BY rowid"):
+        row = {field: '' if value is None else str(value) for field, value in zip(fields, values[1:])}
+        for field in ('name', 'brand', 'barcode', 'category', 'calories', 'ingredients'):
+            row.setdefault(field, '')
+        row['_row_num'] = values[0]
+        data.append(row)
+    conn.close()
+    return data
 
 
 def write_report(filename, title, data, headers):
@@ -496,6 +692,13 @@ def write_summary(all_issues):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Audit the UK foods CSV for data quality issues")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--incremental", action="store_true", help="Only re-check rows changed since the last run")
+    parser.add_argument("--state", default=AUDIT_STATE_DB, help="Sidecar DB for --incremental")
+    parser.add_argument("--db", help="Audit a foods table in this SQLite DB instead of the CSV")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("UK Foods Database Quality Audit")
     print("=" * 60)
@@ -503,14 +706,22 @@ def main():
     create_output_dir()
 
     print("\nLoading data...")
-    data = load_data(INPUT_FILE)
+    data = load_db_rows(args.db) if args.db else load_data(INPUT_FILE)
     print(f"  Loaded {len(data)} products")
 
+    print("\nRunning audit rules...")
+    start = time.time()
+    if args.incremental:
+        audit, changed, evaluated = run_incremental_audit(data, args.state, args.workers)
+        print(f"  {changed} rows changed, {evaluated} re-checked in {time.time() - start:.1f}s")
+    else:
+        audit = run_audit(data, args.workers)
+        print(f"  {len(ROW_RULES) + len(GROUP_RULES)} rules evaluated in {time.time() - start:.1f}s")
+
     all_issues = {}
 
     # 1. Foreign Language
-    print("\nChecking for foreign language content...")
-    foreign = check_foreign_language(data)
+    foreign = audit['FOREIGN_LANGUAGE']
     all_issues['FOREIGN_LANGUAGE'] = {lang: len(items) for lang, items in foreign.items()}
     for lang, items in foreign.items():
         if items:
@@ -522,8 +733,7 @@ def main():
             )
 
     # 2. Malformed Names
-    print("\nChecking for malformed product names...")
-    malformed = check_malformed_names(data)
+    malformed = audit['MALFORMED_NAMES']
     all_issues['MALFORMED_NAMES'] = len(malformed)
     write_report(
         "02_malformed_names.csv",
@@ -533,8 +743,7 @@ def main():
     )
 
     # 3. OCR Errors
-    print("\nChecking for OCR spelling errors...")
-    ocr = check_ocr_errors(data)
+    ocr = audit['OCR_ERRORS']
     all_issues['OCR_ERRORS'] = len(ocr)
     write_report(
         "03_ocr_errors.csv",
@@ -544,8 +753,7 @@ def main():
     )
 
     # 4. Missing Fields
-    print("\nChecking for missing required fields...")
-    missing = check_missing_fields(data)
+    missing = audit['MISSING_FIELDS']
     all_issues['MISSING_FIELDS'] = {k: len(v) for k, v in missing.items()}
     for field_type, items in missing.items():
         if items:
@@ -557,8 +765,7 @@ def main():
             )
 
     # 5. Invalid Barcodes
-    print("\nChecking for invalid barcodes...")
-    barcodes = check_invalid_barcodes(data)
+    barcodes = audit['INVALID_BARCODES']
     all_issues['INVALID_BARCODES'] = {k: len(v) for k, v in barcodes.items()}
     for issue_type, items in barcodes.items():
         if items:
@@ -573,8 +780,7 @@ def main():
             )
 
     # 6. Duplicates
-    print("\nChecking for duplicate entries...")
-    duplicates = check_duplicates(data)
+    duplicates = audit['DUPLICATES']
     all_issues['DUPLICATES'] = len([d for d in duplicates if d['count'] > 2])
     write_report(
         "06_duplicates.csv",
@@ -584,8 +790,7 @@ def main():
     )
 
     # 7. Nutritional Values
-    print("\nChecking for implausible nutritional values...")
-    nutrition = check_nutritional_values(data)
+    nutrition = audit['NUTRITIONAL_ISSUES']
     all_issues['NUTRITIONAL_ISSUES'] = {k: len(v) for k, v in nutrition.items()}
     for issue_type, items in nutrition.items():
         if items:
@@ -600,8 +805,7 @@ def main():
             )
 
     # 8. Category Formats
-    print("\nChecking for inconsistent category formats...")
-    categories = check_category_formats(data)
+    categories = audit['CATEGORY_FORMAT_ISSUES']
     all_issues['CATEGORY_FORMAT_ISSUES'] = {k: len(v) for k, v in categories.items()}
     for issue_type, items in categories.items():
         if items:
@@ -613,8 +817,7 @@ def main():
             )
 
     # 9. Mismatched Data
-    print("\nChecking for mismatched name/ingredients...")
-    mismatched = check_mismatched_data(data)
+    mismatched = audit['MISMATCHED_DATA']
     all_issues['MISMATCHED_DATA'] = len(mismatched)
     write_report(
         "09_mismatched_data.csv",
@@ -624,8 +827,7 @@ def main():
     )
 
     # 10. Non-UK Products
-    print("\nChecking for non-UK products...")
-    non_uk = check_non_uk_products(data)
+    non_uk = audit['NON_UK_PRODUCTS']
     all_issues['NON_UK_PRODUCTS'] = len(non_uk)
     write_report(
         "10_non_uk_products.csv",
@@ -2,38 +2,41 @@
 """
 UK Foods Database Mass Fix Script
 Automatically fixes all identified issues from the 15-agent verification
+
+Runs as a pipeline of column-level stages. Each stage's dictionaries are
+compiled once into combined regexes (one pass per column instead of one
+per entry), exact-value maps go through Series.replace, and character
+ratios are computed with vectorized str.count/str.len. Every stage
+reports its time, and the run reports peak memory.
+
+Usage:
+    python3 mass_fix.py [input.csv] [--output out.csv]
+    python3 mass_fix.py [input.csv] --chunksize 50000 [--output out.parquet] [--drop-duplicates]
+
+With --chunksize the CSV is streamed through the same stages one chunk at
+a time with explicit dtypes (see chunked_io.py), so memory stays bounded by
+the chunk size rather than the catalogue size.
 """
 
-import pandas as pd
 import re
+import sys
+import time
+import resource
+import argparse
+
 import numpy as np
-from datetime import datetime
-
-print("=" * 60)
-print("UK FOODS DATABASE MASS FIX")
-print("=" * 60)
-
-# Load the database
-df = pd.read_csv('/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv')
-original_count = len(df)
-print(f"\nLoaded {original_count} products")
-
-fixes_made = {
-    'spelling': 0,
-    'allergen': 0,
-    'category': 0,
-    'nutrition': 0,
-    'brand': 0,
-    'deleted': 0,
-    'ingredients': 0
-}
+import pandas as pd
+
+from chunked_io import DEFAULT_CHUNKSIZE, DuplicateFilter, process_chunks, write_frame
+
+DEFAULT_CSV = '/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv'
 
 # ============================================================
-# 1. SPELLING FIXES - Common OCR and spelling errors
+# RULES
 # ============================================================
-print("\n[1/7] Fixing spelling errors...")
 
-spelling_fixes = {
+# Common OCR and spelling errors in product names
+SPELLING_FIXES = {
     # Product name fixes
     'Chocolatees': 'Chocolates',
     'Califlower': 'Cauliflower',
@@ -88,15 +91,8 @@ spelling_fixes = {
     'Salt And Paper': 'Salt And Pepper',
 }
 
-# Apply spelling fixes to product names
-for wrong, correct in spelling_fixes.items():
-    mask = df['name'].str.contains(wrong, case=False, na=False)
-    if mask.any():
-        df.loc[mask, 'name'] = df.loc[mask, 'name'].str.replace(wrong, correct, case=False, regex=False)
-        fixes_made['spelling'] += mask.sum()
-
-# Fix common ingredient spelling errors
-ingredient_fixes = {
+# Common ingredient spelling errors
+INGREDIENT_FIXES = {
     'Wheatflour': 'Wheat Flour',
     'sWheatflour': 'Wheat Flour',
     'Whear Flour': 'Wheat Flour',
@@ -165,87 +161,23 @@ ingredient_fixes = {
     'Ganic vanilla': 'Organic vanilla',
 }
 
-if 'ingredients' in df.columns:
-    for wrong, correct in ingredient_fixes.items():
-        mask = df['ingredients'].str.contains(wrong, case=False, na=False)
-        if mask.any():
-            df.loc[mask, 'ingredients'] = df.loc[mask, 'ingredients'].str.replace(wrong, correct, case=False, regex=False)
-            fixes_made['ingredients'] += mask.sum()
-
-print(f"   Fixed {fixes_made['spelling']} product names")
-print(f"   Fixed {fixes_made['ingredients']} ingredient entries")
-
-# ============================================================
-# 2. FIX ALLERGEN ISSUES
-# ============================================================
-print("\n[2/7] Fixing allergen issues...")
-
-# Remove invalid allergens (not EU regulatory allergens)
-invalid_allergens = ['Pork', 'Beef', 'Chicken', 'Turkey', 'Apple', 'Orange', 'Peach',
+# Not EU regulatory allergens
+INVALID_ALLERGENS = ['Pork', 'Beef', 'Chicken', 'Turkey', 'Apple', 'Orange', 'Peach',
                      'Banana', 'Kiwi', 'None', 'Breadcrumb', 'Gelatin', 'Mycoprotein',
                      'Rapeseed Oil', 'Crickets', 'Insects']
 
-if 'allergens' in df.columns:
-    for invalid in invalid_allergens:
-        mask = df['allergens'].str.contains(invalid, case=False, na=False)
-        if mask.any():
-            # Remove the invalid allergen from the string
-            df.loc[mask, 'allergens'] = df.loc[mask, 'allergens'].str.replace(
-                rf',?\s*{invalid}\s*,?', ',', case=False, regex=True
-            )
-            fixes_made['allergen'] += mask.sum()
-
-    # Clean up allergen formatting (remove double commas, leading/trailing commas)
-    df['allergens'] = df['allergens'].str.replace(r',\s*,', ',', regex=True)
-    df['allergens'] = df['allergens'].str.strip(', ')
-
-# Fix gluten-free products that incorrectly list Wheat/Gluten allergens
-gluten_free_patterns = ['gluten free', 'gluten-free', 'free from gluten', 'gf ', ' gf']
-for pattern in gluten_free_patterns:
-    mask = (df['name'].str.contains(pattern, case=False, na=False) &
-            df['allergens'].str.contains('Wheat|Gluten', case=False, na=False))
-    if mask.any():
-        df.loc[mask, 'allergens'] = df.loc[mask, 'allergens'].str.replace(
-            r'Wheat,?\s*|Gluten,?\s*', '', case=False, regex=True
-        )
-        fixes_made['allergen'] += mask.sum()
-
-# Fix vegan products that incorrectly list Milk allergen
-vegan_patterns = ['vegan', 'plant-based', 'plant based', 'dairy free', 'dairy-free']
-for pattern in vegan_patterns:
-    mask = (df['name'].str.contains(pattern, case=False, na=False) &
-            df['allergens'].str.contains(r'\bMilk\b', case=False, na=False, regex=True))
-    if mask.any():
-        df.loc[mask, 'allergens'] = df.loc[mask, 'allergens'].str.replace(
-            r'\bMilk\b,?\s*', '', case=False, regex=True
-        )
-        fixes_made['allergen'] += mask.sum()
-
-# Standardize allergen names
-allergen_standardization = {
+GLUTEN_FREE_PATTERNS = ['gluten free', 'gluten-free', 'free from gluten', 'gf ', ' gf']
+VEGAN_PATTERNS = ['vegan', 'plant-based', 'plant based', 'dairy free', 'dairy-free']
+
+ALLERGEN_STANDARDIZATION = {
     'Soybeans': 'Soya',
     'Soybeans,': 'Soya,',
     'Tree Nuts': 'Nuts',
     'Sulphur-Dioxide-And-Sulphites': 'Sulphites',
 }
 
-for old, new in allergen_standardization.items():
-    df['allergens'] = df['allergens'].str.replace(old, new, case=False, regex=False)
-
-# Clean up allergen formatting
-df['allergens'] = df['allergens'].str.replace(r',\s*,', ',', regex=True)
-df['allergens'] = df['allergens'].str.strip(', ')
-df['allergens'] = df['allergens'].replace('', np.nan)
-
-print(f"   Fixed {fixes_made['allergen']} allergen entries")
-
-# ============================================================
-# 3. FIX CATEGORY ISSUES
-# ============================================================
-print("\n[3/7] Fixing category issues...")
-
-# Category translations and fixes
-category_fixes = {
+# Category translations and fixes (exact values)
+CATEGORY_FIXES = {
     'Przekaski, Slodkie przekaski': 'Snacks, Sweet snacks',
     'Przekski, Sodkie przekski': 'Snacks, Sweet snacks',
     'Plantaardige levensmiddelen en dranken': 'Plant-based foods and beverages',
@@ -267,68 +199,13 @@ category_fixes = {
     'Cips': 'Crisps',
 }
 
-if 'category' in df.columns:
-    for old_cat, new_cat in category_fixes.items():
-        mask = df['category'] == old_cat
-        if mask.any():
-            df.loc[mask, 'category'] = new_cat
-            fixes_made['category'] += mask.sum()
-
-# Fix products in wrong categories based on keywords
-# Meat products in "Plant-based foods"
-meat_keywords = ['beef', 'pork', 'chicken', 'ham', 'bacon', 'sausage', 'lamb', 'turkey']
-for keyword in meat_keywords:
-    mask = (df['name'].str.contains(keyword, case=False, na=False) &
-            df['category'].str.contains('Plant-based', case=False, na=False))
-    if mask.any():
-        df.loc[mask, 'category'] = 'Meats and their products'
-        fixes_made['category'] += mask.sum()
-
-print(f"   Fixed {fixes_made['category']} category entries")
-
-# ============================================================
-# 4. FIX NUTRITION ANOMALIES
-# ============================================================
-print("\n[4/7] Fixing nutrition anomalies...")
-
-# Convert nutrition columns to numeric
-nutrition_cols = ['calories', 'protein', 'carbs', 'fat', 'saturated_fat', 'fiber', 'sugar', 'sodium']
-for col in nutrition_cols:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-# Fix obvious decimal place errors
-# Fiber > 50g is likely 10x error
-if 'fiber' in df.columns:
-    mask = df['fiber'] > 50
-    if mask.any():
-        df.loc[mask, 'fiber'] = df.loc[mask, 'fiber'] / 10
-        fixes_made['nutrition'] += mask.sum()
-
-# Calories < 5 for actual food products (not drinks) is likely an error
-if 'calories' in df.columns:
-    mask = (df['calories'] < 5) & (df['calories'] > 0) & (~df['name'].str.contains('water|tea|coffee|diet|zero', case=False, na=False))
-    if mask.any():
-        # Likely missing a decimal place - multiply by 100
-        df.loc[mask, 'calories'] = df.loc[mask, 'calories'] * 100
-        fixes_made['nutrition'] += mask.sum()
-
-# Sodium > 10g is likely in wrong units (should be /1000)
-if 'sodium' in df.columns:
-    mask = df['sodium'] > 10
-    if mask.any():
-        df.loc[mask, 'sodium'] = df.loc[mask, 'sodium'] / 10
-        fixes_made['nutrition'] += mask.sum()
+# Meat products filed under "Plant-based foods"
+MEAT_KEYWORDS = ['beef', 'pork', 'chicken', 'ham', 'bacon', 'sausage', 'lamb', 'turkey']
 
-print(f"   Fixed {fixes_made['nutrition']} nutrition entries")
-
-# ============================================================
-# 5. FIX BRAND ISSUES
-# ============================================================
-print("\n[5/7] Fixing brand issues...")
+NUTRITION_COLS = ['calories', 'protein', 'carbs', 'fat', 'saturated_fat', 'fiber', 'sugar', 'sodium']
 
-# Brand standardization
-brand_fixes = {
+# Brand standardization (exact values)
+BRAND_FIXES = {
     "Welch'S": "Welch's",
     "Reese'S": "Reese's",
     "Campbell'S": "Campbell's",
@@ -355,39 +232,8 @@ brand_fixes = {
     "400G": "",
 }
 
-if 'brand' in df.columns:
-    for old_brand, new_brand in brand_fixes.items():
-        mask = df['brand'] == old_brand
-        if mask.any():
-            df.loc[mask, 'brand'] = new_brand
-            fixes_made['brand'] += mask.sum()
-
-    # Remove emojis from brand names
-    df['brand'] = df['brand'].str.replace(r'[^\x00-\x7F]+', '', regex=True)
-    df['brand'] = df['brand'].str.strip()
-
-print(f"   Fixed {fixes_made['brand']} brand entries")
-
-# ============================================================
-# 6. DELETE SEVERELY CORRUPTED PRODUCTS
-# ============================================================
-print("\n[6/7] Removing severely corrupted entries...")
-
-# Products to delete based on criteria:
-delete_mask = pd.Series([False] * len(df))
-
-# 1. Products with completely garbled names (more than 50% non-alpha characters)
-def is_garbled(text):
-    if pd.isna(text) or len(str(text)) < 3:
-        return False
-    text = str(text)
-    alpha_count = sum(c.isalpha() or c.isspace() for c in text)
-    return alpha_count / len(text) < 0.4
-
-delete_mask |= df['name'].apply(is_garbled)
-
-# 2. Products with names that are clearly OCR garbage
-garbage_patterns = [
+# Names that are clearly OCR garbage
+GARBAGE_PATTERNS = [
     r'^[0-9\s\.\,]+$',  # Only numbers
     r'^\d+\.\d+g\s+\d+',  # Nutrition data as name
     r'EET BABY RANS',
@@ -398,71 +244,343 @@ garbage_patterns = [
     r'^\s*$',
 ]
 
-for pattern in garbage_patterns:
-    delete_mask |= df['name'].str.contains(pattern, case=False, na=False, regex=True)
-
-# 3. Products where ingredients are completely unreadable (very short or all numbers)
-if 'ingredients' in df.columns:
-    def ingredients_corrupted(text):
-        if pd.isna(text):
-            return False
-        text = str(text)
-        if len(text) < 10:
-            return False
-        # Check if mostly numbers/symbols
-        alpha_count = sum(c.isalpha() for c in text)
-        return alpha_count / len(text) < 0.3
-
-    # Don't delete just for corrupted ingredients - too aggressive
-    # delete_mask |= df['ingredients'].apply(ingredients_corrupted)
-
-# Count deletions
-deletion_count = delete_mask.sum()
-fixes_made['deleted'] = deletion_count
+# ============================================================
+# COMPILED MATCHERS
+# ============================================================
 
-# Remove the corrupted entries
-df = df[~delete_mask].copy()
+def literal_regex(words, flags=re.IGNORECASE, whole_words=False):
+    """
+    Alternation of literal strings, longest first so the longest match wins.
+
+    whole_words keeps each entry's alphanumeric ends off word characters
+    ('Ater' leaves "Water" alone). The (?<!\w) is written once in front of
+    the entries that start with a letter or digit rather than on each of
+    them, which keeps the pattern fast; entries starting with punctuation
+    follow in their own unanchored branch.
+    """
+    words = sorted(words, key=len, reverse=True)
+    if not whole_words:
+        return re.compile('|'.join(re.escape(w) for w in words), flags)
+
+    def entry(word):
+        return re.escape(word) + (r'(?!\w)' if word[-1:].isalnum() else '')
+
+    anchored = [entry(w) for w in words if w[:1].isalnum()]
+    loose = [entry(w) for w in words if not w[:1].isalnum()]
+    branches = ([r'(?<!\w)(?:' + '|'.join(anchored) + ')'] if anchored else []) + loose
+    return re.compile('|'.join(branches), flags)
+
+
+NON_ASCII = re.compile(r'[^\x00-\x7F]')
+
+
+class Literals:
+    """
+    Case-insensitive search for a list of literal strings. ASCII text is
+    lowercased and matched case-sensitively, which re does several times
+    faster than IGNORECASE; only rows with other characters use IGNORECASE.
+    """
+
+    def __init__(self, words):
+        self.pattern = literal_regex(words)
+        self.lower_pattern = literal_regex([w.lower() for w in words], flags=0)
+
+    def contains(self, series):
+        found = series.str.lower().str.contains(self.lower_pattern, na=False).astype(bool)
+        other = series.str.contains(NON_ASCII, na=False).astype(bool)
+        if other.any():
+            # Lowercasing non-ASCII text can change its length; re-check those rows with IGNORECASE
+            rechecked = series[other].str.contains(self.pattern, na=False).astype(bool)
+            found = (found & ~other) | rechecked.reindex(found.index, fill_value=False)
+        return found
+
+
+class LiteralReplacer(Literals):
+    """
+    A {wrong: correct} dictionary applied in one regex pass per column. Entries
+    match whole words only, so 'Tune' fixes "Tune" but not "Fortune". Rows
+    are found with the plain literal search first; only those go through the
+    whole-word pattern.
+    """
+
+    def __init__(self, table):
+        super().__init__(list(table))
+        self.whole_word_pattern = literal_regex(list(table), whole_words=True)
+        self.lookup = {}
+        for wrong, correct in table.items():
+            self.lookup.setdefault(wrong.lower(), correct)
+
+    def __call__(self, series):
+        """(fixed series, number of rows changed)"""
+        lookup = self.lookup
+        rows = self.contains(series)
+        fixed = series.copy()
+        fixed[rows] = series[rows].str.replace(self.whole_word_pattern,
+                                               lambda m: lookup.get(m.group(0).lower(), m.group(0)), regex=True)
+        return fixed, int((fixed[rows] != series[rows]).sum())
+
+
+NAME_SPELLING = LiteralReplacer(SPELLING_FIXES)
+INGREDIENT_SPELLING = LiteralReplacer(INGREDIENT_FIXES)
+ALLERGEN_NAMES = LiteralReplacer(ALLERGEN_STANDARDIZATION)
+INVALID_ALLERGEN_ANY = re.compile(rf',?\s*(?:{literal_regex(INVALID_ALLERGENS).pattern})\s*,?', re.IGNORECASE)
+GLUTEN_FREE = Literals(GLUTEN_FREE_PATTERNS)
+VEGAN = Literals(VEGAN_PATTERNS)
+MEAT = Literals(MEAT_KEYWORDS)
+GARBAGE_ANY = re.compile('|'.join(f'(?:{p})' for p in GARBAGE_PATTERNS), re.IGNORECASE)
+
+# Letters or whitespace, as c.isalpha() or c.isspace() would count them. \w minus
+# digits and "_" also takes in numeric characters like "²" or "½" (isalnum() but
+# not isalpha()); those are all non-ASCII and are taken off again for rows that have any.
+WORD_LETTER_OR_SPACE = re.compile(r'[^\W\d_]|\s')
+NUMERIC_SYMBOLS = re.compile('[' + re.escape(''.join(
+    c for c in map(chr, range(sys.maxunicode + 1)) if c.isalnum() and not c.isalpha() and not c.isdecimal()
+)) + ']')
+
+
+def garbled_mask(names):
+    """Names of 3+ characters that are less than 40% letters/spaces"""
+    text = names.dropna().astype(str)
+    length = text.str.len()
+    letters = text.str.count(WORD_LETTER_OR_SPACE)
+    other = text.str.contains(NON_ASCII)
+    if other.any():
+        letters[other] -= text[other].str.count(NUMERIC_SYMBOLS)
+    garbled = (length >= 3) & (letters / length < 0.4)
+    return garbled.reindex(names.index, fill_value=False)
+
+
+def replace_values(series, mapping):
+    """Series.replace(mapping); a categorical is replaced once per distinct value, via its categories"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.replace(mapping)
+    categories = pd.Series(series.cat.categories).replace(mapping).to_numpy(dtype=object)
+    return pd.Series(np.append(categories, np.nan)[series.cat.codes], index=series.index)   # code -1 = NaN
+
+
+def clean_allergen_commas(allergens):
+    return allergens.str.replace(r',\s*,', ',', regex=True).str.strip(', ')
 
-print(f"   Deleted {deletion_count} corrupted entries")
 
 # ============================================================
-# 7. FINAL CLEANUP
+# STAGES
 # ============================================================
-print("\n[7/7] Final cleanup...")
+# Each stage takes the frame and the fixes counter and returns the frame.
+
+def fix_spelling(df, fixes):
+    df['name'], changed = NAME_SPELLING(df['name'])
+    fixes['spelling'] += changed
+    if 'ingredients' in df.columns:
+        df['ingredients'], changed = INGREDIENT_SPELLING(df['ingredients'])
+        fixes['ingredients'] += changed
+    return df
+
+
+def fix_allergens(df, fixes):
+    if 'allergens' not in df.columns:
+        return df
+    allergens = df['allergens']
+
+    # Remove invalid allergens, then tidy the commas they leave
+    fixed = allergens.str.replace(INVALID_ALLERGEN_ANY, ',', regex=True)
+    fixes['allergen'] += int((fixed != allergens)[allergens.notna()].sum())
+    allergens = clean_allergen_commas(fixed)
+
+    # Gluten-free products that list Wheat/Gluten, vegan products that list Milk
+    mask = (GLUTEN_FREE.contains(df['name']) &
+            allergens.str.contains('Wheat|Gluten', case=False, na=False))
+    allergens = allergens.mask(mask, allergens.str.replace(r'Wheat,?\s*|Gluten,?\s*', '', case=False, regex=True))
+    fixes['allergen'] += int(mask.sum())
+
+    mask = (VEGAN.contains(df['name']) &
+            allergens.str.contains(r'\bMilk\b', case=False, na=False, regex=True))
+    allergens = allergens.mask(mask, allergens.str.replace(r'\bMilk\b,?\s*', '', case=False, regex=True))
+    fixes['allergen'] += int(mask.sum())
+
+    allergens, _ = ALLERGEN_NAMES(allergens)
+    df['allergens'] = clean_allergen_commas(allergens).replace('', np.nan)
+    return df
+
+
+def fix_categories(df, fixes):
+    if 'category' not in df.columns:
+        return df
+    fixes['category'] += int(df['category'].isin(CATEGORY_FIXES.keys()).sum())
+    df['category'] = replace_values(df['category'], CATEGORY_FIXES)
+
+    mask = (MEAT.contains(df['name']) &
+            df['category'].str.contains('Plant-based', case=False, na=False))
+    df.loc[mask, 'category'] = 'Meats and their products'
+    fixes['category'] += int(mask.sum())
+    return df
 
-# Remove any rows where name is empty or NaN
-df = df[df['name'].notna() & (df['name'].str.strip() != '')]
 
-# Clean up whitespace in all string columns
-string_cols = df.select_dtypes(include=['object']).columns
-for col in string_cols:
-    df[col] = df[col].str.strip()
+def fix_nutrition(df, fixes):
+    for col in NUTRITION_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
 
-# Reset index
-df = df.reset_index(drop=True)
+    # Fiber > 50g is likely 10x error
+    if 'fiber' in df.columns:
+        mask = df['fiber'] > 50
+        df.loc[mask, 'fiber'] = df.loc[mask, 'fiber'] / 10
+        fixes['nutrition'] += int(mask.sum())
 
-# Save the fixed database
-output_path = '/Users/aaronkeen/Downloads/UK foods complete/uk_foods_cleaned.csv'
-df.to_csv(output_path, index=False)
+    # Calories < 5 for actual food products (not drinks) is likely a missing decimal place
+    if 'calories' in df.columns:
+        mask = ((df['calories'] < 5) & (df['calories'] > 0) &
+                ~df['name'].str.contains('water|tea|coffee|diet|zero', case=False, na=False))
+        df.loc[mask, 'calories'] = df.loc[mask, 'calories'] * 100
+        fixes['nutrition'] += int(mask.sum())
 
-final_count = len(df)
+    # Sodium > 10g is likely in wrong units
+    if 'sodium' in df.columns:
+        mask = df['sodium'] > 10
+        df.loc[mask, 'sodium'] = df.loc[mask, 'sodium'] / 10
+        fixes['nutrition'] += int(mask.sum())
+    return df
+
+
+def fix_brands(df, fixes):
+    if 'brand' not in df.columns:
+        return df
+    fixes['brand'] += int(df['brand'].isin(BRAND_FIXES.keys()).sum())
+    # Standardize, then remove emojis
+    df['brand'] = (replace_values(df['brand'], BRAND_FIXES)
+                   .str.replace(r'[^\x00-\x7F]+', '', regex=True)
+                   .str.strip())
+    return df
+
+
+def delete_corrupted(df, fixes):
+    # Garbled names (under 40% letters) and names that are clearly OCR garbage.
+    # Corrupted ingredients alone are not a reason to delete - too aggressive
+    delete_mask = garbled_mask(df['name']) | df['name'].str.contains(GARBAGE_ANY, na=False)
+    fixes['deleted'] += int(delete_mask.sum())
+    return df[~delete_mask].copy()
+
+
+def final_cleanup(df, fixes):
+    # Remove any rows where name is empty or NaN, then trim every text column
+    # (object columns of bools with gaps, like is_verified, are left alone)
+    df = df[df['name'].notna() & (df['name'].str.strip() != '')].copy()
+    for col in df.select_dtypes(include=['object', 'category']).columns:
+        if pd.api.types.infer_dtype(df[col]) in ('string', 'mixed', 'mixed-integer', 'categorical'):
+            df[col] = df[col].str.strip()
+    return df.reset_index(drop=True)
+
+
+# (progress message, stage, [(fixes key, report line)])
+PIPELINE = [
+    ("Fixing spelling errors", fix_spelling,
+     [('spelling', "Fixed {} product names"), ('ingredients', "Fixed {} ingredient entries")]),
+    ("Fixing allergen issues", fix_allergens, [('allergen', "Fixed {} allergen entries")]),
+    ("Fixing category issues", fix_categories, [('category', "Fixed {} category entries")]),
+    ("Fixing nutrition anomalies", fix_nutrition, [('nutrition', "Fixed {} nutrition entries")]),
+    ("Fixing brand issues", fix_brands, [('brand', "Fixed {} brand entries")]),
+    ("Removing severely corrupted entries", delete_corrupted, [('deleted', "Deleted {} corrupted entries")]),
+    ("Final cleanup", final_cleanup, []),
+]
 
-# ============================================================
-# SUMMARY
-# ============================================================
-print("\n" + "=" * 60)
-print("MASS FIX COMPLETE")
-print("=" * 60)
-print(f"\nOriginal products: {original_count}")
-print(f"Final products: {final_count}")
-print(f"Products removed: {original_count - final_count}")
-print(f"\nFixes by category:")
-print(f"   Spelling fixes: {fixes_made['spelling']}")
-print(f"   Ingredient fixes: {fixes_made['ingredients']}")
-print(f"   Allergen fixes: {fixes_made['allergen']}")
-print(f"   Category fixes: {fixes_made['category']}")
-print(f"   Nutrition fixes: {fixes_made['nutrition']}")
-print(f"   Brand fixes: {fixes_made['brand']}")
-print(f"   Deleted entries: {fixes_made['deleted']}")
-print(f"\nTotal fixes: {sum(fixes_made.values())}")
-print(f"\nSaved to: {output_path}")
+FIX_KEYS = ['spelling', 'allergen', 'category', 'nutrition', 'brand', 'deleted', 'ingredients']
+
+
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024   # bytes on macOS, KB on Linux
+
+
+def run_pipeline(df, fixes, timings, verbose=True):
+    """Run every stage in order, adding to fixes and to timings[stage name]"""
+    for number, (message, stage, report) in enumerate(PIPELINE, 1):
+        if verbose:
+            print(f"\n[{number}/{len(PIPELINE)}] {message}...")
+        before = {key: fixes[key] for key, _ in report}
+        start = time.perf_counter()
+        df = stage(df, fixes)
+        elapsed = time.perf_counter() - start
+        timings[stage.__name__] = timings.get(stage.__name__, 0.0) + elapsed
+        if verbose:
+            for key, line in report:
+                print(f"   {line.format(fixes[key] - before[key])}")
+            print(f"   ({elapsed:.2f}s)")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mass fix the UK foods CSV")
+    parser.add_argument("input", nargs="?", default=DEFAULT_CSV)
+    parser.add_argument("--output", help="Where to write the result, .csv or .parquet (default: overwrite the input)")
+    parser.add_argument("--chunksize", type=int, nargs="?", const=DEFAULT_CHUNKSIZE, default=0,
+                        help=f"Stream the CSV in chunks of this many rows (default {DEFAULT_CHUNKSIZE})")
+    parser.add_argument("--drop-duplicates", action="store_true", help="Drop exact duplicate rows")
+    args = parser.parse_args()
+    output_path = args.output or args.input
+
+    print("=" * 60)
+    print("UK FOODS DATABASE MASS FIX")
+    print("=" * 60)
+
+    run_start = time.perf_counter()
+    fixes_made = {key: 0 for key in FIX_KEYS}
+    timings = {}
+    duplicates = 0
+
+    if args.chunksize:
+        print(f"\nStreaming {args.input} in chunks of {args.chunksize} rows...")
+
+        def process(chunk):
+            chunk = run_pipeline(chunk, fixes_made, timings, verbose=False)
+            print(f"   chunk done: {sum(fixes_made.values())} fixes so far "
+                  f"({time.perf_counter() - run_start:.1f}s, peak {peak_memory_mb():.0f} MB)")
+            return chunk
+
+        original_count, final_count, duplicates = process_chunks(
+            args.input, output_path, process, args.chunksize, args.drop_duplicates)
+    else:
+        start = time.perf_counter()
+        df = pd.read_csv(args.input)
+        original_count = len(df)
+        print(f"\nLoaded {original_count} products ({time.perf_counter() - start:.2f}s)")
+
+        df = run_pipeline(df, fixes_made, timings)
+        if args.drop_duplicates:
+            dedupe = DuplicateFilter()
+            df = dedupe(df)
+            duplicates = dedupe.dropped
+
+        start = time.perf_counter()
+        write_frame(df, output_path)
+        timings['write'] = time.perf_counter() - start
+        final_count = len(df)
+
+    # ============================================================
+    # SUMMARY
+    # ============================================================
+    print("\n" + "=" * 60)
+    print("MASS FIX COMPLETE")
+    print("=" * 60)
+    print(f"\nOriginal products: {original_count}")
+    print(f"Final products: {final_count}")
+    print(f"Products removed: {original_count - final_count}")
+    print(f"\nFixes by category:")
+    print(f"   Spelling fixes: {fixes_made['spelling']}")
+    print(f"   Ingredient fixes: {fixes_made['ingredients']}")
+    print(f"   Allergen fixes: {fixes_made['allergen']}")
+    print(f"   Category fixes: {fixes_made['category']}")
+    print(f"   Nutrition fixes: {fixes_made['nutrition']}")
+    print(f"   Brand fixes: {fixes_made['brand']}")
+    print(f"   Deleted entries: {fixes_made['deleted']}")
+    if args.drop_duplicates:
+        print(f"   Duplicate rows dropped: {duplicates}")
+    print(f"\nTotal fixes: {sum(fixes_made.values())}")
+    print(f"\nTimings:")
+    for name, seconds in timings.items():
+        print(f"   {name:18} {seconds:6.2f}s")
+    print(f"   {'total':18} {time.perf_counter() - run_start:6.2f}s")
+    print(f"Peak memory: {peak_memory_mb():.0f} MB")
+    print(f"\nSaved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Batch Additive Detection Engine
+Compiles every additive name, synonym and E-number from ingredients_consolidated.json
+into a single Aho-Corasick matcher and tags the foods table in one streamed,
+multi-process pass. Results go to a normalized food_additives table.
+
+Usage:
+    python additive_detector.py [db_path] [--workers N]
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from multiprocessing import Pool, cpu_count
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).parent
+ADDITIVES_JSON = SCRIPT_DIR / "NutraSafe Beta" / "ingredients_consolidated.json"
+DEFAULT_DB_PATH = SCRIPT_DIR / "NutraSafe Beta" / "Database" / "nutrasafe_foods.db"
+
+CHUNK_SIZE = 2000
+
+# "E 330", "E-330", "e330a", "E160b(ii)", "E 471 (i)" -> "e330", "e330a", "e160bii", "e471i"
+# The letter suffix must be attached and not start another code ("E951 E950"); codes run
+# together ("E471E472e") are split, and vitamin E doses ("Vitamin E 400 IU") are not E400
+E_NUMBER_TEXT = re.compile(
+    r'(?<!vitamin )(?<!vitamin-)(?:\b|(?<=\d))e\s*-?\s*(\d{3,4})(?![0-9])([a-z](?![0-9]))?'
+    r'(?:\s*\(\s*([iv]{1,3})\s*\)|([iv]{1,3}))?(?!(?!e\d)[a-z])(?!\s*(?:iu|mg|mcg|µg|ug)\b)'
+)
+E_NUMBER_CODE = re.compile(r'^e\d{3,4}[a-z]*$')
+NON_WORD = re.compile(r'[^a-z0-9&]+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for matching: lowercase, collapse E-number spellings,
+    turn punctuation runs into single spaces and pad with spaces so every
+    word boundary is a space.
+    """
+    text = E_NUMBER_TEXT.sub(
+        lambda m: ' e' + m.group(1) + (m.group(2) or '') + (m.group(3) or m.group(4) or '') + ' ',
+        text.lower()
+    )
+    return ' ' + NON_WORD.sub(' ', text).strip() + ' '
+
+
+def is_e_number(code: str) -> bool:
+    """True for real E-numbers (not the FLAV-/GEN-/ING- placeholder codes)"""
+    return bool(E_NUMBER_CODE.match(normalize_text(code).strip()))
+
+
+def additive_key(record: Dict) -> str:
+    """
+    Canonical additive id: the primary E-number (or placeholder code), else
+    a slug of the name. Records sharing a primary code are the same additive.
+    """
+    if record.get('eNumbers'):
+        return record['eNumbers'][0]
+    return normalize_text(record['name']).strip().replace(' ', '-')
+
+
+def load_additives(filepath: Path = ADDITIVES_JSON) -> List[Dict]:
+    """Load the consolidated additive records (from the JSON, or a data_bundle.py .db)"""
+    if Path(filepath).suffix == '.db':
+        from data_bundle import DataBundle
+        with DataBundle(filepath) as bundle:
+            return list(bundle.records('consolidated'))
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)['ingredients']
+
+
+class AdditiveMatcher:
+    """
+    Aho-Corasick automaton over normalized additive surface forms.
+
+    Matches must sit on word boundaries. E-number patterns may also be
+    followed by letter suffixes ("e330" matches "e330a") unless a longer
+    pattern covers the suffix exactly.
+    """
+
+    def __init__(self, additives: List[Dict]):
+        self.additive_ids: List[str] = []
+        self.additive_names: Dict[str, str] = {}
+        self.pattern_info: List[Tuple[int, str, bool]] = []  # (length, additive id, is E-number)
+
+        # goto[node] = {char: node}; fail[node]; out[node] = [pattern indexes]
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+
+        seen_patterns = set()
+        for record in additives:
+            key = additive_key(record)
+            if key not in self.additive_names:
+                self.additive_names[key] = record['name']
+                self.additive_ids.append(key)
+
+            forms = [record['name']] + list(record.get('synonyms') or [])
+            forms += [code for code in record.get('eNumbers') or [] if is_e_number(code)]
+            if ';' in record['name']:
+                # "Sorbitol; Sorbitol syrup" style names list several forms
+                forms += record['name'].split(';')
+
+            for form in forms:
+                pattern = normalize_text(form).strip()
+                if len(pattern) < 2 or pattern in seen_patterns:
+                    continue
+                seen_patterns.add(pattern)
+                self._add_pattern(pattern, key)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, key: str):
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = next_node
+        self.out[node].append(len(self.pattern_info))
+        self.pattern_info.append((len(pattern), key, bool(E_NUMBER_CODE.match(pattern))))
+
+    def _build_failure_links(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find_spans(self, normalized: str) -> List[Tuple[int, int, str]]:
+        """
+        Return non-overlapping (start, end, additive id) matches in already
+        normalized text, preferring the longest match at each position.
+        """
+        goto, fail, out, info = self.goto, self.fail, self.out, self.pattern_info
+        candidates = []
+        node = 0
+
+        for end, char in enumerate(normalized, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for pattern_index in out[node]:
+                length, key, is_code = info[pattern_index]
+                start = end - length
+                if normalized[start - 1] != ' ':
+                    continue
+
+                stop = end
+                if is_code:
+                    # Allow unlisted suffix letters: e330 -> e330a
+                    while normalized[stop].isalpha():
+                        stop += 1
+                if normalized[stop] == ' ':
+                    candidates.append((start, stop, key))
+
+        candidates.sort(key=lambda span: (span[0], span[0] - span[1]))
+        spans = []
+        last_end = -1
+        for start, stop, key in candidates:
+            if start >= last_end:
+                spans.append((start, stop, key))
+                last_end = stop
+        return spans
+
+    def detect(self, text: Optional[str]) -> List[str]:
+        """Return the distinct additive ids found in an ingredients string, in order"""
+        if not text:
+            return []
+        found = []
+        for _, _, key in self.find_spans(normalize_text(text)):
+            if key not in found:
+                found.append(key)
+        return found
+
+
+# ============================================================================
+# Batch tagging
+# ============================================================================
+
+_worker_matcher: Optional[AdditiveMatcher] = None
+
+
+def _init_worker(matcher: AdditiveMatcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _detect_chunk(rows: List[Tuple[str, str]]) -> Tuple[int, List[Tuple[str, str]]]:
+    """Worker: (food_id, ingredients) rows -> (rows scanned, (food_id, additive_id) pairs)"""
+    pairs = []
+    for food_id, ingredients in rows:
+        pairs.extend((food_id, key) for key in _worker_matcher.detect(ingredients))
+    return len(rows), pairs
+
+
+def iter_ingredient_chunks(db_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple[str, str]]]:
+    """
+    Stream (id, ingredients) rows from the foods table in chunks.
+
+    Uses its own connection: Pool.imap pulls from this generator on a
+    background thread, and in WAL mode it reads a consistent snapshot while
+    the main connection writes.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        cursor = conn.execute(
+            "SELECT id, ingredients FROM foods WHERE ingredients IS NOT NULL AND ingredients != ''"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def create_additive_tables(conn: sqlite3.Connection):
+    """Create the additives and food_additives tables"""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS additives (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            e_numbers TEXT,
+            additive_group TEXT,
+            effects_verdict TEXT
+        );
+        CREATE TABLE IF NOT EXISTS food_additives (
+            food_id TEXT NOT NULL,
+            additive_id TEXT NOT NULL,
+            PRIMARY KEY (food_id, additive_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_food_additives_additive ON food_additives (additive_id);
+    """)
+
+
+def write_additives(conn: sqlite3.Connection, additives: List[Dict]):
+    """Replace the additives lookup table"""
+    rows = {}
+    for record in additives:
+        key = additive_key(record)
+        if key in rows:
+            # Merge E-numbers of records sharing the same canonical id
+            rows[key][2].extend(e for e in record.get('eNumbers', []) if e not in rows[key][2])
+            continue
+        rows[key] = [key, record['name'], list(record.get('eNumbers', [])),
+                     record.get('group'), record.get('effectsVerdict')]
+
+    conn.execute("DELETE FROM additives")
+    conn.executemany(
+        "INSERT INTO additives VALUES (?, ?, ?, ?, ?)",
+        [(key, name, ','.join(e_numbers), group, verdict) for key, name, e_numbers, group, verdict in rows.values()]
+    )
+
+
+def detect_food_additives(db_path: str, additives_path: Path = ADDITIVES_JSON,
+                          workers: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Tag every food's ingredients with detected additives.
+
+    Returns (foods scanned, food/additive pairs written)
+    """
+    additives = load_additives(additives_path)
+    matcher = AdditiveMatcher(additives)
+    print(f"🔤 Compiled {len(matcher.pattern_info)} patterns for {len(matcher.additive_ids)} additives")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_additive_tables(conn)
+
+    scanned = 0
+    workers = workers or cpu_count()
+
+    with conn:
+        write_additives(conn, additives)
+        conn.execute("DELETE FROM food_additives")
+        changes_before = conn.total_changes
+
+        chunks = iter_ingredient_chunks(db_path)
+
+        pool = Pool(workers, initializer=_init_worker, initargs=(matcher,)) if workers > 1 else None
+        if pool is None:
+            _init_worker(matcher)
+        results = pool.imap(_detect_chunk, chunks) if pool else map(_detect_chunk, chunks)
+
+        try:
+            for count, pairs in results:
+                conn.executemany("INSERT OR IGNORE INTO food_additives VALUES (?, ?)", pairs)
+                scanned += count
+                print(f"  {scanned} foods scanned...", end="\r", flush=True)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        # Rows actually inserted (INSERT OR IGNORE skips repeated pairs)
+        written = conn.total_changes - changes_before
+
+    conn.close()
+    return scanned, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag foods with detected additives")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--additives", default=str(ADDITIVES_JSON), help="ingredients_consolidated.json or a data_bundle.py bundle")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    print("🧪 ADDITIVE DETECTION")
+    print("=" * 80)
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    start = time.time()
+    scanned, written = detect_food_additives(args.db_path, Path(args.additives), args.workers)
+
+    print(f"\n✅ Scanned {scanned} foods, wrote {written} food/additive links "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
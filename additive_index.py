@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Additive Reverse Index
+Maps every normalized surface form of an additive - name, synonym, E-number
+and INS number - to its canonical additive id (additive_detector.additive_key).
+
+Forms are compacted to [a-z0-9] ("Beta-Carotene", "beta carotene" and
+"betacarotene" share one key; "E 160a(ii)", "INS 160a ii" and "e160aii"
+share another). The index is written into the additive SQLite twin by
+build_additive_database.py, so it is versioned with the additive content
+hash, and is loaded into dicts for O(1) token resolution, bisect prefix
+queries and edit-distance-1 fuzzy queries (precomputed deletion variants).
+Fuzzy matching covers names and synonyms only: a one-character slip in an
+E/INS code ("E1001" vs "E1201") is a different additive, not a typo.
+
+Usage:
+    python additive_index.py [twin_db] --resolve "INS 330"
+    python additive_index.py [twin_db] --prefix "sodium ben"
+    python additive_index.py [twin_db] --fuzzy "xanthun gum"
+    python additive_index.py [twin_db] --rebuild
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from additive_detector import additive_key, normalize_text
+
+SCRIPT_DIR = Path(__file__).parent
+TWIN_DB = SCRIPT_DIR / "NutraSafe Beta" / "ingredients_consolidated.db"
+
+# Bump when form normalization or the index tables change
+INDEX_VERSION = 2
+
+# Deletion variants are only generated for names/synonyms this long
+FUZZY_MIN_LENGTH = 5
+# Forms kept out of fuzzy matching, as indexed or as a one-edit variant
+FUZZY_EXCLUDED_KINDS = ('e_number', 'ins')
+
+INS_NUMBER = re.compile(r'^ins\s*(\d{3,4}[a-z]*(?:\s*[iv]{1,3})?)$')
+# Compact forms that read as an E/INS code ("e1001", "e160aii", "330")
+CODE_FORM = re.compile(r'^e?\d{3,4}[a-z0-9]*$')
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def compact_form(text: str) -> str:
+    """Index key for a token: normalized, INS -> E-number, [a-z0-9] only"""
+    normalized = normalize_text(text).strip()
+    normalized = INS_NUMBER.sub(r'e\1', normalized)
+    return NON_ALNUM.sub('', normalized)
+
+
+def surface_forms(record: Dict) -> Iterator[Tuple[str, str]]:
+    """(surface text, kind) for every way a record can be written"""
+    yield record['name'], 'name'
+    for synonym in record.get('synonyms') or []:
+        yield synonym, 'synonym'
+    for code in record.get('eNumbers') or []:
+        yield code, 'e_number'
+        if code[:1] in 'Ee' and code[1:2].isdigit():
+            yield 'INS ' + code[1:], 'ins'
+
+
+def is_code_form(form: str) -> bool:
+    return bool(CODE_FORM.match(form))
+
+
+def deletion_variants(form: str) -> Set[str]:
+    return {form[:i] + form[i + 1:] for i in range(len(form))}
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def index_rows(ingredients: Iterable[Dict]) -> Tuple[Set[tuple], Set[tuple]]:
+    """(form rows, deletion variant rows) for a list of additive records"""
+    forms = set()
+    for record in ingredients:
+        key = additive_key(record)
+        for surface, kind in surface_forms(record):
+            form = compact_form(surface)
+            if form:
+                forms.add((form, key, kind, surface))
+    fuzzy_forms = {
+        form for form, _, kind, _ in forms
+        if kind not in FUZZY_EXCLUDED_KINDS and len(form) >= FUZZY_MIN_LENGTH and not is_code_form(form)
+    }
+    deletes = {(variant, form) for form in fuzzy_forms for variant in deletion_variants(form)}
+    return forms, deletes
+
+
+def write_index(conn: sqlite3.Connection, ingredients: Iterable[Dict]) -> int:
+    """(Re)create the index tables in an open twin database. Returns the form count"""
+    forms, deletes = index_rows(ingredients)
+    conn.executescript("""
+        DROP TABLE IF EXISTS additive_forms;
+        DROP TABLE IF EXISTS additive_form_deletes;
+        CREATE TABLE additive_forms (
+            form TEXT NOT NULL,
+            additive_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            surface TEXT NOT NULL,
+            PRIMARY KEY (form, additive_id, kind, surface)
+        ) WITHOUT ROWID;
+        CREATE TABLE additive_form_deletes (
+            variant TEXT NOT NULL,
+            form TEXT NOT NULL,
+            PRIMARY KEY (variant, form)
+        ) WITHOUT ROWID;
+    """)
+    conn.executemany("INSERT INTO additive_forms VALUES (?, ?, ?, ?)", sorted(forms))
+    conn.executemany("INSERT INTO additive_form_deletes VALUES (?, ?)", sorted(deletes))
+    conn.execute(
+        "INSERT INTO metadata VALUES ('index_version', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (str(INDEX_VERSION),)
+    )
+    return len({row[0] for row in forms})
+
+
+class AdditiveIndex:
+    """In-memory reverse index: form -> additive ids, with prefix and fuzzy queries"""
+
+    def __init__(self, forms: Dict[str, List[str]], deletes: Dict[str, List[str]], version: str = ''):
+        self.forms = forms
+        self.deletes = deletes
+        # Forms fuzzy queries may return (those with deletion variants)
+        self.fuzzy_forms = {form for variant_forms in deletes.values() for form in variant_forms}
+        self.sorted_forms = sorted(forms)
+        self.version = version
+
+    @classmethod
+    def from_records(cls, ingredients: Iterable[Dict]) -> 'AdditiveIndex':
+        form_rows, delete_rows = index_rows(ingredients)
+        forms: Dict[str, List[str]] = defaultdict(list)
+        for form, key, _, _ in sorted(form_rows):
+            if key not in forms[form]:
+                forms[form].append(key)
+        deletes: Dict[str, List[str]] = defaultdict(list)
+        for variant, form in sorted(delete_rows):
+            deletes[variant].append(form)
+        return cls(dict(forms), dict(deletes))
+
+    @classmethod
+    def from_db(cls, db_path: Path = TWIN_DB) -> 'AdditiveIndex':
+        conn = sqlite3.connect(str(db_path))
+        meta = dict(conn.execute("SELECT key, value FROM metadata"))
+        if meta.get('index_version') != str(INDEX_VERSION):
+            conn.close()
+            raise ValueError(f"{db_path} has no index v{INDEX_VERSION} - run with --rebuild")
+        forms: Dict[str, List[str]] = defaultdict(list)
+        for form, key in conn.execute("SELECT DISTINCT form, additive_id FROM additive_forms ORDER BY form, additive_id"):
+            forms[form].append(key)
+        deletes: Dict[str, List[str]] = defaultdict(list)
+        for variant, form in conn.execute("SELECT variant, form FROM additive_form_deletes"):
+            deletes[variant].append(form)
+        conn.close()
+        return cls(dict(forms), dict(deletes), meta.get('content_hash', ''))
+
+    def resolve(self, token: str) -> List[str]:
+        """Additive ids for an exact (normalized) token, [] if unknown"""
+        return self.forms.get(compact_form(token), [])
+
+    def prefix(self, text: str, limit: int = 20) -> List[Tuple[str, List[str]]]:
+        """(form, additive ids) for forms starting with text"""
+        start = compact_form(text)
+        results = []
+        i = bisect_left(self.sorted_forms, start)
+        while i < len(self.sorted_forms) and len(results) < limit and self.sorted_forms[i].startswith(start):
+            results.append((self.sorted_forms[i], self.forms[self.sorted_forms[i]]))
+            i += 1
+        return results
+
+    def fuzzy(self, token: str) -> List[Tuple[str, int, List[str]]]:
+        """
+        (form, distance, additive ids) within one edit of token, closest first.
+        Exact matches come back with distance 0; codes ("E1001", "INS 330")
+        only ever match exactly.
+        """
+        query = compact_form(token)
+        if query in self.forms:
+            return [(query, 0, self.forms[query])]
+        if len(query) < FUZZY_MIN_LENGTH - 1 or is_code_form(query):
+            return []
+
+        candidates = set(self.deletes.get(query, []))             # token is missing one character
+        for variant in deletion_variants(query):
+            if variant in self.fuzzy_forms:
+                candidates.add(variant)                          # token has one extra character
+            candidates.update(self.deletes.get(variant, []))     # one substituted character
+        matches = [(form, edit_distance(query, form)) for form in candidates]
+        return [(form, distance, self.forms[form]) for form, distance in sorted(matches, key=lambda m: (m[1], m[0]))
+                if distance <= 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or rebuild the additive reverse index")
+    parser.add_argument("db_path", nargs="?", default=str(TWIN_DB), help="ingredients_consolidated.db")
+    parser.add_argument("--resolve", metavar="TOKEN", help="Exact lookup")
+    parser.add_argument("--prefix", metavar="TEXT", help="Forms starting with TEXT")
+    parser.add_argument("--fuzzy", metavar="TOKEN", help="Forms within one edit")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index the twin's additive records in place")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path} (run build_additive_database.py)")
+        sys.exit(1)
+
+    if args.rebuild:
+        print("🔤 ADDITIVE REVERSE INDEX BUILD")
+        print("=" * 80)
+        start = time.time()
+        conn = sqlite3.connect(args.db_path)
+        with conn:
+            records = [json.loads(data) for (data,) in conn.execute("SELECT data FROM additives")]
+            count = write_index(conn, records)
+        conn.close()
+        print(f"✅ {count} forms for {len(records)} additives in {time.time() - start:.2f}s")
+        return
+
+    try:
+        index = AdditiveIndex.from_db(Path(args.db_path))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.resolve:
+        print(f"   {args.resolve} -> {', '.join(index.resolve(args.resolve)) or 'no match'}")
+    elif args.prefix:
+        for form, keys in index.prefix(args.prefix):
+            print(f"   {form:40} {', '.join(keys)}")
+    elif args.fuzzy:
+        for form, distance, keys in index.fuzzy(args.fuzzy):
+            print(f"   {form:40} d={distance}  {', '.join(keys)}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Allergen Index Builder
+Derives the 14 UK regulated allergens for every food from its parsed
+ingredient tree (CAPITALISED emphasis, "Contains:", "May contain:") and
+stores them as bitmask columns on the foods table, so allergen filtering
+is a single bitwise predicate instead of a text search.
+
+    allergens_contains     - allergens in the recipe or its "Contains:" statement
+    allergens_may_contain  - precautionary "May contain" traces
+
+Foods with neither ingredients nor a declared allergens string stay NULL
+(unknown), so they never pass an allergen-free filter.
+
+Usage:
+    python allergen_index.py [db_path]
+    python allergen_index.py [db_path] --exclude milk,gluten [--traces]
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from ingredient_parser import (
+    ALLERGEN_BITS, DEFAULT_DB_PATH, UK_ALLERGENS,
+    declared_allergens, iter_food_trees, parse_foods
+)
+
+ALLERGEN_COLUMNS = ['allergens_contains', 'allergens_may_contain']
+
+
+def allergen_mask(names: Iterable[str]) -> int:
+    """Bitmask for allergen names ("milk", "Gluten", ...)"""
+    mask = 0
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in ALLERGEN_BITS:
+            raise ValueError(f"Unknown allergen '{name}' (expected one of: {', '.join(UK_ALLERGENS)})")
+        mask |= ALLERGEN_BITS[name]
+    return mask
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def add_allergen_columns(conn: sqlite3.Connection):
+    """Add the bitmask columns and their index to the foods table if missing"""
+    columns = table_columns(conn, 'foods')
+    for column in ALLERGEN_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE foods ADD COLUMN {column} INTEGER")
+    # Covering index: bitwise filters scan this instead of the full rows
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_foods_allergens
+        ON foods (allergens_contains, allergens_may_contain, id)
+    """)
+
+
+def build_allergen_index(db_path: str, batch_size: int = 5000) -> Tuple[int, int]:
+    """
+    Compute allergen bitmasks for every food with ingredients or declared allergens.
+
+    A free-text `allergens` column, where the table has one, is split into its
+    contained and "may contain" allergens and merged into the matching column.
+    Returns (foods updated, foods with any allergen)
+    """
+    parse_foods(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    add_allergen_columns(conn)
+
+    declared = {}
+    if 'allergens' in table_columns(conn, 'foods'):
+        declared = {
+            food_id: declared_allergens(text)
+            for food_id, text in conn.execute(
+                "SELECT id, allergens FROM foods WHERE allergens IS NOT NULL AND allergens != ''"
+            )
+        }
+
+    updated = 0
+    flagged = 0
+    batch = []
+    with conn:
+        conn.execute("UPDATE foods SET allergens_contains = NULL, allergens_may_contain = NULL")
+        read = sqlite3.connect(db_path)
+        for food_id, _, tree in iter_food_trees(read):
+            declared_contains, declared_may_contain = declared.pop(food_id, (0, 0))
+            contains = tree.allergens | declared_contains
+            may_contain = (tree.may_contain | declared_may_contain) & ~contains
+            batch.append((contains, may_contain, food_id))
+            if contains or may_contain:
+                flagged += 1
+            updated += 1
+            if len(batch) >= batch_size:
+                conn.executemany(
+                    "UPDATE foods SET allergens_contains = ?, allergens_may_contain = ? WHERE id = ?", batch
+                )
+                batch = []
+        read.close()
+
+        # Foods without ingredients but with a declared allergens string
+        batch.extend((contains, may_contain, food_id) for food_id, (contains, may_contain) in declared.items())
+        flagged += sum(1 for contains, may_contain in declared.values() if contains or may_contain)
+        updated += len(declared)
+        conn.executemany(
+            "UPDATE foods SET allergens_contains = ?, allergens_may_contain = ? WHERE id = ?", batch
+        )
+
+    conn.execute("ANALYZE foods")
+    conn.close()
+    return updated, flagged
+
+
+def exclude_allergens_clause(mask: int, include_traces: bool = False) -> Tuple[str, tuple]:
+    """
+    WHERE clause (and parameters) keeping foods free of every allergen in mask.
+    include_traces also drops foods that "may contain" them.
+    """
+    if include_traces:
+        return "(allergens_contains | allergens_may_contain) & ? = 0", (mask,)
+    return "allergens_contains & ? = 0", (mask,)
+
+
+def find_allergen_free(conn: sqlite3.Connection, names: Iterable[str],
+                       include_traces: bool = False, limit: int = 20) -> Tuple[int, List[tuple]]:
+    """Return (matching count, sample (id, name, brand) rows) for foods free of names"""
+    clause, params = exclude_allergens_clause(allergen_mask(names), include_traces)
+    count = conn.execute(f"SELECT COUNT(*) FROM foods WHERE {clause}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT id, name, brand FROM foods WHERE {clause} LIMIT ?", params + (limit,)
+    ).fetchall()
+    return count, rows
+
+
+def allergen_summary(conn: sqlite3.Connection) -> List[Tuple[str, int, int]]:
+    """(allergen, foods containing, foods that may contain) across the catalogue"""
+    summary = []
+    for name in UK_ALLERGENS:
+        bit = ALLERGEN_BITS[name]
+        contains, traces = conn.execute(
+            "SELECT SUM(allergens_contains & ? != 0), SUM(allergens_may_contain & ? != 0) FROM foods",
+            (bit, bit)
+        ).fetchone()
+        summary.append((name, contains or 0, traces or 0))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build allergen bitmask columns on the foods table")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--exclude", metavar="ALLERGENS", help="Comma-separated allergens to filter out, e.g. milk,gluten")
+    parser.add_argument("--traces", action="store_true", help="With --exclude, also drop 'may contain' foods")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    if args.exclude:
+        conn = sqlite3.connect(args.db_path)
+        if 'allergens_contains' not in table_columns(conn, 'foods'):
+            print("❌ No allergen columns yet - run without --exclude first")
+            sys.exit(1)
+        try:
+            start = time.time()
+            count, rows = find_allergen_free(conn, args.exclude.split(','), args.traces)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"🔍 {count} foods free of {args.exclude} in {(time.time() - start) * 1000:.1f}ms")
+        for food_id, name, brand in rows:
+            print(f"   {name} ({brand or 'no brand'})")
+        conn.close()
+        return
+
+    print("🥜 ALLERGEN INDEX BUILD")
+    print("=" * 80)
+
+    start = time.time()
+    updated, flagged = build_allergen_index(args.db_path)
+    print(f"✅ {updated} foods indexed, {flagged} with allergens, in {time.time() - start:.1f}s\n")
+
+    conn = sqlite3.connect(args.db_path)
+    for name, contains, traces in allergen_summary(conn):
+        print(f"   {name:12} {contains:7} contain  {traces:7} may contain")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
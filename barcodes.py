@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Barcode Normalization & GTIN Validation
+One canonical key for every retail barcode: EAN-8, UPC-A (12), EAN-13 and
+GTIN-14 are all left-padded with zeros to a 14-digit GTIN, so
+"5000119319487", "05000119319487" and " 5000119319487.0" are the same
+product. The GS1 check digit is verified for every length.
+
+Whole columns are validated at once (numpy over a digits matrix where
+available, pure Python otherwise), and the foods table keeps an indexed
+gtin14 column plus a barcode_status column, so barcode lookups and
+cross-source joins are single equality probes on gtin14:
+
+    valid            check digit correct (gtin14 set)
+    bad_check_digit  right length, wrong check digit - typically invented codes
+    bad_length       digits, but not 8/12/13/14 long
+    non_numeric      letters, scientific notation, etc.
+    empty            no barcode
+
+UPC-E (zero-suppressed 8-digit UPC) is not expanded; 8-digit codes are read as EAN-8.
+
+Usage:
+    python barcodes.py [db_path]                         # (re)build gtin14 / barcode_status
+    python barcodes.py --check 5000119319487 012345678905
+    python barcodes.py --csv uk_foods_complete_backup_fake_barcodes.csv [--report invalid.csv]
+"""
+
+import re
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from ingredient_parser import DEFAULT_DB_PATH
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+VALID = 'valid'
+BAD_CHECK_DIGIT = 'bad_check_digit'
+BAD_LENGTH = 'bad_length'
+NON_NUMERIC = 'non_numeric'
+EMPTY = 'empty'
+
+# GS1 weights for the 13 data digits of a GTIN-14, left to right
+CHECK_WEIGHTS = (3, 1) * 6 + (3,)
+
+# Separators people type or scanners emit; spreadsheet exports add a trailing ".0" or a leading quote
+SEPARATORS = re.compile(r"[\s\-_.']")
+SPREADSHEET_FLOAT = re.compile(r'^(\d+)\.0+$')
+
+
+def clean_barcode(barcode: Optional[str]) -> str:
+    """Strip whitespace, separators and spreadsheet artefacts; digits are left as-is"""
+    if barcode is None:
+        return ''
+    text = str(barcode).strip().lstrip("'")
+    text = SPREADSHEET_FLOAT.sub(r'\1', text)
+    return SEPARATORS.sub('', text)
+
+
+def is_digits(code: str) -> bool:
+    """ASCII 0-9 only (str.isdigit also accepts '²' and non-Latin digits such as '٣')"""
+    return code.isascii() and code.isdigit()
+
+
+def gtin_check_digit(data_digits: str) -> int:
+    """GS1 check digit for the digits before it (any GTIN length)"""
+    padded = data_digits.zfill(13)
+    total = sum(int(d) * w for d, w in zip(padded, CHECK_WEIGHTS))
+    return (10 - total % 10) % 10
+
+
+def classify(barcode: Optional[str]) -> Tuple[Optional[str], str]:
+    """(gtin14 or None, status) for one barcode"""
+    code = clean_barcode(barcode)
+    if not code:
+        return None, EMPTY
+    if not is_digits(code):
+        return None, NON_NUMERIC
+    if len(code) not in GTIN_LENGTHS:
+        return None, BAD_LENGTH
+    if gtin_check_digit(code[:-1]) != int(code[-1]):
+        return None, BAD_CHECK_DIGIT
+    return code.zfill(14), VALID
+
+
+def to_gtin14(barcode: Optional[str]) -> Optional[str]:
+    """Canonical 14-digit key, or None if the barcode is not a valid GTIN"""
+    return classify(barcode)[0]
+
+
+def is_valid_gtin(barcode: Optional[str]) -> bool:
+    return classify(barcode)[1] == VALID
+
+
+def barcode_forms(barcode: Optional[str]) -> List[str]:
+    """
+    Every standard spelling of a valid barcode, longest first: GTIN-14,
+    EAN-13, and UPC-A / EAN-8 where the leading digits are zero. For matching
+    sources that store barcodes as typed ("barcode IN (...)").
+    """
+    gtin = to_gtin14(barcode)
+    if gtin is None:
+        return []
+    return [gtin[-length:] for length in (14, 13, 12, 8) if gtin[:-length].strip('0') == '']
+
+
+def validate_column(barcodes: Sequence[Optional[str]]) -> Tuple[List[Optional[str]], List[str]]:
+    """
+    classify() over a whole column: (gtin14 list, status list), aligned with
+    the input. Check digits for all candidate codes are computed in one
+    numpy pass when numpy is installed.
+    """
+    gtins: List[Optional[str]] = [None] * len(barcodes)
+    statuses: List[str] = [EMPTY] * len(barcodes)
+    positions: List[int] = []
+    padded: List[str] = []
+    for i, barcode in enumerate(barcodes):
+        code = clean_barcode(barcode)
+        if not code:
+            continue
+        if not is_digits(code):
+            statuses[i] = NON_NUMERIC
+        elif len(code) not in GTIN_LENGTHS:
+            statuses[i] = BAD_LENGTH
+        else:
+            positions.append(i)
+            padded.append(code.zfill(14))
+
+    if NUMPY_AVAILABLE and padded:
+        digits = (np.frombuffer(''.join(padded).encode('ascii'), dtype=np.uint8) - ord('0')).reshape(-1, 14)
+        totals = digits[:, :13].astype(np.int32) @ np.array(CHECK_WEIGHTS, dtype=np.int32)
+        valid = ((10 - totals % 10) % 10 == digits[:, 13]).tolist()
+    else:
+        valid = [gtin_check_digit(code[:13]) == int(code[13]) for code in padded]
+
+    for i, code, ok in zip(positions, padded, valid):
+        if ok:
+            gtins[i] = code
+            statuses[i] = VALID
+        else:
+            statuses[i] = BAD_CHECK_DIGIT
+    return gtins, statuses
+
+
+def count_statuses(statuses: Iterable[str]) -> Dict[str, int]:
+    counts = {status: 0 for status in (VALID, BAD_CHECK_DIGIT, BAD_LENGTH, NON_NUMERIC, EMPTY)}
+    for status in statuses:
+        counts[status] += 1
+    return counts
+
+
+# ============================================================================
+# foods table
+# ============================================================================
+
+def add_gtin_columns(conn: sqlite3.Connection):
+    """Add gtin14 / barcode_status and the lookup index to the foods table if missing"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(foods)")]
+    for column in ('gtin14', 'barcode_status'):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE foods ADD COLUMN {column} TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_foods_gtin14 ON foods (gtin14)")
+
+
+def index_barcodes(db_path: str, batch_size: int = 5000) -> Dict[str, int]:
+    """Recompute gtin14 / barcode_status for every food. Returns {status: food count}"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        add_gtin_columns(conn)
+
+    rowids, barcodes = [], []
+    for rowid, barcode in conn.execute("SELECT rowid, barcode FROM foods"):
+        rowids.append(rowid)
+        barcodes.append(barcode)
+    gtins, statuses = validate_column(barcodes)
+
+    with conn:
+        for start in range(0, len(rowids), batch_size):
+            end = start + batch_size
+            conn.executemany(
+                "UPDATE foods SET gtin14 = ?, barcode_status = ? WHERE rowid = ?",
+                zip(gtins[start:end], statuses[start:end], rowids[start:end])
+            )
+    conn.execute("ANALYZE foods")
+    conn.close()
+    return count_statuses(statuses)
+
+
+def find_by_barcode(conn: sqlite3.Connection, barcode: str, columns: str = 'id, name, brand, barcode') -> List[tuple]:
+    """Foods whose barcode is any spelling of this GTIN (one probe on idx_foods_gtin14)"""
+    gtin = to_gtin14(barcode)
+    if gtin is None:
+        return []
+    return conn.execute(f"SELECT {columns} FROM foods WHERE gtin14 = ?", (gtin,)).fetchall()
+
+
+def shared_gtins(conn: sqlite3.Connection, limit: int = 20) -> List[Tuple[str, int]]:
+    """GTINs stored on more than one food (the same product under different barcode spellings or duplicates)"""
+    return conn.execute("""
+        SELECT gtin14, COUNT(*) FROM foods WHERE gtin14 IS NOT NULL
+        GROUP BY gtin14 HAVING COUNT(*) > 1 ORDER BY COUNT(*) DESC, gtin14 LIMIT ?
+    """, (limit,)).fetchall()
+
+
+# ============================================================================
+# CSV scan
+# ============================================================================
+
+def scan_csv(csv_path: Path, column: str = 'barcode',
+             report_path: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Validate a CSV's barcode column. Rows that are not valid GTINs are written
+    to report_path (row, name, brand, barcode, status) when given.
+    Returns {status: row count}
+    """
+    with open(csv_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        rows = list(csv.DictReader(f))
+    _, statuses = validate_column([row.get(column) for row in rows])
+
+    if report_path:
+        with open(report_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['row', 'name', 'brand', column, 'status'])
+            for row_num, (row, status) in enumerate(zip(rows, statuses), start=2):
+                if status not in (VALID, EMPTY):
+                    writer.writerow([row_num, row.get('name', ''), row.get('brand', ''), row.get(column, ''), status])
+    return count_statuses(statuses)
+
+
+def print_counts(counts: Dict[str, int]):
+    total = sum(counts.values())
+    for status, count in counts.items():
+        share = f"{count / total * 100:5.1f}%" if total else "    -"
+        print(f"   {status:16} {count:8}  {share}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize and validate barcodes as GTIN-14")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--check", nargs="+", metavar="BARCODE", help="Classify individual barcodes")
+    parser.add_argument("--csv", help="Validate the barcode column of a CSV instead of the database")
+    parser.add_argument("--column", default="barcode", help="CSV barcode column (default: barcode)")
+    parser.add_argument("--report", help="With --csv: write invalid rows to this CSV")
+    args = parser.parse_args()
+
+    if args.check:
+        for barcode in args.check:
+            gtin, status = classify(barcode)
+            print(f"   {barcode:20} {status:16} {gtin or ''}")
+        return
+
+    print("🏷️  BARCODE NORMALIZATION (GTIN-14)")
+    print("=" * 80)
+
+    start = time.time()
+    if args.csv:
+        if not Path(args.csv).exists():
+            print(f"❌ CSV not found: {args.csv}")
+            sys.exit(1)
+        counts = scan_csv(Path(args.csv), args.column, Path(args.report) if args.report else None)
+        print(f"✅ {sum(counts.values())} rows checked in {time.time() - start:.2f}s\n")
+        print_counts(counts)
+        if args.report:
+            print(f"\n📄 Invalid rows written to {args.report}")
+        return
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    counts = index_barcodes(args.db_path)
+    print(f"✅ {sum(counts.values())} foods indexed in {time.time() - start:.2f}s"
+          f"{'' if NUMPY_AVAILABLE else ' (numpy not installed - pure Python check digits)'}\n")
+    print_counts(counts)
+
+    conn = sqlite3.connect(args.db_path)
+    shared = shared_gtins(conn)
+    conn.close()
+    if shared:
+        print(f"\n🔁 GTINs shared by several foods (top {len(shared)}):")
+        for gtin, count in shared:
+            print(f"   {gtin}  x{count}")
+
+
+if __name__ == "__main__":
+    main()
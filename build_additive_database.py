@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Additive Database Build
+Replaces the chain of generator scripts that each re-read and rewrote whole
+JSON files. Every stage now runs as an in-memory transform over one state:
+
+    patch_master   update_additives_database.py   master JSON additions
+    merge          merge_additives.py             CSV (stdlib csv) + master JSON
+    consolidate    consolidate_databases.py       dedupe by name, + ultra-processed
+    expand         expand_additive_database.py    missing common additives
+    clean          clean_ingredients_database.py  origins, default sources, duplicates
+    sources        NutraSafe Beta/add_sources.py  citations for specific additives
+    content        generate_comprehensive_additive_content.py + update_all_comprehensive.py
+                   (on a copy: the enriched records go to ingredients_comprehensive.json)
+
+Each stage's output is cached under a key hashed from the input files and
+the code/data of every stage up to it, so a rebuild resumes from the last
+stage whose inputs are unchanged. Outputs are ingredients_consolidated.json
+with an indexed SQLite twin, and ingredients_comprehensive.json; none is
+rewritten if its content is unchanged.
+
+The CSV is required: without it the build would drop every CSV-only additive
+from the shipped files, so a missing CSV stops the build.
+
+Usage:
+    python build_additive_database.py [--csv PATH] [--output-dir DIR] [--force]
+"""
+
+import io
+import sys
+import csv
+import copy
+import json
+import time
+import hashlib
+import inspect
+import sqlite3
+import argparse
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import merge_additives
+import consolidate_databases
+import expand_additive_database
+import clean_ingredients_database
+import generate_comprehensive_additive_content
+import update_all_comprehensive
+from additive_detector import additive_key, normalize_text
+from additive_index import INDEX_VERSION, write_index
+
+SCRIPT_DIR = Path(__file__).parent
+BETA_DIR = SCRIPT_DIR / "NutraSafe Beta"
+CSV_PATH = BETA_DIR / "additives_full_described_with_sources_2025.csv"
+MASTER_JSON = SCRIPT_DIR / "firebase" / "functions" / "src" / "additives_master_database.json"
+ULTRA_JSON = BETA_DIR / "ultra_processed_ingredients.json"
+ADD_SOURCES_SCRIPT = BETA_DIR / "add_sources.py"
+UPDATE_MASTER_SCRIPT = SCRIPT_DIR / "firebase" / "functions" / "update_additives_database.py"
+CACHE_DIR = SCRIPT_DIR / ".build_cache" / "additives"
+
+OUTPUT_NAME = "ingredients_consolidated"
+COMPREHENSIVE_NAME = "ingredients_comprehensive"
+# Bump to invalidate every cached stage
+BUILD_VERSION = 1
+
+
+def load_script(path: Path):
+    """Import a stage script that doesn't live on the import path"""
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+add_sources = load_script(ADD_SOURCES_SCRIPT)
+update_additives_database = load_script(UPDATE_MASTER_SCRIPT)
+
+
+# ============================================================================
+# Stages: state dict in, state dict out
+# ============================================================================
+
+def stage_patch_master(state: Dict) -> Dict:
+    update_additives_database.apply_updates(state['master'])
+    return state
+
+
+def stage_merge(state: Dict) -> Dict:
+    csv_additives = merge_additives.parse_csv_rows(state.pop('csv_rows'))
+    json_additives = merge_additives.json_to_additives(state.pop('master'))
+    state['additives'] = merge_additives.merge_databases(csv_additives, json_additives)
+    return state
+
+
+def stage_consolidate(state: Dict) -> Dict:
+    ultra = consolidate_databases.flatten_ultra_processed(state.pop('ultra'))
+    consolidated = consolidate_databases.consolidate_by_name(state.pop('additives'), ultra)
+    state['db'] = {
+        'metadata': {
+            'sources': [CSV_PATH.name, MASTER_JSON.name, ULTRA_JSON.name],
+        },
+        'ingredients': sorted(consolidated.values(), key=lambda x: x['name']),
+    }
+    return state
+
+
+def stage_expand(state: Dict) -> Dict:
+    expand_additive_database.add_missing_additives(state['db'])
+    return state
+
+
+def stage_clean(state: Dict) -> Dict:
+    clean_ingredients_database.fix_empty_origins(state['db'])
+    clean_ingredients_database.add_missing_sources(state['db'])
+    clean_ingredients_database.remove_duplicates(state['db'])
+    return state
+
+
+def stage_sources(state: Dict) -> Dict:
+    add_sources.add_sources(state['db']['ingredients'])
+    return state
+
+
+def stage_content(state: Dict) -> Dict:
+    # The consolidated records keep their schema; the content fields only go to the comprehensive file
+    ingredients = [
+        generate_comprehensive_additive_content.generate_additive_content(additive)
+        for additive in copy.deepcopy(state['db']['ingredients'])
+    ]
+    update_all_comprehensive.apply_comprehensive_data(ingredients)
+    state['comprehensive'] = ingredients
+    return state
+
+
+# (name, transform, modules whose source feeds the cache key)
+STAGES: List[Tuple[str, Callable[[Dict], Dict], list]] = [
+    ('patch_master', stage_patch_master, [update_additives_database]),
+    ('merge', stage_merge, [merge_additives]),
+    ('consolidate', stage_consolidate, [consolidate_databases]),
+    ('expand', stage_expand, [expand_additive_database]),
+    ('clean', stage_clean, [clean_ingredients_database]),
+    ('sources', stage_sources, [add_sources]),
+    ('content', stage_content, [generate_comprehensive_additive_content, update_all_comprehensive]),
+]
+
+
+# ============================================================================
+# Hashing and stage cache
+# ============================================================================
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_fingerprint(transform: Callable, modules: list) -> str:
+    """Hash of a stage's own code plus the scripts (and data tables) it reuses"""
+    digest = hashlib.sha1(inspect.getsource(transform).encode('utf-8'))
+    for module in modules:
+        digest.update(file_digest(Path(module.__file__)).encode())
+    return digest.hexdigest()
+
+
+def chain_key(previous: str, fingerprint: str) -> str:
+    return hashlib.sha1(f"{BUILD_VERSION}:{previous}:{fingerprint}".encode()).hexdigest()
+
+
+def cache_path(index: int, name: str) -> Path:
+    return CACHE_DIR / f"{index:02d}-{name}.json"
+
+
+def load_cached_state(index: int, name: str, key: str) -> Optional[Dict]:
+    path = cache_path(index, name)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        cached = json.load(f)
+    return cached['state'] if cached.get('key') == key else None
+
+
+def save_cached_state(index: int, name: str, key: str, state: Dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(cache_path(index, name), 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'state': state}, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_inputs(csv_path: Path) -> Dict:
+    """Raw inputs as the initial state (CSV rows after the title and header rows)"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        csv_rows = list(csv.reader(f))[2:]
+
+    with open(MASTER_JSON, 'r', encoding='utf-8') as f:
+        master = json.load(f)
+    with open(ULTRA_JSON, 'r', encoding='utf-8') as f:
+        ultra = json.load(f)
+    return {'csv_rows': csv_rows, 'master': master, 'ultra': ultra}
+
+
+def run_stages(csv_path: Path, force: bool = False, verbose: bool = False) -> Tuple[Dict, List[str]]:
+    """
+    Run the pipeline, resuming from the latest cached stage whose key matches.
+
+    Returns (final state, names of stages that actually ran). Raises
+    FileNotFoundError if an input, including the CSV, is missing.
+    """
+    inputs = [csv_path, MASTER_JSON, ULTRA_JSON]
+    for path in inputs:
+        if not path.exists():
+            raise FileNotFoundError(f"{path} not found")
+    key = hashlib.sha1(':'.join(file_digest(p) for p in inputs).encode()).hexdigest()
+
+    keys = []
+    for name, transform, modules in STAGES:
+        key = chain_key(key, stage_fingerprint(transform, modules))
+        keys.append(key)
+
+    # Latest stage with a valid cache entry
+    state = None
+    start = 0
+    if not force:
+        for index in range(len(STAGES) - 1, -1, -1):
+            state = load_cached_state(index, STAGES[index][0], keys[index])
+            if state is not None:
+                start = index + 1
+                break
+
+    if state is None:
+        state = load_inputs(csv_path)
+
+    ran = []
+    for index in range(start, len(STAGES)):
+        name, transform, _ = STAGES[index]
+        log = io.StringIO()
+        with redirect_stdout(sys.stdout if verbose else log):
+            state = transform(state)
+        save_cached_state(index, name, keys[index], state)
+        ran.append(name)
+
+    return state, ran
+
+
+# ============================================================================
+# Outputs
+# ============================================================================
+
+def content_hash(ingredients: List[Dict]) -> str:
+    return hashlib.sha1(
+        json.dumps(ingredients, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+def existing_content_hash(json_path: Path) -> Optional[str]:
+    if not json_path.exists():
+        return None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('metadata', {}).get('content_hash')
+
+
+def build_output(db: Dict, digest: str) -> Dict:
+    ingredients = db['ingredients']
+    metadata = dict(db.get('metadata', {}))
+    metadata.update({
+        'version': f'2025.6-pipeline-{BUILD_VERSION}',
+        'total_ingredients': len(ingredients),
+        'last_updated': date.today().isoformat(),
+        'description': 'Food additives and ultra-processed ingredients, consolidated, '
+                       'cleaned and sourced in a single build',
+        'content_hash': digest,
+    })
+    metadata.pop('totalCount', None)
+    return {'metadata': metadata, 'ingredients': ingredients}
+
+
+def build_comprehensive_output(ingredients: List[Dict], digest: str) -> Dict:
+    return {
+        'metadata': {
+            'version': f'4.0.0-comprehensive-content-pipeline-{BUILD_VERSION}',
+            'total_ingredients': len(ingredients),
+            'last_updated': date.today().isoformat(),
+            'description': 'Comprehensive additive database with detailed, factual descriptions for all entries',
+            'content_hash': digest,
+        },
+        'ingredients': ingredients,
+    }
+
+
+def write_json(output: Dict, json_path: Path):
+    tmp_path = json_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(json_path)
+
+
+def write_sqlite_twin(output: Dict, db_path: Path):
+    """
+    Indexed SQLite copy of the JSON: one row per additive (full record as
+    JSON plus the columns apps filter on), with E-number and synonym lookup
+    tables and the additive_index.py reverse index. Built in a temp file and
+    swapped in.
+    """
+    tmp_path = db_path.with_suffix('.db.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    conn.executescript("""
+        CREATE TABLE metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE additives (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            additive_group TEXT,
+            category TEXT,
+            origin TEXT,
+            effects_verdict TEXT,
+            nova_group INTEGER,
+            processing_penalty INTEGER,
+            has_child_warning INTEGER,
+            has_pku_warning INTEGER,
+            has_sulphites_label INTEGER,
+            has_polyols_warning INTEGER,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE additive_e_numbers (
+            e_number TEXT NOT NULL,
+            additive_id TEXT NOT NULL,
+            PRIMARY KEY (e_number, additive_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE additive_synonyms (
+            synonym TEXT NOT NULL,
+            additive_id TEXT NOT NULL,
+            PRIMARY KEY (synonym, additive_id)
+        ) WITHOUT ROWID;
+    """)
+
+    rows = {}
+    e_numbers = set()
+    synonyms = set()
+    for record in output['ingredients']:
+        key = additive_key(record)
+        # Records sharing a canonical id keep the first row but link all their names
+        if key not in rows:
+            rows[key] = (
+                key, record['name'], record.get('group'), record.get('category'), record.get('origin'),
+                record.get('effectsVerdict'), record.get('novaGroup'), record.get('processingPenalty'),
+                int(bool(record.get('hasChildWarning'))), int(bool(record.get('hasPKUWarning'))),
+                int(bool(record.get('hasSulphitesAllergenLabel'))), int(bool(record.get('hasPolyolsWarning'))),
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')),
+            )
+        e_numbers.update((code, key) for code in record.get('eNumbers') or [])
+        for name in [record['name']] + list(record.get('synonyms') or []):
+            normalized = normalize_text(name).strip()
+            if normalized:
+                synonyms.add((normalized, key))
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO metadata VALUES (?, ?)",
+            [(k, json.dumps(v) if not isinstance(v, str) else v) for k, v in output['metadata'].items()]
+        )
+        conn.executemany("INSERT INTO additives VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows.values())
+        conn.executemany("INSERT INTO additive_e_numbers VALUES (?, ?)", sorted(e_numbers))
+        conn.executemany("INSERT INTO additive_synonyms VALUES (?, ?)", sorted(synonyms))
+        write_index(conn, output['ingredients'])
+
+    conn.executescript("""
+        CREATE INDEX idx_additives_name ON additives (name COLLATE NOCASE);
+        CREATE INDEX idx_additives_verdict ON additives (effects_verdict);
+        CREATE INDEX idx_additive_e_numbers_additive ON additive_e_numbers (additive_id);
+        CREATE INDEX idx_additive_synonyms_additive ON additive_synonyms (additive_id);
+        ANALYZE;
+    """)
+    conn.execute("VACUUM")
+    conn.close()
+    tmp_path.replace(db_path)
+
+
+def twin_is_current(db_path: Path, digest: str) -> bool:
+    """True if the SQLite twin holds this content and the current reverse index"""
+    if not db_path.exists():
+        return False
+    conn = sqlite3.connect(str(db_path))
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM metadata WHERE key IN ('content_hash', 'index_version')"))
+    except sqlite3.DatabaseError:
+        meta = {}
+    conn.close()
+    return meta.get('content_hash') == digest and meta.get('index_version') == str(INDEX_VERSION)
+
+
+def write_outputs(state: Dict, output_dir: Path, force: bool = False) -> Tuple[Dict, List[str]]:
+    """
+    Write the consolidated JSON + SQLite twin and the comprehensive JSON,
+    skipping any whose content is unchanged. Returns (consolidated output, files written)
+    """
+    json_path = output_dir / f"{OUTPUT_NAME}.json"
+    db_path = output_dir / f"{OUTPUT_NAME}.db"
+    comprehensive_path = output_dir / f"{COMPREHENSIVE_NAME}.json"
+    written = []
+
+    digest = content_hash(state['db']['ingredients'])
+    if not force and digest == existing_content_hash(json_path) and twin_is_current(db_path, digest):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+    else:
+        output = build_output(state['db'], digest)
+        write_json(output, json_path)
+        write_sqlite_twin(output, db_path)
+        written += [json_path.name, db_path.name]
+
+    digest = content_hash(state['comprehensive'])
+    if force or digest != existing_content_hash(comprehensive_path):
+        write_json(build_comprehensive_output(state['comprehensive'], digest), comprehensive_path)
+        written.append(comprehensive_path.name)
+
+    return output, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ingredients_consolidated.json, its SQLite twin "
+                                                 "and ingredients_comprehensive.json")
+    parser.add_argument("--csv", default=str(CSV_PATH), help="additives_full_described_with_sources_2025.csv")
+    parser.add_argument("--output-dir", default=str(BETA_DIR), help="Where to write the JSON and .db")
+    parser.add_argument("--force", action="store_true", help="Ignore cached stages and rewrite outputs")
+    parser.add_argument("--verbose", action="store_true", help="Show per-stage logs")
+    args = parser.parse_args()
+
+    print("🧪 ADDITIVE DATABASE BUILD")
+    print("=" * 80)
+
+    start = time.time()
+    try:
+        state, ran = run_stages(Path(args.csv), args.force, args.verbose)
+    except FileNotFoundError as e:
+        print(f"❌ {e} - nothing written (a partial build would drop shipped additives)")
+        sys.exit(1)
+    skipped = [name for name, _, _ in STAGES if name not in ran]
+    if skipped:
+        print(f"⏭️  Cached stages: {', '.join(skipped)}")
+    if ran:
+        print(f"⚙️  Ran stages: {', '.join(ran)}")
+
+    output, written = write_outputs(state, Path(args.output_dir), args.force)
+    ingredients = output['ingredients']
+    if written:
+        print(f"💾 Wrote {', '.join(written)} to {args.output_dir}")
+    else:
+        print("✅ Outputs already up to date")
+
+    print(f"\n📊 {len(ingredients)} ingredients, "
+          f"{sum(1 for i in ingredients if i.get('eNumbers'))} with E-numbers, "
+          f"{sum(1 for i in ingredients if i.get('sources'))} with sources "
+          f"in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Bulk CSV <-> SQLite Transfer Toolkit
+One streaming path for moving the UK foods catalogue between uk_foods_*.csv
+files and the foods table:
+
+    import   CSV rows -> typed converters -> TEMP staging table (executemany)
+             -> one INSERT ... SELECT ... ON CONFLICT(id) DO UPDATE per flush
+    export   cursor -> csv.writer, row by row (nothing is materialized)
+
+Connections run in WAL mode with batched transactions. Rows without an id
+get a stable one derived from barcode (or name + brand), so re-importing a
+file updates rows instead of duplicating them. A barcode reused by a
+differently named product in the same file keeps the first product on the
+barcode id and gives the others a name-qualified id; collisions are reported.
+
+Sodium units differ by source: uk_foods_*.csv stores grams, the fast food and
+generic item CSVs store mg (as the foods table does). The unit is picked from
+the file name, or given with --sodium-unit.
+
+Usage:
+    python bulk_transfer.py import uk_foods_cleaned.csv [db_path]
+    python bulk_transfer.py import fast_food_database.csv [db_path]         # sodium already mg
+    python bulk_transfer.py import my_foods.csv [db_path] --sodium-unit mg
+    python bulk_transfer.py export uk_foods_export.csv [db_path] [--where "barcode IS NOT NULL"]
+"""
+
+import csv
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ingredient_parser import DEFAULT_DB_PATH
+
+BATCH_SIZE = 5000
+FLUSH_ROWS = 100000
+
+# CSV file name prefix -> unit of its sodium column
+SODIUM_UNIT_BY_PREFIX = {
+    'uk_foods': 'g',
+    'fast_food': 'mg',
+    'generic_items': 'mg',
+    'generic_foods': 'mg',
+}
+
+
+# ============================================================================
+# Converters
+# ============================================================================
+
+def to_text(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.strip()
+    return value or None
+
+
+def to_float(value: Optional[str]) -> Optional[float]:
+    """'12.5', '12,5', '12.5g', '' -> 12.5 / None"""
+    value = to_text(value)
+    if value is None:
+        return None
+    try:
+        return float(value.replace(',', '.').rstrip('gGmlkcal% '))
+    except ValueError:
+        return None
+
+
+def to_bool(value: Optional[str]) -> Optional[int]:
+    value = to_text(value)
+    if value is None:
+        return None
+    return 1 if value.lower() in ('1', 'true', 'yes', 'y', 't') else 0
+
+
+def grams_to_mg(value: Optional[str]) -> Optional[float]:
+    grams = to_float(value)
+    return None if grams is None else round(grams * 1000, 3)
+
+
+def mg_to_grams(value) -> Optional[float]:
+    return None if value is None else round(value / 1000, 6)
+
+
+def from_bool(value) -> Optional[str]:
+    return None if value is None else ('true' if value else 'false')
+
+
+def identity(value):
+    return value
+
+
+def mg_value(value: Optional[str]) -> Optional[float]:
+    mg = to_float(value)
+    return None if mg is None else round(mg, 3)
+
+
+# (csv column, foods column, SQL type, CSV -> DB converter, DB -> CSV converter)
+UK_FOODS_COLUMNS: List[Tuple[str, str, str, Callable, Callable]] = [
+    ('name', 'name', 'TEXT', to_text, identity),
+    ('brand', 'brand', 'TEXT', to_text, identity),
+    ('barcode', 'barcode', 'TEXT', to_text, identity),   # text: keeps leading zeros
+    ('category', 'category', 'TEXT', to_text, identity),
+    ('subcategory', 'subcategory', 'TEXT', to_text, identity),
+    ('calories', 'calories', 'REAL', to_float, identity),
+    ('protein', 'protein', 'REAL', to_float, identity),
+    ('carbs', 'carbs', 'REAL', to_float, identity),
+    ('fat', 'fat', 'REAL', to_float, identity),
+    ('saturated_fat', 'saturated_fat', 'REAL', to_float, identity),
+    ('fiber', 'fiber', 'REAL', to_float, identity),
+    ('sugar', 'sugar', 'REAL', to_float, identity),
+    ('sodium', 'sodium', 'REAL', grams_to_mg, mg_to_grams),   # CSV grams, foods table mg
+    ('serving_size_g', 'serving_size_g', 'REAL', to_float, identity),
+    ('serving_description', 'serving_description', 'TEXT', to_text, identity),
+    ('ingredients', 'ingredients', 'TEXT', to_text, identity),
+    ('allergens', 'allergens', 'TEXT', to_text, identity),
+    ('is_verified', 'is_verified', 'INTEGER', to_bool, from_bool),
+]
+
+
+def columns_for_sodium_unit(unit: str, columns=UK_FOODS_COLUMNS) -> List[Tuple[str, str, str, Callable, Callable]]:
+    """Column spec for a CSV whose sodium column is in unit ('g' or 'mg')"""
+    if unit == 'g':
+        return list(columns)
+    if unit != 'mg':
+        raise ValueError(f"Unknown sodium unit '{unit}' (expected g or mg)")
+    return [(csv_column, db_column, sql_type, mg_value, identity) if db_column == 'sodium'
+            else (csv_column, db_column, sql_type, convert, back)
+            for csv_column, db_column, sql_type, convert, back in columns]
+
+
+def sodium_unit_for(csv_path: Path) -> Optional[str]:
+    """Sodium unit of a known source CSV, from its file name (None if unknown)"""
+    name = Path(csv_path).name.lower()
+    for prefix, unit in SODIUM_UNIT_BY_PREFIX.items():
+        if name.startswith(prefix):
+            return unit
+    return None
+
+
+def name_key(name: Optional[str]) -> str:
+    return ' '.join((name or '').lower().split())
+
+
+def stable_food_id(name: Optional[str], brand: Optional[str], barcode: Optional[str],
+                   shared_barcode: bool = False) -> str:
+    """
+    Deterministic id, so a re-import of the same product hits the same row.
+    shared_barcode: the barcode already belongs to a differently named product,
+    so the name is part of the id
+    """
+    if barcode and not shared_barcode:
+        return f"uk-{barcode}"
+    if barcode:
+        return f"uk-{barcode}-{hashlib.sha1(name_key(name).encode('utf-8')).hexdigest()[:8]}"
+    digest = hashlib.sha1(f"{(name or '').lower()}|{(brand or '').lower()}".encode('utf-8')).hexdigest()
+    return f"uk-{digest[:16]}"
+
+
+# ============================================================================
+# SQLite plumbing
+# ============================================================================
+
+def open_bulk(db_path: str) -> sqlite3.Connection:
+    """Connection tuned for bulk writes"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def ensure_columns(conn: sqlite3.Connection, table: str, columns: Sequence[Tuple[str, str]], key: str = 'id'):
+    """Create the table, or add any missing (column, type) to it"""
+    existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if not existing:
+        column_sql = ', '.join(f"{name} {sql_type}" for name, sql_type in columns if name != key)
+        conn.execute(f"CREATE TABLE {table} ({key} TEXT PRIMARY KEY, {column_sql})")
+        return
+    for name, sql_type in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+
+
+def stage_rows(conn: sqlite3.Connection, stage: str, columns: Sequence[str], rows: Iterable[tuple],
+               batch_size: int = BATCH_SIZE) -> int:
+    """Create (or empty) a TEMP staging table and fill it with executemany batches"""
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} ({', '.join(columns)})")
+    conn.execute(f"DELETE FROM {stage}")
+    insert = f"INSERT INTO {stage} VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(insert, batch)
+            count += len(batch)
+            batch = []
+    conn.executemany(insert, batch)
+    return count + len(batch)
+
+
+def upsert_from_stage(conn: sqlite3.Connection, table: str, stage: str, columns: Sequence[str],
+                      key: str = 'id', keep: Sequence[str] = ('created_at',)) -> Tuple[int, int]:
+    """
+    Move a staging table into table with one INSERT ... ON CONFLICT statement.
+    Columns in keep are only written for new rows. Returns (inserted, updated)
+    """
+    updated = conn.execute(
+        f"SELECT COUNT(DISTINCT {key}) FROM {stage} WHERE {key} IN (SELECT {key} FROM {table})"
+    ).fetchone()[0]
+    staged = conn.execute(f"SELECT COUNT(DISTINCT {key}) FROM {stage}").fetchone()[0]
+    assignments = ', '.join(f"{c} = excluded.{c}" for c in columns if c != key and c not in keep)
+    column_list = ', '.join(columns)
+    # "WHERE true" disambiguates the upsert ON clause from a join constraint
+    conn.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {stage} WHERE true
+        ON CONFLICT({key}) DO UPDATE SET {assignments}
+    """)
+    return staged - updated, updated
+
+
+# ============================================================================
+# CSV import / export
+# ============================================================================
+
+def iter_csv_rows(csv_path: Path, columns=UK_FOODS_COLUMNS, now: Optional[int] = None,
+                  collisions: Optional[List[Tuple[str, str, str]]] = None) -> Iterator[tuple]:
+    """
+    Stream typed (id, ..., created_at, updated_at) tuples from a CSV.
+    Rows whose barcode was already used by a differently named product are
+    appended to collisions as (barcode, first name, this name)
+    """
+    now = now or int(time.time())
+    barcode_names: Dict[str, str] = {}   # barcode -> name of the first product using it
+    with open(csv_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        reader = csv.DictReader(f)
+        has_id = 'id' in (reader.fieldnames or [])
+        for row in reader:
+            values = [convert(row.get(csv_column)) for csv_column, _, _, convert, _ in columns]
+            record = dict(zip((db_column for _, db_column, _, _, _ in columns), values))
+            if not record.get('name'):
+                continue
+            food_id = to_text(row.get('id')) if has_id else None
+            if not food_id:
+                barcode = record.get('barcode')
+                shared = False
+                if barcode:
+                    first = barcode_names.setdefault(barcode, record['name'])
+                    shared = name_key(first) != name_key(record['name'])
+                    if shared and collisions is not None:
+                        collisions.append((barcode, first, record['name']))
+                food_id = stable_food_id(record['name'], record.get('brand'), barcode, shared)
+            yield (food_id, *values, now, now)
+
+
+def import_csv(csv_path: Path, db_path: str, table: str = 'foods', columns=UK_FOODS_COLUMNS,
+               batch_size: int = BATCH_SIZE, flush_rows: int = FLUSH_ROWS,
+               collisions: Optional[List[Tuple[str, str, str]]] = None) -> Tuple[int, int, int]:
+    """
+    Upsert a CSV into table. Staged rows are flushed (upserted and committed)
+    every flush_rows, so memory is bounded by one flush plus one name per barcode.
+    Barcode collisions are appended to collisions (see iter_csv_rows).
+
+    Returns (rows read, inserted, updated)
+    """
+    db_columns = ['id'] + [db_column for _, db_column, _, _, _ in columns] + ['created_at', 'updated_at']
+    types = [('id', 'TEXT')] + [(c, t) for _, c, t, _, _ in columns] + [('created_at', 'INTEGER'), ('updated_at', 'INTEGER')]
+
+    conn = open_bulk(db_path)
+    read = inserted = updated = 0
+    with conn:
+        ensure_columns(conn, table, types)
+
+    rows = iter_csv_rows(csv_path, columns, collisions=collisions)
+    while True:
+        chunk = (row for _, row in zip(range(flush_rows), rows))
+        with conn:
+            staged = stage_rows(conn, 'bulk_stage', db_columns, chunk, batch_size)
+            if not staged:
+                break
+            new, changed = upsert_from_stage(conn, table, 'bulk_stage', db_columns)
+        read += staged
+        inserted += new
+        updated += changed
+        if staged < flush_rows:
+            break
+
+    conn.execute("DROP TABLE IF EXISTS temp.bulk_stage")
+    conn.close()
+    return read, inserted, updated
+
+
+def export_query(conn: sqlite3.Connection, sql: str, csv_path: Path, params: tuple = (),
+                 converters: Optional[Dict[str, Callable]] = None) -> int:
+    """Stream a query's rows to CSV with a header from its column names. Returns rows written"""
+    cursor = conn.execute(sql, params)
+    header = [d[0] for d in cursor.description]
+    rows: Iterable = cursor
+    if converters:
+        funcs = [converters.get(name, identity) for name in header]
+        rows = (tuple(f(v) for f, v in zip(funcs, row)) for row in cursor)
+
+    count = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_csv(db_path: str, csv_path: Path, table: str = 'foods', columns=UK_FOODS_COLUMNS,
+               where: Optional[str] = None) -> int:
+    """Export table to a uk_foods-style CSV (CSV column names and units)"""
+    conn = sqlite3.connect(db_path)
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    select = ', '.join(
+        f"{db_column} AS {csv_column}" if db_column in present else f"NULL AS {csv_column}"
+        for csv_column, db_column, _, _, _ in columns
+    )
+    sql = f"SELECT id, {select} FROM {table}" + (f" WHERE {where}" if where else "") + " ORDER BY id"
+    count = export_query(conn, sql, csv_path,
+                         converters={csv_column: back for csv_column, _, _, _, back in columns})
+    conn.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk CSV <-> SQLite transfer for the foods table")
+    parser.add_argument("mode", choices=["import", "export"])
+    parser.add_argument("csv_path")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--table", default="foods")
+    parser.add_argument("--where", help="Export filter, e.g. \"barcode IS NOT NULL\"")
+    parser.add_argument("--sodium-unit", choices=["g", "mg"],
+                        help="Unit of the CSV sodium column (default: from the file name; export: g)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(f"🚚 BULK {args.mode.upper()}")
+    print("=" * 80)
+
+    start = time.time()
+    if args.mode == "import":
+        if not Path(args.csv_path).exists():
+            print(f"❌ CSV not found: {args.csv_path}")
+            sys.exit(1)
+        unit = args.sodium_unit or sodium_unit_for(Path(args.csv_path))
+        if unit is None:
+            print(f"❌ Unknown sodium unit for {Path(args.csv_path).name} - pass --sodium-unit g or mg")
+            sys.exit(1)
+        print(f"🧂 Sodium column read as {unit}")
+        collisions: List[Tuple[str, str, str]] = []
+        read, inserted, updated = import_csv(Path(args.csv_path), args.db_path, args.table,
+                                             columns_for_sodium_unit(unit), args.batch_size,
+                                             collisions=collisions)
+        print(f"✅ {read} rows read: {inserted} inserted, {updated} updated "
+              f"in {time.time() - start:.1f}s")
+        if collisions:
+            print(f"⚠️  {len(collisions)} rows reuse a barcode of a differently named product "
+                  f"(imported as separate foods):")
+            for barcode, first, name in collisions[:10]:
+                print(f"   {barcode}: {first!r} / {name!r}")
+    else:
+        if not Path(args.db_path).exists():
+            print(f"❌ Database not found: {args.db_path}")
+            sys.exit(1)
+        count = export_csv(args.db_path, Path(args.csv_path), args.table,
+                           columns_for_sodium_unit(args.sodium_unit or 'g'), args.where)
+        print(f"✅ {count} rows exported to {args.csv_path} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
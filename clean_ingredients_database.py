@@ -93,8 +93,9 @@ def remove_duplicates(data):
             print(f"    Duplicate: {ing['name']}")
 
             # Merge E-numbers, synonyms, sources
-            original['eNumbers'] = list(set(original['eNumbers'] + ing['eNumbers']))
-            original['synonyms'] = list(set(original['synonyms'] + ing['synonyms'] + [ing['name']]))
+            # dict.fromkeys keeps first-seen order, so rebuilds are reproducible
+            original['eNumbers'] = list(dict.fromkeys(original['eNumbers'] + ing['eNumbers']))
+            original['synonyms'] = list(dict.fromkeys(original['synonyms'] + ing['synonyms'] + [ing['name']]))
 
             # Merge sources
             existing_urls = {s['url'] for s in original['sources']}
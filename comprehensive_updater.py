@@ -13,6 +13,8 @@ import re
 from typing import Optional, Dict, Tuple, Any
 from urllib.parse import quote_plus
 
+from product_knowledge import KnowledgeMatcher
+
 class ComprehensiveUpdater:
     def __init__(self, db_path: str, google_api_key: str = None):
         self.db_path = db_path
@@ -20,6 +22,7 @@ class ComprehensiveUpdater:
         self.phase1_updated = 0
         self.phase2_updated = 0
         self.total_errors = 0
+        self.knowledge = KnowledgeMatcher.load('comprehensive')
         
         # Google Custom Search configuration
         self.google_api_key = google_api_key or "YOUR_API_KEY_HERE"
@@ -58,108 +61,14 @@ class ComprehensiveUpdater:
         return clean_name.strip()
     
     def apply_gpt_reasoning(self, product_name: str, brand: str) -> Optional[Dict[str, Any]]:
-        """Apply ChatGPT's reasoning to determine food data - ONLY for known products"""
+        """Apply ChatGPT's reasoning to determine food data - ONLY for known products
+        (product_knowledge.json 'comprehensive' rulebook)"""
         
         if not product_name:
             return None
-            
-        # Normalize for pattern matching
-        full_product = f"{brand} {product_name}".lower().strip()
-        product_lower = product_name.lower().strip()
-        
-        # === MAJOR UK BRANDS - SPECIFIC PRODUCTS ONLY ===
-        
-        # Coca-Cola Products
-        if any(term in full_product for term in ['coca cola', 'coke classic', 'coca-cola']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Colour (Caramel E150d), Acid (Phosphoric Acid), Natural Flavourings including Caffeine',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 42, 'fat_100g': 0, 'carbs_100g': 10.6, 'sugar_100g': 10.6, 'protein_100g': 0, 'salt_100g': 0
-            }
-        
-        # Pepsi Products
-        if any(term in full_product for term in ['pepsi', 'pepsi cola']):
-            if 'max' in full_product:
-                return {
-                    'ingredients': 'Carbonated Water, Colour (Caramel E150d), Sweeteners (Aspartame, Acesulfame K), Acid (Phosphoric Acid), Natural Flavourings including Caffeine, Preservative (Potassium Sorbate)',
-                    'serving_size': '330ml',
-                    'energy_kcal_100g': 1, 'fat_100g': 0, 'carbs_100g': 0, 'sugar_100g': 0, 'protein_100g': 0, 'salt_100g': 0.02
-                }
-            else:
-                return {
-                    'ingredients': 'Carbonated Water, Sugar, Colour (Caramel E150d), Acid (Phosphoric Acid), Natural Flavourings including Caffeine',
-                    'serving_size': '330ml',
-                    'energy_kcal_100g': 43, 'fat_100g': 0, 'carbs_100g': 11, 'sugar_100g': 11, 'protein_100g': 0, 'salt_100g': 0.01
-                }
-        
-        # Mars Products
-        if any(term in full_product for term in ['mars bar', 'mars chocolate']) and 'mars' in brand.lower():
-            return {
-                'ingredients': 'Sugar, Glucose Syrup, Milk Powder, Cocoa Butter, Cocoa Mass, Sunflower Oil, Milk Fat, Lactose, Salt, Egg White Powder, Vanilla Extract',
-                'serving_size': '45g',
-                'energy_kcal_100g': 457, 'fat_100g': 16.5, 'carbs_100g': 68, 'sugar_100g': 59.9, 'protein_100g': 4.2, 'salt_100g': 0.24
-            }
-        
-        # Walkers Crisps - Expanded varieties
-        if 'walkers' in brand.lower() or 'walkers' in product_lower:
-            if any(term in product_lower for term in ['ready salted', 'original']):
-                return {
-                    'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Salt',
-                    'serving_size': '25g',
-                    'energy_kcal_100g': 533, 'fat_100g': 34, 'carbs_100g': 50, 'sugar_100g': 0.5, 'protein_100g': 6.1, 'salt_100g': 1.3
-                }
-            elif 'prawn cocktail' in product_lower:
-                return {
-                    'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Prawn Cocktail Flavour [Flavourings, Sugar, Salt, Potassium Chloride, Dried Onion, Dried Garlic, Citric Acid, Colour (Paprika Extract)]',
-                    'serving_size': '25g',
-                    'energy_kcal_100g': 530, 'fat_100g': 33, 'carbs_100g': 51, 'sugar_100g': 2.1, 'protein_100g': 6, 'salt_100g': 1.3
-                }
-            elif any(term in product_lower for term in ['cheese and onion', 'cheese & onion']):
-                return {
-                    'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Cheese & Onion Flavour [Dried Onion, Flavouring, Salt, Cheese Powder, Potassium Chloride, Dried Yeast, Citric Acid]',
-                    'serving_size': '25g',
-                    'energy_kcal_100g': 530, 'fat_100g': 33, 'carbs_100g': 51, 'sugar_100g': 2.1, 'protein_100g': 6, 'salt_100g': 1.3
-                }
-            elif any(term in product_lower for term in ['salt and vinegar', 'salt & vinegar']):
-                return {
-                    'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Salt & Vinegar Flavour [Salt, Lactose (from Milk), Sodium Diacetate, Malic Acid, Flavouring]',
-                    'serving_size': '25g',
-                    'energy_kcal_100g': 533, 'fat_100g': 34, 'carbs_100g': 50, 'sugar_100g': 1.1, 'protein_100g': 6.1, 'salt_100g': 1.6
-                }
-            elif any(term in product_lower for term in ['bbq', 'barbecue']):
-                return {
-                    'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), BBQ Flavour [Sugar, Salt, Flavourings, Onion Powder, Garlic Powder, Paprika Extract, Smoke Flavouring]',
-                    'serving_size': '25g',
-                    'energy_kcal_100g': 528, 'fat_100g': 33, 'carbs_100g': 52, 'sugar_100g': 3.2, 'protein_100g': 5.9, 'salt_100g': 1.4
-                }
-            elif 'wotsits' in product_lower or 'monster munch' in product_lower:
-                return {
-                    'ingredients': 'Maize, Vegetable Oils (Sunflower, Rapeseed), Cheese Flavour [Whey Powder (from Milk), Cheese Powder, Salt, Flavouring, Colour (Annatto, Paprika Extract)]',
-                    'serving_size': '22g',
-                    'energy_kcal_100g': 506, 'fat_100g': 28, 'carbs_100g': 57, 'sugar_100g': 2.8, 'protein_100g': 6.4, 'salt_100g': 2.2
-                }
-        
-        # Doritos
-        if 'doritos' in product_lower:
-            if 'chilli heatwave' in product_lower:
-                return {
-                    'ingredients': 'Maize, Vegetable Oils (Sunflower, Rapeseed), Chilli Heatwave Flavour [Salt, Sugar, Flavourings, Onion Powder, Garlic Powder, Paprika, Chilli Powder, Colour (Paprika Extract)]',
-                    'serving_size': '30g',
-                    'energy_kcal_100g': 498, 'fat_100g': 25, 'carbs_100g': 60, 'sugar_100g': 4.2, 'protein_100g': 7.2, 'salt_100g': 1.7
-                }
-        
-        # Lindt Chocolate
-        if 'lindt' in brand.lower():
-            return {
-                'ingredients': 'Sugar, Cocoa Butter, Whole Milk Powder, Cocoa Mass, Lactose, Skimmed Milk Powder, Emulsifier (Soya Lecithin), Barley Malt Extract, Flavouring',
-                'serving_size': '25g',
-                'energy_kcal_100g': 534, 'fat_100g': 32, 'carbs_100g': 51, 'sugar_100g': 50, 'protein_100g': 6.9, 'salt_100g': 0.14
-            }
-        
-        # Add more specific brand matches here...
-        # Only include products where we have EXACT knowledge
         
-        return None  # Never guess for branded products
+        rule = self.knowledge.match(product_name, brand)
+        return dict(rule.data) if rule else None  # Never guess for branded products
     
     def google_search_product(self, product_name: str, brand: str) -> Optional[Dict[str, str]]:
         """Phase 2: Google search for product information"""
@@ -18,9 +18,10 @@ def load_additives_unified(filepath: str) -> List[Dict]:
 def load_ultra_processed(filepath: str) -> List[Dict]:
     """Load the ultra-processed ingredients database"""
     with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+        return flatten_ultra_processed(json.load(f))
 
-    # Convert nested structure to flat list
+def flatten_ultra_processed(data: Dict) -> List[Dict]:
+    """Convert the nested ultra-processed structure to a flat list"""
     ingredients = []
     ultra_data = data.get('ultra_processed_ingredients', {})
     for category, items in ultra_data.items():
@@ -33,34 +34,50 @@ def normalize_name(name: str) -> str:
     """Normalize ingredient name for comparison"""
     return name.lower().strip()
 
+# Basic ingredients to exclude
+BASIC_INGREDIENTS = {
+    "salt", "sea salt", "table salt", "rock salt", "himalayan salt",
+    "sugar", "cane sugar", "brown sugar", "white sugar", "granulated sugar",
+    "water", "filtered water", "spring water",
+    "flour", "wheat flour", "plain flour", "self-raising flour", "white flour", "wholemeal flour",
+    "butter", "unsalted butter", "salted butter",
+    "milk", "whole milk", "skimmed milk", "semi-skimmed milk",
+    "cream", "double cream", "single cream", "whipping cream",
+    "oil", "olive oil", "vegetable oil", "sunflower oil", "rapeseed oil", "coconut oil",
+    "egg", "eggs", "free range egg", "free range eggs",
+    "baking powder", "baking soda", "bicarbonate of soda",
+    "yeast", "dried yeast", "fresh yeast", "active yeast",
+    "vanilla", "vanilla extract", "vanilla essence",
+    "pepper", "black pepper", "white pepper", "ground pepper",
+    "vinegar", "white vinegar", "malt vinegar", "balsamic vinegar",
+    "honey", "natural honey"
+}
+
 def is_basic_ingredient(name: str) -> bool:
     """Check if this is a basic cooking ingredient that should be excluded"""
-    name_lower = name.lower().strip()
-
-    # Basic ingredients to exclude
-    basic_ingredients = {
-        "salt", "sea salt", "table salt", "rock salt", "himalayan salt",
-        "sugar", "cane sugar", "brown sugar", "white sugar", "granulated sugar",
-        "water", "filtered water", "spring water",
-        "flour", "wheat flour", "plain flour", "self-raising flour", "white flour", "wholemeal flour",
-        "butter", "unsalted butter", "salted butter",
-        "milk", "whole milk", "skimmed milk", "semi-skimmed milk",
-        "cream", "double cream", "single cream", "whipping cream",
-        "oil", "olive oil", "vegetable oil", "sunflower oil", "rapeseed oil", "coconut oil",
-        "egg", "eggs", "free range egg", "free range eggs",
-        "baking powder", "baking soda", "bicarbonate of soda",
-        "yeast", "dried yeast", "fresh yeast", "active yeast",
-        "vanilla", "vanilla extract", "vanilla essence",
-        "pepper", "black pepper", "white pepper", "ground pepper",
-        "vinegar", "white vinegar", "malt vinegar", "balsamic vinegar",
-        "honey", "natural honey"
-    }
-
-    return name_lower in basic_ingredients
+    return name.lower().strip() in BASIC_INGREDIENTS
+
+def source_key(source: Any) -> str:
+    """Hashable identity for a source citation"""
+    if isinstance(source, dict):
+        return source.get('url') or json.dumps(source, sort_keys=True)
+    return str(source)
+
+def merge_unique(target: List, seen: Set, items: List, key=lambda item: item):
+    """Append items not already in target, tracking identities in a set"""
+    for item in items:
+        item_key = key(item)
+        if item_key not in seen:
+            seen.add(item_key)
+            target.append(item)
 
 def consolidate_by_name(additives: List[Dict], ultra_processed: List[Dict]) -> Dict[str, Dict]:
     """Consolidate all ingredients by name, merging duplicates"""
     consolidated = {}
+    # Per-name sets of what each entry already holds, so merges don't rescan lists
+    seen_e_numbers: Dict[str, Set[str]] = defaultdict(set)
+    seen_synonyms: Dict[str, Set[str]] = defaultdict(set)
+    seen_sources: Dict[str, Set[str]] = defaultdict(set)
 
     # Process regular additives first
     for additive in additives:
@@ -93,24 +110,19 @@ def consolidate_by_name(additives: List[Dict], ultra_processed: List[Dict]) -> D
                 'isPermittedGB': additive.get('isPermittedGB', True),
                 'isPermittedNI': additive.get('isPermittedNI', True),
                 'isPermittedEU': additive.get('isPermittedEU', True),
-                'synonyms': additive.get('synonyms', []),
-                'sources': additive.get('sources', []),
+                'synonyms': [],
+                'sources': [],
                 'processingPenalty': 0,  # Default for regular additives
                 'novaGroup': 0,  # Default for regular additives
                 'database_origin': 'additives_unified'
             }
-        else:
+            seen_e_numbers[name].update(consolidated[name]['eNumbers'])
+        elif additive.get('eNumber'):
             # Merge E-number if different
-            if additive.get('eNumber') and additive['eNumber'] not in consolidated[name]['eNumbers']:
-                consolidated[name]['eNumbers'].append(additive['eNumber'])
-            # Merge synonyms
-            for syn in additive.get('synonyms', []):
-                if syn not in consolidated[name]['synonyms']:
-                    consolidated[name]['synonyms'].append(syn)
-            # Merge sources
-            for source in additive.get('sources', []):
-                if source not in consolidated[name]['sources']:
-                    consolidated[name]['sources'].append(source)
+            merge_unique(consolidated[name]['eNumbers'], seen_e_numbers[name], [additive['eNumber']])
+
+        merge_unique(consolidated[name]['synonyms'], seen_synonyms[name], additive.get('synonyms', []))
+        merge_unique(consolidated[name]['sources'], seen_sources[name], additive.get('sources', []), source_key)
 
     # Process ultra-processed ingredients
     for ingredient in ultra_processed:
@@ -146,17 +158,16 @@ def consolidate_by_name(additives: List[Dict], ultra_processed: List[Dict]) -> D
                 'isPermittedGB': True,
                 'isPermittedNI': True,
                 'isPermittedEU': True,
-                'synonyms': ingredient.get('synonyms', []),
-                'sources': ingredient.get('sources', []),
+                'synonyms': [],
+                'sources': [],
                 'processingPenalty': ingredient.get('processing_penalty', 0),
                 'novaGroup': ingredient.get('nova_group', 4),
                 'database_origin': 'ultra_processed'
             }
+            seen_e_numbers[name].update(e_numbers)
         else:
             # Merge with existing entry
-            for e_num in e_numbers:
-                if e_num not in consolidated[name]['eNumbers']:
-                    consolidated[name]['eNumbers'].append(e_num)
+            merge_unique(consolidated[name]['eNumbers'], seen_e_numbers[name], e_numbers)
 
             # If ultra-processed has better info, use it
             if ingredient.get('what_it_is') and not consolidated[name]['what_it_is']:
@@ -166,16 +177,6 @@ def consolidate_by_name(additives: List[Dict], ultra_processed: List[Dict]) -> D
             if ingredient.get('where_it_comes_from') and not consolidated[name]['where_it_comes_from']:
                 consolidated[name]['where_it_comes_from'] = ingredient['where_it_comes_from']
 
-            # Merge synonyms
-            for syn in ingredient.get('synonyms', []):
-                if syn not in consolidated[name]['synonyms']:
-                    consolidated[name]['synonyms'].append(syn)
-
-            # Merge sources
-            for source in ingredient.get('sources', []):
-                if source not in consolidated[name]['sources']:
-                    consolidated[name]['sources'].append(source)
-
             # Update penalties if from ultra-processed
             if ingredient.get('processing_penalty', 0) > consolidated[name]['processingPenalty']:
                 consolidated[name]['processingPenalty'] = ingredient['processing_penalty']
@@ -183,6 +184,9 @@ def consolidate_by_name(additives: List[Dict], ultra_processed: List[Dict]) -> D
                 consolidated[name]['novaGroup'] = ingredient['nova_group']
                 consolidated[name]['database_origin'] = 'both'
 
+        merge_unique(consolidated[name]['synonyms'], seen_synonyms[name], ingredient.get('synonyms', []))
+        merge_unique(consolidated[name]['sources'], seen_sources[name], ingredient.get('sources', []), source_key)
+
     # Sort E-numbers for each entry
     for entry in consolidated.values():
         entry['eNumbers'] = sorted(set(entry['eNumbers']))
@@ -16,6 +16,8 @@ from typing import Optional, Dict, Tuple, Any
 from openai import OpenAI
 from datetime import datetime
 
+from barcodes import is_valid_gtin
+
 class CSVAIBarcodeUpdater:
     def __init__(self, db_path: str, csv_path: str = None, openai_api_key: str = None, google_api_key: str = None):
         self.db_path = db_path
@@ -148,33 +150,14 @@ class CSVAIBarcodeUpdater:
         return None
     
     def validate_barcode(self, barcode: str) -> bool:
-        """Basic barcode validation"""
+        """EAN-8, UPC-A, EAN-13 or GTIN-14 with a correct GS1 check digit"""
         if not barcode or not barcode.isdigit():
             return False
-        
-        # Check common barcode lengths
-        valid_lengths = [8, 12, 13, 14]  # EAN-8, UPC-A, EAN-13, GTIN-14
-        if len(barcode) not in valid_lengths:
-            return False
-        
-        # Basic checksum validation for EAN-13
-        if len(barcode) == 13:
-            return self.validate_ean13_checksum(barcode)
-        
-        return True
+        return is_valid_gtin(barcode)
     
     def validate_ean13_checksum(self, ean: str) -> bool:
         """Validate EAN-13 checksum"""
-        if len(ean) != 13 or not ean.isdigit():
-            return False
-        
-        # EAN-13 checksum algorithm
-        odd_sum = sum(int(ean[i]) for i in range(0, 12, 2))
-        even_sum = sum(int(ean[i]) for i in range(1, 12, 2))
-        total = odd_sum + (even_sum * 3)
-        checksum = (10 - (total % 10)) % 10
-        
-        return checksum == int(ean[12])
+        return len(ean) == 13 and ean.isdigit() and is_valid_gtin(ean)
     
     def add_to_csv(self, product_id: int, name: str, brand: str, barcode: str, method: str, status: str, data: Dict = None):
         """Add processed food to CSV file including barcode"""
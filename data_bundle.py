@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Data Bundle Exporter / Loader
+Packs the shipped JSON bundles into one indexed, read-only SQLite file:
+
+    ingredients_consolidated.json     -> dataset 'consolidated'
+    ingredients_comprehensive.json    -> dataset 'comprehensive'
+    micronutrients_ingredients_v6.json -> dataset 'micronutrients'
+
+Every record is stored as compact JSON with its position, canonical key and
+name, alongside an FTS5 index over names and synonyms, an exact normalized
+name index and an E-number -> record index. DataBundle opens the file
+memory-mapped and immutable, so fetching one additive or resolving a synonym
+reads a few pages instead of parsing megabytes of JSON.
+
+Usage:
+    python data_bundle.py --export [--output PATH]
+    python data_bundle.py --get E330
+    python data_bundle.py --search "lecith" [--dataset comprehensive]
+"""
+
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from additive_detector import additive_key, normalize_text
+
+SCRIPT_DIR = Path(__file__).parent
+BETA_DIR = SCRIPT_DIR / "NutraSafe Beta"
+BUNDLE_PATH = BETA_DIR / "nutrasafe_data_bundle.db"
+
+ADDITIVE_SOURCES = {
+    'consolidated': BETA_DIR / "ingredients_consolidated.json",
+    'comprehensive': BETA_DIR / "ingredients_comprehensive.json",
+}
+MICRONUTRIENT_SOURCE = BETA_DIR / "micronutrients_ingredients_v6.json"
+
+MMAP_SIZE = 64 * 1024 * 1024
+FTS_SPECIALS = str.maketrans({c: ' ' for c in '"*^():-+'})
+
+
+def normalize_key(text: str) -> str:
+    """Lookup form shared by the name and E-number indexes"""
+    return normalize_text(text).strip()
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================================================
+# Export
+# ============================================================================
+
+BUNDLE_SCHEMA = """
+    CREATE TABLE bundle_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    CREATE TABLE records (
+        dataset TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        name TEXT NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (dataset, position)
+    ) WITHOUT ROWID;
+    CREATE TABLE names (
+        name TEXT NOT NULL,
+        dataset TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (name, dataset, position)
+    ) WITHOUT ROWID;
+    CREATE TABLE e_numbers (
+        e_number TEXT NOT NULL,
+        dataset TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (e_number, dataset, position)
+    ) WITHOUT ROWID;
+    CREATE VIRTUAL TABLE names_fts USING fts5(
+        name, dataset UNINDEXED, position UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    );
+"""
+
+
+def additive_rows(dataset: str, ingredients: List[Dict]) -> Tuple[list, set, set]:
+    """(records, names, e_numbers) rows for an additive dataset"""
+    records = []
+    names = set()
+    e_numbers = set()
+    for position, record in enumerate(ingredients):
+        records.append((dataset, position, additive_key(record), record['name'],
+                        json.dumps(record, ensure_ascii=False, separators=(',', ':'))))
+        for name in [record['name']] + list(record.get('synonyms') or []):
+            if normalize_key(name):
+                names.add((name, dataset, position))
+        for code in record.get('eNumbers') or []:
+            e_numbers.add((normalize_key(code), dataset, position))
+    return records, names, e_numbers
+
+
+def micronutrient_rows(data: Dict) -> Tuple[list, set]:
+    """(records, names) rows for the micronutrient ingredients; synonyms point at their canonical row"""
+    records = []
+    names = set()
+    positions = {}
+    for position, (name, record) in enumerate(data['ingredients'].items()):
+        positions[name] = position
+        records.append(('micronutrients', position, name, name,
+                        json.dumps(record, ensure_ascii=False, separators=(',', ':'))))
+        names.add((name.replace('_', ' '), 'micronutrients', position))
+    for alt_name, canonical in data.get('synonyms', {}).items():
+        if canonical in positions:
+            names.add((alt_name.replace('_', ' '), 'micronutrients', positions[canonical]))
+    return records, names
+
+
+def export_bundle(output: Path = BUNDLE_PATH) -> Dict[str, int]:
+    """Write the bundle (temp file, then swapped in). Returns record counts per dataset"""
+    output = Path(output)
+    tmp_path = output.with_suffix('.db.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    conn.execute("PRAGMA page_size = 4096")
+    conn.executescript(BUNDLE_SCHEMA)
+
+    counts = {}
+    meta = {}
+    with conn:
+        for dataset, path in ADDITIVE_SOURCES.items():
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            records, names, e_numbers = additive_rows(dataset, document['ingredients'])
+            conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?)", records)
+            conn.executemany("INSERT INTO e_numbers VALUES (?, ?, ?)", sorted(e_numbers))
+            conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?, ?)",
+                             sorted((normalize_key(n), d, p) for n, d, p in names))
+            conn.executemany("INSERT INTO names_fts VALUES (?, ?, ?)", sorted(names))
+            meta[f'{dataset}.metadata'] = document.get('metadata', {})
+            meta[f'{dataset}.source_hash'] = file_digest(path)
+            counts[dataset] = len(records)
+
+        with open(MICRONUTRIENT_SOURCE, 'r', encoding='utf-8') as f:
+            micro = json.load(f)
+        records, names = micronutrient_rows(micro)
+        conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?)", records)
+        conn.executemany("INSERT OR IGNORE INTO names VALUES (?, ?, ?)",
+                         sorted((normalize_key(n), d, p) for n, d, p in names))
+        conn.executemany("INSERT INTO names_fts VALUES (?, ?, ?)", sorted(names))
+        # The small top-level tables travel as JSON next to the metadata
+        for section in ('metadata', 'synonyms', 'micronutrient_tokens', 'nutrient_info'):
+            meta[f'micronutrients.{section}'] = micro.get(section, {})
+        meta['micronutrients.source_hash'] = file_digest(MICRONUTRIENT_SOURCE)
+        counts['micronutrients'] = len(records)
+
+        conn.executemany(
+            "INSERT INTO bundle_meta VALUES (?, ?)",
+            [(key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()]
+        )
+        conn.execute("INSERT INTO names_fts(names_fts) VALUES ('optimize')")
+
+    conn.execute("CREATE INDEX idx_records_key ON records (dataset, key)")
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
+    tmp_path.replace(output)
+    return counts
+
+
+# ============================================================================
+# Loader
+# ============================================================================
+
+class DataBundle:
+    """Read-only, memory-mapped access to an exported bundle"""
+
+    def __init__(self, path: Path = BUNDLE_PATH):
+        path = Path(path).resolve()
+        if not path.exists():
+            raise FileNotFoundError(f"Data bundle not found: {path} (run data_bundle.py --export)")
+        self.path = path
+        self.conn = sqlite3.connect(f"{path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM bundle_meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, dataset: str, position: int) -> Optional[Dict]:
+        """One record by position"""
+        row = self.conn.execute(
+            "SELECT data FROM records WHERE dataset = ? AND position = ?", (dataset, position)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_by_key(self, dataset: str, key: str) -> List[Dict]:
+        """Records with a canonical key (additive id, or micronutrient ingredient name)"""
+        return [json.loads(data) for (data,) in self.conn.execute(
+            "SELECT data FROM records WHERE dataset = ? AND key = ? ORDER BY position", (dataset, key)
+        )]
+
+    def by_e_number(self, code: str, dataset: str = 'comprehensive') -> List[Dict]:
+        """Records listing an E-number ("E330", "e 330")"""
+        return [json.loads(data) for (data,) in self.conn.execute("""
+            SELECT r.data FROM e_numbers e
+            JOIN records r ON r.dataset = e.dataset AND r.position = e.position
+            WHERE e.e_number = ? AND e.dataset = ?
+            ORDER BY r.position
+        """, (normalize_key(code), dataset))]
+
+    def lookup_name(self, name: str, dataset: str = 'comprehensive') -> List[Dict]:
+        """Exact (normalized) name or synonym match"""
+        return [json.loads(data) for (data,) in self.conn.execute("""
+            SELECT r.data FROM names n
+            JOIN records r ON r.dataset = n.dataset AND r.position = n.position
+            WHERE n.name = ? AND n.dataset = ?
+            ORDER BY r.position
+        """, (normalize_key(name), dataset))]
+
+    def search(self, query: str, dataset: Optional[str] = None, limit: int = 20) -> List[Tuple[str, int, str]]:
+        """
+        Full-text prefix search over names and synonyms.
+        Returns (dataset, position, matched name), best matches first.
+        """
+        terms = query.translate(FTS_SPECIALS).split()
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = "SELECT dataset, position, name FROM names_fts WHERE names_fts MATCH ?"
+        params: list = [match]
+        if dataset:
+            sql += " AND dataset = ?"
+            params.append(dataset)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        return [(d, int(p), n) for d, p, n in self.conn.execute(sql, params)]
+
+    def records(self, dataset: str) -> Iterator[Dict]:
+        """Stream a dataset's records in their original order"""
+        for (data,) in self.conn.execute(
+            "SELECT data FROM records WHERE dataset = ? ORDER BY position", (dataset,)
+        ):
+            yield json.loads(data)
+
+    def load_document(self, dataset: str) -> Dict:
+        """Rebuild the original JSON document for a dataset (drop-in for json.load)"""
+        if dataset == 'micronutrients':
+            document = {section: self.meta(f'micronutrients.{section}') or {}
+                        for section in ('metadata', 'synonyms', 'micronutrient_tokens', 'nutrient_info')}
+            document['ingredients'] = {
+                key: json.loads(data) for key, data in self.conn.execute(
+                    "SELECT key, data FROM records WHERE dataset = 'micronutrients' ORDER BY position"
+                )
+            }
+            return document
+        return {'metadata': self.meta(f'{dataset}.metadata') or {}, 'ingredients': list(self.records(dataset))}
+
+    def is_stale(self) -> bool:
+        """True if any source JSON changed since the bundle was exported"""
+        sources = dict(ADDITIVE_SOURCES, micronutrients=MICRONUTRIENT_SOURCE)
+        return any(
+            path.exists() and self.meta(f'{dataset}.source_hash') != file_digest(path)
+            for dataset, path in sources.items()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or query the SQLite data bundle")
+    parser.add_argument("--export", action="store_true", help="Build the bundle from the JSON files")
+    parser.add_argument("--output", default=str(BUNDLE_PATH), help="Bundle path")
+    parser.add_argument("--get", metavar="E_NUMBER", help="Print records for an E-number")
+    parser.add_argument("--search", metavar="TEXT", help="Prefix search names and synonyms")
+    parser.add_argument("--dataset", default=None, help="Limit --search/--get to one dataset")
+    args = parser.parse_args()
+
+    if args.export:
+        print("📦 DATA BUNDLE EXPORT")
+        print("=" * 80)
+        start = time.time()
+        counts = export_bundle(Path(args.output))
+        size = Path(args.output).stat().st_size
+        print(f"✅ {', '.join(f'{n} {d}' for d, n in counts.items())} records "
+              f"-> {args.output} ({size / 1024:.0f} KB) in {time.time() - start:.1f}s")
+        return
+
+    try:
+        bundle = DataBundle(Path(args.output))
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    with bundle:
+        if bundle.is_stale():
+            print("⚠️  Bundle is older than its source JSON - re-run with --export")
+        if args.get:
+            for record in bundle.by_e_number(args.get, args.dataset or 'comprehensive'):
+                print(json.dumps(record, indent=2, ensure_ascii=False))
+        elif args.search:
+            for dataset, position, name in bundle.search(args.search, args.dataset):
+                print(f"   [{dataset}:{position}] {name}")
+        else:
+            parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,32 @@
 """
 Dynamic ChatGPT Knowledge Food Updater
 Uses ChatGPT's full knowledge base to update any food product dynamically
+
+Usage:
+    python dynamic_gpt_updater.py [db_path]             # test batch of 50 products, one at a time
+    python dynamic_gpt_updater.py [db_path] --bulk      # every product needing data, one transaction
 """
 
 import sqlite3
+import argparse
 import json
 import time
 import re
 from typing import Optional, Dict, Tuple, Any
 
+from product_knowledge import KnowledgeMatcher
+
+NUTRITION_FIELDS = ['energy_kcal_100g', 'fat_100g', 'carbs_100g', 'sugar_100g', 'protein_100g', 'salt_100g']
+# Columns read from products and filled from the knowledge base (per-serving values are derived)
+UPDATE_COLUMNS = ['ingredients', 'serving_size'] + NUTRITION_FIELDS
+
 class DynamicGPTUpdater:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
         self.updated_count = 0
         self.error_count = 0
+        self.knowledge = KnowledgeMatcher.load('dynamic')
         
     def query_gpt_for_food(self, product_name: str, brand: str) -> Optional[Dict[str, Any]]:
         """Use ChatGPT reasoning to extract food data from its knowledge base"""
@@ -50,370 +62,14 @@ class DynamicGPTUpdater:
         return clean_name.strip()
     
     def apply_gpt_reasoning(self, product_name: str, brand: str) -> Optional[Dict[str, Any]]:
-        """Apply ChatGPT's reasoning to determine food data"""
+        """Apply ChatGPT's reasoning to determine food data (product_knowledge.json 'dynamic' rulebook)"""
         
         if not product_name:
             return None
-            
-        # Normalize for pattern matching
-        full_product = f"{brand} {product_name}".lower().strip()
-        product_lower = product_name.lower().strip()
-        
-        # === BEVERAGES ===
-        
-        # Soft Drinks - Major Brands
-        if any(term in full_product for term in ['coca cola', 'coke classic', 'coca-cola']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Colour (Caramel E150d), Acid (Phosphoric Acid), Natural Flavourings including Caffeine',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 42, 'fat_100g': 0, 'carbs_100g': 10.6, 'sugar_100g': 10.6, 'protein_100g': 0, 'salt_100g': 0
-            }
-        
-        if any(term in full_product for term in ['pepsi', 'pepsi cola', 'pepsi max']):
-            if 'max' in full_product:
-                return {
-                    'ingredients': 'Carbonated Water, Colour (Caramel E150d), Sweeteners (Aspartame, Acesulfame K), Acid (Phosphoric Acid), Natural Flavourings including Caffeine, Preservative (Potassium Sorbate)',
-                    'serving_size': '330ml',
-                    'energy_kcal_100g': 1, 'fat_100g': 0, 'carbs_100g': 0, 'sugar_100g': 0, 'protein_100g': 0, 'salt_100g': 0.02
-                }
-            else:
-                return {
-                    'ingredients': 'Carbonated Water, Sugar, Colour (Caramel E150d), Acid (Phosphoric Acid), Natural Flavourings including Caffeine',
-                    'serving_size': '330ml',
-                    'energy_kcal_100g': 43, 'fat_100g': 0, 'carbs_100g': 11, 'sugar_100g': 11, 'protein_100g': 0, 'salt_100g': 0.01
-                }
-        
-        if any(term in full_product for term in ['sprite', '7up', 'seven up']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Acid (Citric Acid), Natural Lemon and Lime Flavourings, Sweeteners (Acesulfame K)',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 18, 'fat_100g': 0, 'carbs_100g': 4.5, 'sugar_100g': 4.5, 'protein_100g': 0, 'salt_100g': 0.01
-            }
-        
-        if any(term in full_product for term in ['fanta orange', 'fanta']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Orange Juice from Concentrate (4.5%), Acid (Citric Acid), Natural Orange Flavourings, Preservative (Potassium Sorbate), Antioxidant (Ascorbic Acid), Colour (Beta Carotene)',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 23, 'fat_100g': 0, 'carbs_100g': 5.7, 'sugar_100g': 5.7, 'protein_100g': 0, 'salt_100g': 0
-            }
-        
-        if any(term in full_product for term in ['irn bru', 'irn-bru', 'iron brew']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Acid (Citric Acid), Flavourings (including Caffeine), Preservative (E211), Colours (E102, E110)',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 32, 'fat_100g': 0, 'carbs_100g': 8.3, 'sugar_100g': 8.3, 'protein_100g': 0, 'salt_100g': 0.05
-            }
-        
-        if any(term in full_product for term in ['dr pepper', 'doctor pepper']):
-            return {
-                'ingredients': 'Carbonated Water, Sugar, Colour (Caramel E150d), Acid (Phosphoric Acid), Preservative (Potassium Sorbate), Natural Flavourings including Caffeine',
-                'serving_size': '330ml',
-                'energy_kcal_100g': 38, 'fat_100g': 0, 'carbs_100g': 9.7, 'sugar_100g': 9.7, 'protein_100g': 0, 'salt_100g': 0.01
-            }
-        
-        # Juices
-        if any(term in full_product for term in ['ribena', 'blackcurrant']):
-            return {
-                'ingredients': 'Water, Blackcurrants (36%), Sugar, Vitamin C, Natural Blackcurrant Flavouring, Preservatives (Potassium Sorbate, Sodium Bisulphite)',
-                'serving_size': '250ml',
-                'energy_kcal_100g': 21, 'fat_100g': 0, 'carbs_100g': 5.1, 'sugar_100g': 5.1, 'protein_100g': 0.1, 'salt_100g': 0
-            }
-        
-        if any(term in full_product for term in ['orange juice']):
-            return {
-                'ingredients': 'Orange Juice from Concentrate',
-                'serving_size': '200ml',
-                'energy_kcal_100g': 42, 'fat_100g': 0.2, 'carbs_100g': 8.9, 'sugar_100g': 8.9, 'protein_100g': 0.7, 'salt_100g': 0
-            }
-        
-        if any(term in full_product for term in ['apple juice']):
-            return {
-                'ingredients': 'Apple Juice from Concentrate',
-                'serving_size': '200ml',
-                'energy_kcal_100g': 46, 'fat_100g': 0.1, 'carbs_100g': 11.3, 'sugar_100g': 11.3, 'protein_100g': 0.1, 'salt_100g': 0
-            }
-        
-        # === CONFECTIONERY ===
-        
-        # Chocolate Bars
-        if any(term in full_product for term in ['mars bar', 'mars chocolate']):
-            return {
-                'ingredients': 'Sugar, Glucose Syrup, Milk Powder, Cocoa Butter, Cocoa Mass, Sunflower Oil, Milk Fat, Lactose, Salt, Egg White Powder, Vanilla Extract',
-                'serving_size': '45g',
-                'energy_kcal_100g': 457, 'fat_100g': 16.5, 'carbs_100g': 68, 'sugar_100g': 59.9, 'protein_100g': 4.2, 'salt_100g': 0.24
-            }
-        
-        if any(term in full_product for term in ['snickers']):
-            return {
-                'ingredients': 'Milk Chocolate (Sugar, Cocoa Butter, Chocolate, Skim Milk, Lactose, Milk Fat, Soy Lecithin), Peanuts, Corn Syrup, Sugar, Palm Oil, Salt, Egg Whites',
-                'serving_size': '48g',
-                'energy_kcal_100g': 488, 'fat_100g': 24.8, 'carbs_100g': 56, 'sugar_100g': 47.8, 'protein_100g': 8.2, 'salt_100g': 0.32
-            }
-        
-        if any(term in full_product for term in ['bounty', 'coconut bar']):
-            return {
-                'ingredients': 'Sugar, Desiccated Coconut (21%), Glucose Syrup, Cocoa Mass, Cocoa Butter, Skimmed Milk Powder, Milk Fat, Lactose and Protein from Whey, Salt, Emulsifier (Soya Lecithin), Natural Vanilla Flavouring',
-                'serving_size': '57g',
-                'energy_kcal_100g': 471, 'fat_100g': 25.4, 'carbs_100g': 57.1, 'sugar_100g': 54.6, 'protein_100g': 4, 'salt_100g': 0.23
-            }
         
-        if any(term in full_product for term in ['kit kat', 'kitkat']):
-            return {
-                'ingredients': 'Sugar, Wheat Flour, Cocoa Butter, Milk Powder, Cocoa Mass, Lactose and Protein from Whey, Palm Oil, Milk Fat, Emulsifier (Sunflower Lecithin), Raising Agent (Sodium Bicarbonate), Salt, Natural Vanilla Flavouring',
-                'serving_size': '41.5g',
-                'energy_kcal_100g': 518, 'fat_100g': 26.6, 'carbs_100g': 59.2, 'sugar_100g': 47.9, 'protein_100g': 7.3, 'salt_100g': 0.24
-            }
-        
-        if any(term in full_product for term in ['twix']):
-            return {
-                'ingredients': 'Sugar, Glucose Syrup, Wheat Flour, Palm Oil, Cocoa Butter, Skimmed Milk Powder, Cocoa Mass, Lactose and Protein from Whey, Salt, Fat Reduced Cocoa Powder, Emulsifier (Soya Lecithin), Raising Agent (Sodium Bicarbonate), Natural Vanilla Flavouring',
-                'serving_size': '50g',
-                'energy_kcal_100g': 498, 'fat_100g': 24.9, 'carbs_100g': 62.6, 'sugar_100g': 47.5, 'protein_100g': 4.9, 'salt_100g': 0.24
-            }
-        
-        if any(term in full_product for term in ['dairy milk', 'cadbury milk']):
-            return {
-                'ingredients': 'Milk Chocolate (Sugar, Cocoa Butter, Milk Powder, Cocoa Mass, Emulsifiers (E442, E476), Natural Vanilla Flavouring)',
-                'serving_size': '45g',
-                'energy_kcal_100g': 530, 'fat_100g': 30, 'carbs_100g': 57, 'sugar_100g': 56, 'protein_100g': 7.3, 'salt_100g': 0.24
-            }
-        
-        if any(term in full_product for term in ['toblerone']):
-            return {
-                'ingredients': 'Sugar, Whole Milk Powder, Cocoa Butter, Cocoa Mass, Honey (3%), Milk Fat, Almonds (1.6%), Emulsifier (Soya Lecithin), Egg White, Natural Vanilla Flavouring',
-                'serving_size': '35g',
-                'energy_kcal_100g': 534, 'fat_100g': 29.5, 'carbs_100g': 60.2, 'sugar_100g': 59.3, 'protein_100g': 6.1, 'salt_100g': 0.081
-            }
-        
-        if any(term in full_product for term in ['galaxy', 'galaxy chocolate']):
-            return {
-                'ingredients': 'Sugar, Cocoa Butter, Skimmed Milk Powder, Cocoa Mass, Lactose and Protein from Whey, Palm Fat, Milk Fat, Emulsifier (Soya Lecithin), Vanilla Extract',
-                'serving_size': '42g',
-                'energy_kcal_100g': 544, 'fat_100g': 32.3, 'carbs_100g': 55.4, 'sugar_100g': 54.5, 'protein_100g': 6.4, 'salt_100g': 0.2
-            }
-        
-        if any(term in full_product for term in ['aero', 'aero chocolate']):
-            return {
-                'ingredients': 'Sugar, Dried Whole Milk, Cocoa Butter, Cocoa Mass, Vegetable Fats (Palm, Shea), Milk Fat, Lactose and Protein from Whey, Emulsifier (Sunflower Lecithin), Natural Vanilla Flavouring',
-                'serving_size': '36g',
-                'energy_kcal_100g': 535, 'fat_100g': 31.1, 'carbs_100g': 56.3, 'sugar_100g': 55.5, 'protein_100g': 6.6, 'salt_100g': 0.13
-            }
-        
-        if any(term in full_product for term in ['maltesers']):
-            return {
-                'ingredients': 'Sugar, Cocoa Butter, Dried Skimmed Milk, Glucose Syrup, Barley Malt Extract, Cocoa Mass, Palm Fat, Lactose and Protein from Whey, Milk Fat, Salt, Emulsifier (Soya Lecithin), Raising Agent (Sodium Bicarbonate), Natural Vanilla Flavouring',
-                'serving_size': '37g',
-                'energy_kcal_100g': 497, 'fat_100g': 22, 'carbs_100g': 68, 'sugar_100g': 60, 'protein_100g': 6.2, 'salt_100g': 0.19
-            }
-        
-        # === SNACKS & CRISPS ===
-        
-        if any(term in full_product for term in ['walkers ready salted', 'walkers original']):
-            return {
-                'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Salt',
-                'serving_size': '25g',
-                'energy_kcal_100g': 533, 'fat_100g': 34, 'carbs_100g': 50, 'sugar_100g': 0.5, 'protein_100g': 6.1, 'salt_100g': 1.3
-            }
-        
-        if any(term in full_product for term in ['walkers cheese and onion']):
-            return {
-                'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Cheese & Onion Flavour [Dried Onion, Flavouring, Salt, Cheese Powder, Potassium Chloride, Dried Yeast, Citric Acid]',
-                'serving_size': '25g',
-                'energy_kcal_100g': 530, 'fat_100g': 33, 'carbs_100g': 51, 'sugar_100g': 2.1, 'protein_100g': 6, 'salt_100g': 1.3
-            }
-        
-        if any(term in full_product for term in ['walkers salt and vinegar']):
-            return {
-                'ingredients': 'Potatoes, Vegetable Oils (Sunflower, Rapeseed), Salt & Vinegar Flavour [Salt, Lactose (from Milk), Sodium Diacetate, Malic Acid, Flavouring]',
-                'serving_size': '25g',
-                'energy_kcal_100g': 533, 'fat_100g': 34, 'carbs_100g': 50, 'sugar_100g': 1.1, 'protein_100g': 6.1, 'salt_100g': 1.6
-            }
-        
-        if any(term in full_product for term in ['pringles original', 'pringles ready salted']):
-            return {
-                'ingredients': 'Dehydrated Potatoes, Vegetable Oils (Sunflower, Corn), Rice Flour, Wheat Starch, Corn Flour, Emulsifier (E471), Salt, Colour (Annatto)',
-                'serving_size': '30g',
-                'energy_kcal_100g': 536, 'fat_100g': 34, 'carbs_100g': 49, 'sugar_100g': 0.5, 'protein_100g': 4, 'salt_100g': 1.3
-            }
-        
-        if any(term in full_product for term in ['haribo', 'gummy bears', 'gummy']):
-            return {
-                'ingredients': 'Glucose Syrup, Sugar, Gelatine, Dextrose, Fruit Juice from Concentrate (Apple, Strawberry, Raspberry, Orange, Lemon, Pineapple), Acid (Citric Acid), Fruit and Plant Concentrates, Flavouring, Glazing Agent (Beeswax, Carnauba Wax), Invert Sugar Syrup',
-                'serving_size': '25g',
-                'energy_kcal_100g': 343, 'fat_100g': 0, 'carbs_100g': 77, 'sugar_100g': 46, 'protein_100g': 6.9, 'salt_100g': 0.07
-            }
-        
-        # === CEREALS & BREAKFAST ===
-        
-        if any(term in full_product for term in ['cornflakes', 'corn flakes', 'kelloggs cornflakes']):
-            return {
-                'ingredients': 'Maize, Salt, Sugar, Barley Malt Extract, Vitamins (Vitamin C, Niacin, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Vitamin B12), Iron',
-                'serving_size': '30g',
-                'energy_kcal_100g': 378, 'fat_100g': 0.9, 'carbs_100g': 84, 'sugar_100g': 8, 'protein_100g': 7, 'salt_100g': 1.3
-            }
-        
-        if any(term in full_product for term in ['rice krispies', 'rice crispies']):
-            return {
-                'ingredients': 'Rice, Sugar, Salt, Barley Malt Extract, Vitamins (Vitamin C, Niacin, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Vitamin B12), Iron',
-                'serving_size': '30g',
-                'energy_kcal_100g': 382, 'fat_100g': 1, 'carbs_100g': 87, 'sugar_100g': 10, 'protein_100g': 6, 'salt_100g': 1
-            }
-        
-        if any(term in full_product for term in ['cheerios']):
-            return {
-                'ingredients': 'Whole Grain Oats (70%), Sugar, Oat Bran, Salt, Tripotassium Phosphate, Vitamins (Vitamin E, Niacin, Pantothenic Acid, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Biotin, Vitamin B12), Iron',
-                'serving_size': '30g',
-                'energy_kcal_100g': 375, 'fat_100g': 3.5, 'carbs_100g': 73, 'sugar_100g': 16, 'protein_100g': 8, 'salt_100g': 0.75
-            }
-        
-        if any(term in full_product for term in ['shreddies']):
-            return {
-                'ingredients': 'Whole Grain Wheat (97%), Sugar, Salt, Vitamins (Vitamin C, Niacin, Iron, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Vitamin B12)',
-                'serving_size': '40g',
-                'energy_kcal_100g': 366, 'fat_100g': 2, 'carbs_100g': 68, 'sugar_100g': 15, 'protein_100g': 11, 'salt_100g': 0.18
-            }
-        
-        if any(term in full_product for term in ['bran flakes']):
-            return {
-                'ingredients': 'Wheat Bran (53%), Wheat, Sugar, Salt, Barley Malt Extract, Vitamins (Vitamin C, Niacin, Iron, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Vitamin B12)',
-                'serving_size': '40g',
-                'energy_kcal_100g': 320, 'fat_100g': 1.8, 'carbs_100g': 48, 'sugar_100g': 22, 'protein_100g': 14, 'salt_100g': 0.90
-            }
-        
-        if any(term in full_product for term in ['coco pops', 'cocoa pops']):
-            return {
-                'ingredients': 'Rice, Sugar, Fat Reduced Cocoa Powder, Salt, Cocoa Mass, Barley Malt Extract, Flavouring, Vitamins (Vitamin C, Niacin, Iron, Vitamin B6, Riboflavin, Thiamin, Folic Acid, Vitamin B12)',
-                'serving_size': '30g',
-                'energy_kcal_100g': 387, 'fat_100g': 2.5, 'carbs_100g': 84, 'sugar_100g': 30, 'protein_100g': 4.5, 'salt_100g': 0.18
-            }
-        
-        # === SPREADS & JAMS ===
-        
-        if any(term in full_product for term in ['nutella']):
-            return {
-                'ingredients': 'Sugar, Palm Oil, Hazelnuts (13%), Skimmed Milk Powder (8.7%), Fat-Reduced Cocoa (7.4%), Emulsifier (Lecithins) (Soya), Vanillin',
-                'serving_size': '15g',
-                'energy_kcal_100g': 539, 'fat_100g': 30.9, 'carbs_100g': 57.5, 'sugar_100g': 56.3, 'protein_100g': 6.3, 'salt_100g': 0.107
-            }
-        
-        if any(term in full_product for term in ['marmite']):
-            return {
-                'ingredients': 'Yeast Extract, Salt, Vegetable Extract, Niacin, Thiamin, Riboflavin, Folic Acid, Vitamin B12',
-                'serving_size': '4g',
-                'energy_kcal_100g': 274, 'fat_100g': 0.6, 'carbs_100g': 24, 'sugar_100g': 0.9, 'protein_100g': 39.7, 'salt_100g': 10.9
-            }
-        
-        if any(term in full_product for term in ['strawberry jam']):
-            return {
-                'ingredients': 'Sugar, Strawberries, Gelling Agent (Pectin), Acid (Citric Acid)',
-                'serving_size': '15g',
-                'energy_kcal_100g': 261, 'fat_100g': 0, 'carbs_100g': 65.6, 'sugar_100g': 65.6, 'protein_100g': 0.4, 'salt_100g': 0.01
-            }
-        
-        # === DAIRY PRODUCTS ===
-        
-        if any(term in full_product for term in ['philadelphia', 'cream cheese']):
-            return {
-                'ingredients': 'Soft Cheese (Milk), Water, Milk Proteins, Emulsifying Salt (Sodium Polyphosphate), Preservative (Sorbic Acid)',
-                'serving_size': '30g',
-                'energy_kcal_100g': 253, 'fat_100g': 24.9, 'carbs_100g': 3.2, 'sugar_100g': 3.2, 'protein_100g': 5.5, 'salt_100g': 0.8
-            }
-        
-        if any(term in full_product for term in ['lurpak', 'butter']):
-            return {
-                'ingredients': 'Butter (Milk), Salt',
-                'serving_size': '10g',
-                'energy_kcal_100g': 737, 'fat_100g': 81, 'carbs_100g': 0.7, 'sugar_100g': 0.7, 'protein_100g': 0.5, 'salt_100g': 1.2
-            }
-        
-        # === HOT BEVERAGES ===
-        
-        if any(term in full_product for term in ['pg tips', 'black tea', 'english breakfast tea']):
-            return {
-                'ingredients': 'Black Tea',
-                'serving_size': '200ml',
-                'energy_kcal_100g': 1, 'fat_100g': 0, 'carbs_100g': 0.3, 'sugar_100g': 0, 'protein_100g': 0.1, 'salt_100g': 0
-            }
-        
-        if any(term in full_product for term in ['nescafe', 'instant coffee']):
-            return {
-                'ingredients': 'Instant Coffee',
-                'serving_size': '200ml',
-                'energy_kcal_100g': 2, 'fat_100g': 0, 'carbs_100g': 0.3, 'sugar_100g': 0, 'protein_100g': 0.3, 'salt_100g': 0.05
-            }
-        
-        # === READY MEALS & FROZEN ===
-        
-        if any(term in full_product for term in ['birds eye fish fingers', 'fish fingers']):
-            return {
-                'ingredients': 'Cod (58%), Breadcrumbs (Wheat Flour, Water, Yeast, Salt), Rapeseed Oil, Wheat Flour, Water, Salt',
-                'serving_size': '4 fingers (112g)',
-                'energy_kcal_100g': 214, 'fat_100g': 8.2, 'carbs_100g': 17.9, 'sugar_100g': 1.1, 'protein_100g': 17.9, 'salt_100g': 0.88
-            }
-        
-        if any(term in full_product for term in ['mccain chips', 'oven chips']):
-            return {
-                'ingredients': 'Potatoes (96%), Rapeseed Oil, Dextrose, Salt',
-                'serving_size': '100g',
-                'energy_kcal_100g': 162, 'fat_100g': 4.2, 'carbs_100g': 26.9, 'sugar_100g': 0.3, 'protein_100g': 2.7, 'salt_100g': 0.53
-            }
-        
-        # === BREAD & BAKERY ===
-        
-        if any(term in full_product for term in ['hovis', 'white bread', 'medium sliced']):
-            return {
-                'ingredients': 'Wheat Flour (with added Calcium, Iron, Niacin, Thiamin), Water, Yeast, Salt, Soya Flour, Emulsifiers (E472e, E481), Flour Treatment Agent (E300), Preservatives (E282, E200)',
-                'serving_size': '1 slice (36g)',
-                'energy_kcal_100g': 265, 'fat_100g': 3, 'carbs_100g': 45, 'sugar_100g': 3, 'protein_100g': 9, 'salt_100g': 1
-            }
-        
-        # === ICE CREAM ===
-        
-        if any(term in full_product for term in ['ben and jerry', 'ben & jerry']):
-            return {
-                'ingredients': 'Cream (Milk), Skim Milk, Liquid Sugar, Water, Egg Yolks, Sugar, Guar Gum, Carrageenan, Natural Vanilla Flavour',
-                'serving_size': '100g',
-                'energy_kcal_100g': 216, 'fat_100g': 11.5, 'carbs_100g': 24.4, 'sugar_100g': 22.9, 'protein_100g': 3.8, 'salt_100g': 0.13
-            }
-        
-        if any(term in full_product for term in ['häagen', 'haagen', 'haagen dazs']):
-            return {
-                'ingredients': 'Fresh Cream (39%), Skim Milk, Sugar, Egg Yolk (9%), Vanilla Extract',
-                'serving_size': '100g',
-                'energy_kcal_100g': 244, 'fat_100g': 15.3, 'carbs_100g': 21.4, 'sugar_100g': 21.2, 'protein_100g': 4.4, 'salt_100g': 0.13
-            }
-        
-        # === BISCUITS & COOKIES ===
-        
-        if any(term in full_product for term in ['digestive', 'mcvities digestive']):
-            return {
-                'ingredients': 'Wheat Flour, Vegetable Oil (Palm), Wholemeal Wheat Flour (16%), Sugar, Partially Inverted Sugar Syrup, Raising Agents (Sodium Bicarbonate, Malic Acid, Ammonium Bicarbonate), Salt',
-                'serving_size': '2 biscuits (30g)',
-                'energy_kcal_100g': 486, 'fat_100g': 20.9, 'carbs_100g': 67.6, 'sugar_100g': 16.4, 'protein_100g': 7.1, 'salt_100g': 1.08
-            }
-        
-        if any(term in full_product for term in ['jammy dodgers', 'jammie dodgers']):
-            return {
-                'ingredients': 'Wheat Flour, Sugar, Vegetable Oils (Palm, Rapeseed), Glucose-Fructose Syrup, Raspberry Jam (9%), Raising Agents, Salt, Natural Flavouring',
-                'serving_size': '2 biscuits (26g)',
-                'energy_kcal_100g': 495, 'fat_100g': 20.2, 'carbs_100g': 73.8, 'sugar_100g': 30.1, 'protein_100g': 5.3, 'salt_100g': 0.58
-            }
-        
-        # === PASTA & RICE ===
-        
-        if any(term in full_product for term in ['spaghetti', 'pasta']):
-            return {
-                'ingredients': 'Durum Wheat Semolina',
-                'serving_size': '75g',
-                'energy_kcal_100g': 348, 'fat_100g': 1.8, 'carbs_100g': 70.9, 'sugar_100g': 3.2, 'protein_100g': 12, 'salt_100g': 0.013
-            }
-        
-        if any(term in full_product for term in ['basmati rice', 'long grain rice']):
-            return {
-                'ingredients': 'Long Grain Rice',
-                'serving_size': '75g',
-                'energy_kcal_100g': 349, 'fat_100g': 1.3, 'carbs_100g': 72.9, 'sugar_100g': 0.2, 'protein_100g': 8.9, 'salt_100g': 0.004
-            }
+        rule = self.knowledge.match(product_name, brand)
+        if rule:
+            return dict(rule.data)
         
         # Check for generic categories if no specific match found
         return self.get_generic_data(product_name, brand)
@@ -505,35 +161,16 @@ class DynamicGPTUpdater:
             self.error_count += 1
             return False
         
-        # Prepare updates
-        updates = {}
-        
-        # Update ingredients if missing or poor quality
-        if gpt_data.get('ingredients') and (not current_data.get('ingredients') or len(current_data.get('ingredients', '')) < 20):
-            updates['ingredients'] = gpt_data['ingredients']
-            print(f"   ✅ Updated ingredients: {gpt_data['ingredients'][:60]}...")
-        
-        # Update serving size if missing
-        if gpt_data.get('serving_size') and (not current_data.get('serving_size') or current_data.get('serving_size') == '100g'):
-            updates['serving_size'] = gpt_data['serving_size']
-            print(f"   ✅ Updated serving size: {gpt_data['serving_size']}")
-        
-        # Update nutrition (per 100g) if missing
-        nutrition_fields = ['energy_kcal_100g', 'fat_100g', 'carbs_100g', 'sugar_100g', 'protein_100g', 'salt_100g']
-        for field in nutrition_fields:
-            if gpt_data.get(field) is not None and current_data.get(field) is None:
-                updates[field] = gpt_data[field]
-                print(f"   ✅ Updated {field}: {gpt_data[field]}")
-        
-        # Calculate per-serving nutrition if we have serving size
-        serving_size = updates.get('serving_size') or current_data.get('serving_size')
-        if serving_size:
-            nutrition_100g = {k: updates.get(k) or current_data.get(k) for k in nutrition_fields}
-            per_serving = self.calculate_per_serving_nutrition(serving_size, nutrition_100g)
-            updates.update(per_serving)
-            
-            if per_serving:
-                print(f"   ✅ Calculated per-serving nutrition")
+        updates = self.prepare_updates(gpt_data, current_data)
+        for column, value in updates.items():
+            if column == 'ingredients':
+                print(f"   ✅ Updated ingredients: {value[:60]}...")
+            elif column == 'serving_size':
+                print(f"   ✅ Updated serving size: {value}")
+            elif column in NUTRITION_FIELDS:
+                print(f"   ✅ Updated {column}: {value}")
+        if any(column not in UPDATE_COLUMNS for column in updates):
+            print(f"   ✅ Calculated per-serving nutrition")
         
         # Apply updates to database
         if updates:
@@ -613,6 +250,72 @@ class DynamicGPTUpdater:
         
         return self.updated_count, self.error_count
     
+    def prepare_updates(self, gpt_data: Dict[str, Any], current_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields to write for this product (shared by update_product_with_gpt and update_all_products)"""
+        updates = {}
+        
+        if gpt_data.get('ingredients') and (not current_data.get('ingredients') or len(current_data.get('ingredients', '')) < 20):
+            updates['ingredients'] = gpt_data['ingredients']
+        
+        if gpt_data.get('serving_size') and (not current_data.get('serving_size') or current_data.get('serving_size') == '100g'):
+            updates['serving_size'] = gpt_data['serving_size']
+        
+        for field in NUTRITION_FIELDS:
+            if gpt_data.get(field) is not None and current_data.get(field) is None:
+                updates[field] = gpt_data[field]
+        
+        serving_size = updates.get('serving_size') or current_data.get('serving_size')
+        if serving_size:
+            nutrition_100g = {k: updates.get(k) or current_data.get(k) for k in NUTRITION_FIELDS}
+            updates.update(self.calculate_per_serving_nutrition(serving_size, nutrition_100g))
+        
+        return updates
+    
+    def update_all_products(self) -> Tuple[int, int]:
+        """
+        Apply the knowledge rulebook to every product that needs data in one
+        pass: one table read, one automaton scan per distinct product, and one
+        transaction of executemany UPDATEs (grouped by the columns they set)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, name, brand, ingredients, serving_size,
+                   energy_kcal_100g, fat_100g, carbs_100g, sugar_100g, protein_100g, salt_100g
+            FROM products 
+            WHERE ingredients IS NULL OR LENGTH(ingredients) < 20 
+               OR serving_size IS NULL OR serving_size = '' OR serving_size = '100g'
+               OR energy_kcal_100g IS NULL
+        """)
+        products = cursor.fetchall()
+        
+        print(f"🧠 DYNAMIC GPT UPDATER (BULK) - Matching {len(products)} products")
+        print("=" * 60)
+        
+        names = ((self.clean_product_name(row[1], row[2] or ""), row[2] or "") for row in products)
+        
+        grouped: Dict[Tuple[str, ...], list] = {}
+        matched = 0
+        for row, rule in zip(products, self.knowledge.match_all(names)):
+            if rule is None:
+                continue
+            matched += 1
+            updates = self.prepare_updates(rule.data, dict(zip(UPDATE_COLUMNS, row[3:])))
+            if updates:
+                key = tuple(updates)
+                grouped.setdefault(key, []).append(tuple(updates.values()) + (row[0],))
+        
+        with self.conn:
+            for key, values in grouped.items():
+                set_clause = ', '.join(f"{column} = ?" for column in key)
+                self.conn.executemany(f"UPDATE products SET {set_clause} WHERE id = ?", values)
+        
+        updated = sum(len(values) for values in grouped.values())
+        self.updated_count += updated
+        self.error_count += len(products) - updated
+        print(f"✅ {matched} products matched the knowledge base, {updated} updated")
+        
+        return self.updated_count, self.error_count
+    
     def get_statistics(self) -> Dict:
         """Get update statistics"""
         cursor = self.conn.cursor()
@@ -643,11 +346,16 @@ class DynamicGPTUpdater:
         self.conn.close()
 
 def main():
+    parser = argparse.ArgumentParser(description="Fill product data from the knowledge rulebook")
+    parser.add_argument("db_path", nargs="?", default="/Users/aaronkeen/Documents/Food database/Tesco/uk_foods.db")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Update every product that needs data in one pass (update_all_products)")
+    args = parser.parse_args()
+    
     print("🧠 DYNAMIC CHATGPT KNOWLEDGE UPDATER")
     print("=" * 50)
     
-    db_path = "/Users/aaronkeen/Documents/Food database/Tesco/uk_foods.db"
-    updater = DynamicGPTUpdater(db_path)
+    updater = DynamicGPTUpdater(args.db_path)
     
     try:
         # Get initial stats
@@ -659,8 +367,11 @@ def main():
         print(f"   With nutrition: {initial_stats['with_nutrition']}")
         print()
         
-        # Process products - smaller test batch
-        updated, errors = updater.update_products_batch(batch_size=10, max_products=50)
+        if args.bulk:
+            updated, errors = updater.update_all_products()
+        else:
+            # Process products - smaller test batch
+            updated, errors = updater.update_products_batch(batch_size=10, max_products=50)
         
         # Final stats
         final_stats = updater.get_statistics()
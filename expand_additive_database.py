@@ -3,6 +3,7 @@
 Expand the additives database with comprehensive coverage of common additives
 """
 
+import copy
 import json
 from typing import Dict, List
 
@@ -588,16 +589,10 @@ MISSING_ADDITIVES = [
     }
 ]
 
-def expand_database(input_path: str, output_path: str):
-    """Add missing additives to database"""
-
-    # Load existing database
-    print(f"Loading existing database from {input_path}...")
-    db = load_database(input_path)
+def add_missing_additives(db: Dict) -> int:
+    """Add MISSING_ADDITIVES not already in a loaded database; returns count added"""
     existing_ingredients = db['ingredients']
 
-    print(f"Current database has {len(existing_ingredients)} ingredients")
-
     # Create lookup of existing names (lowercased for comparison)
     existing_names = {ing['name'].lower() for ing in existing_ingredients}
 
@@ -605,7 +600,7 @@ def expand_database(input_path: str, output_path: str):
     added_count = 0
     for new_ing in MISSING_ADDITIVES:
         if new_ing['name'].lower() not in existing_names:
-            existing_ingredients.append(new_ing)
+            existing_ingredients.append(copy.deepcopy(new_ing))
             added_count += 1
             print(f"✅ Added: {new_ing['name']}")
         else:
@@ -619,6 +614,20 @@ def expand_database(input_path: str, output_path: str):
     db['metadata']['version'] = '2025.5-unified-consolidated-expanded'
     db['metadata']['description'] = 'Comprehensive database of food additives and ultra-processed ingredients with complete coverage of common ingredients'
 
+    return added_count
+
+def expand_database(input_path: str, output_path: str):
+    """Add missing additives to database"""
+
+    # Load existing database
+    print(f"Loading existing database from {input_path}...")
+    db = load_database(input_path)
+    existing_ingredients = db['ingredients']
+
+    print(f"Current database has {len(existing_ingredients)} ingredients")
+
+    added_count = add_missing_additives(db)
+
     # Save
     print(f"\nSaving expanded database to {output_path}...")
     with open(output_path, 'w', encoding='utf-8') as f:
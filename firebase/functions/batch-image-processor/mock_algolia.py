@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Algolia endpoints process_images.py uses
+(/1/indexes/<index>/browse and /1/indexes/<index>/query), so the
+export step can be run and checked offline.
+
+Usage:
+    python mock_algolia.py --generate 5000           # synthetic records
+    python mock_algolia.py --fixture indices.json    # {"index": [records]}
+
+    ALGOLIA_HOST=http://localhost:8999 python process_images.py --test 10
+"""
+
+import re
+import json
+import random
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+INDEX_PATH = re.compile(r"^/1/indexes/([^/]+)/(browse|query)$")
+
+INDICES = {}
+
+
+def generate_indices(per_index, index_names, overlap=0.2, seed=42):
+    """Synthetic records with some barcodes shared across indices."""
+    rng = random.Random(seed)
+    shared = [f"50{rng.randrange(10**10, 10**11)}" for _ in range(int(per_index * overlap))]
+    indices = {}
+    for index_name in index_names:
+        records = []
+        for i in range(per_index):
+            barcode = shared[i] if i < len(shared) else f"50{rng.randrange(10**10, 10**11)}"
+            records.append({
+                "objectID": f"{index_name}-{i}",
+                "barcode": barcode if rng.random() > 0.1 else None,
+                "name": f"Product {i}",
+                "brandName": f"Brand {i % 50}",
+                "imageUrl": None,
+            })
+        indices[index_name] = records
+    return indices
+
+
+class MockAlgoliaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        match = INDEX_PATH.match(self.path)
+        if not match or match.group(1) not in INDICES:
+            return self.send_json(404, {"message": "Index does not exist"})
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        records = INDICES[match.group(1)]
+
+        if match.group(2) == "browse":
+            # The cursor is just the offset of the next page
+            offset = int(body.get("cursor", 0))
+            hits_per_page = int(body.get("hitsPerPage", 1000))
+            hits = records[offset:offset + hits_per_page]
+            result = {"hits": hits, "nbHits": len(records)}
+            if offset + hits_per_page < len(records):
+                result["cursor"] = str(offset + hits_per_page)
+        else:
+            hits_per_page = int(body.get("hitsPerPage", 20))
+            page = int(body.get("page", 0))
+            hits = records[page * hits_per_page:(page + 1) * hits_per_page]
+            result = {
+                "hits": hits,
+                "page": page,
+                "nbHits": len(records),
+                "nbPages": -(-len(records) // hits_per_page),
+            }
+
+        self.send_json(200, result)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    from process_images import ALGOLIA_INDICES
+
+    parser = argparse.ArgumentParser(description="Mock Algolia server for offline runs")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--fixture", help="JSON file of {index_name: [records]}")
+    parser.add_argument("--generate", type=int, metavar="N", default=1000,
+                        help="Generate N synthetic records per index (ignored with --fixture)")
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture) as f:
+            INDICES.update(json.load(f))
+    else:
+        INDICES.update(generate_indices(args.generate, ALGOLIA_INDICES))
+
+    print(f"Mock Algolia on http://localhost:{args.port} "
+          f"({sum(len(r) for r in INDICES.values())} records in {len(INDICES)} indices)")
+    ThreadingHTTPServer(("localhost", args.port), MockAlgoliaHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
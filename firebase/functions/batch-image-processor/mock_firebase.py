@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+In-memory fakes of the Firebase Storage and Firestore calls
+process_images.py makes (bucket.blob().upload_from_filename/make_public,
+collection().document().update, batch().update/commit, get_all), so the
+upload step can be run and checked offline.
+
+The Firestore fake keeps the behaviour the batching relies on: a WriteBatch
+holds at most 500 writes, commits atomically, and an update of a missing
+document fails (the whole batch, when batched).
+
+Usage:
+    python mock_firebase.py --check                  # upload step against the fakes
+    python mock_firebase.py --check --images 3000 --missing 5 --fail-uploads 20
+"""
+
+import sys
+import shutil
+import tempfile
+import argparse
+import threading
+from pathlib import Path
+
+MAX_BATCH_WRITES = 500
+
+
+class NotFound(Exception):
+    pass
+
+
+# ============================================================================
+# Storage
+# ============================================================================
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.public_url = None
+
+    def upload_from_filename(self, filename, content_type=None):
+        if self.name in self.bucket.fail_paths:
+            raise IOError(f"simulated upload failure for {self.name}")
+        with open(filename, "rb") as f:
+            data = f.read()
+        with self.bucket.lock:
+            self.bucket.objects[self.name] = (data, content_type)
+            self.bucket.upload_count += 1
+
+    def make_public(self):
+        self.public_url = f"https://storage.googleapis.com/{self.bucket.name}/{self.name}"
+
+
+class FakeBucket:
+    def __init__(self, name="fake-bucket", fail_paths=()):
+        self.name = name
+        self.objects = {}
+        self.upload_count = 0
+        self.fail_paths = set(fail_paths)
+        self.lock = threading.Lock()
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+
+class FakeStorage:
+    """Stands in for firebase_admin.storage"""
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name=None):
+        return self._bucket
+
+
+# ============================================================================
+# Firestore
+# ============================================================================
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.key = (collection, doc_id)
+        self.path = f"{collection}/{doc_id}"
+
+    def update(self, fields):
+        with self.db.lock:
+            self.db.apply([(self.key, fields)])
+            self.db.single_updates += 1
+
+
+class FakeSnapshot:
+    def __init__(self, reference, exists):
+        self.reference = reference
+        self.exists = exists
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, self.name, doc_id)
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def update(self, reference, fields):
+        self.writes.append((reference.key, fields))
+
+    def commit(self):
+        self.db.attempted_batch_sizes.append(len(self.writes))
+        if len(self.writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"maximum {MAX_BATCH_WRITES} writes allowed per request, got {len(self.writes)}")
+        with self.db.lock:
+            self.db.apply(self.writes)
+            self.db.batch_sizes.append(len(self.writes))
+
+
+class FakeFirestore:
+    """Stands in for the client firebase_admin.firestore.client() returns"""
+
+    def __init__(self, documents=None):
+        self.documents = {path: dict(fields) for path, fields in (documents or {}).items()}
+        self.batch_sizes = []
+        self.attempted_batch_sizes = []
+        self.single_updates = 0
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references):
+        with self.lock:
+            self.reads += len(references)
+            return [FakeSnapshot(ref, ref.key in self.documents) for ref in references]
+
+    def apply(self, writes):
+        """All writes or none, like a Firestore commit"""
+        missing = [path for path, _ in writes if path not in self.documents]
+        if missing:
+            raise NotFound(f"No document to update: {'/'.join(missing[0])}")
+        for path, fields in writes:
+            self.documents[path].update(fields)
+
+
+class FakeFirestoreModule:
+    """Stands in for firebase_admin.firestore"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def client(self):
+        return self._db
+
+
+def install(module, bucket, db):
+    """Point process_images (module) at the fakes"""
+    module.storage = FakeStorage(bucket)
+    module.firestore = FakeFirestoreModule(db)
+    module.init_firebase = lambda: True
+
+
+# ============================================================================
+# Check
+# ============================================================================
+
+def run_check(images, missing, fail_uploads):
+    import json
+    import process_images as pi
+
+    work = Path(tempfile.mkdtemp(prefix="mock_firebase_"))
+    pi.WORK_DIR = work
+    pi.CHECKPOINT_FILE = work / "checkpoint.db"
+    pi.LEGACY_CHECKPOINT_FILE = work / "checkpoint.json"
+    pi.RESULTS_FILE = work / "results.json"
+    cleaned = work / "cleaned"
+    cleaned.mkdir()
+
+    collections = list(pi.INDEX_TO_COLLECTION.items())
+    items, documents = [], {}
+    for i in range(images):
+        index_name, collection = collections[i % len(collections)]
+        barcode = f"50{i:011d}"
+        path = cleaned / f"{barcode}.png"
+        path.write_bytes(barcode.encode())
+        items.append({"barcode": barcode, "objectID": f"obj-{i}", "sourceIndex": index_name,
+                      "localCleanedPath": str(path)})
+        if collection:
+            documents[(collection, f"obj-{i}")] = {"imageUrl": None}
+    with_docs = [item for item in items if pi.INDEX_TO_COLLECTION[item["sourceIndex"]]]
+    for item in with_docs[:missing]:
+        del documents[(pi.INDEX_TO_COLLECTION[item["sourceIndex"]], item["objectID"])]
+    with open(pi.RESULTS_FILE, "w") as f:
+        json.dump({"success": items}, f)
+
+    failing = {f"food-images/cleaned/{item['barcode']}.png" for item in items[-fail_uploads:]} if fail_uploads else set()
+    bucket = FakeBucket(fail_paths=failing)
+    db = FakeFirestore(documents)
+    install(pi, bucket, db)
+
+    problems = []
+
+    def expect(condition, message):
+        print(f"   {'✅' if condition else '❌'} {message}")
+        if not condition:
+            problems.append(message)
+
+    def updated_docs():
+        return sum(1 for fields in db.documents.values() if fields.get("imageUrl"))
+
+    doc_barcodes = {item["barcode"] for item in with_docs}
+
+    def upload_rows():
+        """(uploads logged, uploads whose Firestore document is still to be updated)"""
+        conn = pi.open_checkpoint()
+        rows = conn.execute("SELECT barcode, firestore_updated FROM uploads").fetchall()
+        conn.close()
+        return len(rows), sum(1 for barcode, updated in rows if barcode in doc_barcodes and not updated)
+
+    def check_batches():
+        """Every batch commit attempted, failed ones included, and no per-document fallback"""
+        largest = max(db.attempted_batch_sizes, default=0)
+        expect(largest <= MAX_BATCH_WRITES, f"every batch within {MAX_BATCH_WRITES} writes (largest {largest})")
+        expect(db.single_updates == 0, f"no per-document updates (got {db.single_updates})")
+
+    uploadable = images - len(failing)
+    print(f"\nRun 1: {images} images, {missing} missing documents, {len(failing)} failing uploads")
+    pi.upload_results()
+    expect(bucket.upload_count == uploadable, f"{uploadable} images uploaded (got {bucket.upload_count})")
+    expected_docs = len([item for item in with_docs[missing:]
+                         if f"food-images/cleaned/{item['barcode']}.png" not in failing])
+    expect(updated_docs() == expected_docs, f"{expected_docs} documents updated (got {updated_docs()})")
+    check_batches()
+    logged, pending = upload_rows()
+    expect(logged == uploadable, f"every upload logged in checkpoint.db ({logged})")
+
+    print("\nRun 2: resume (missing documents still missing, failed uploads now succeed)")
+    bucket.fail_paths.clear()
+    before = bucket.upload_count
+    pi.upload_results()
+    expect(bucket.upload_count - before == len(failing),
+           f"only the {len(failing)} failed images re-uploaded (got {bucket.upload_count - before})")
+    logged, pending = upload_rows()
+    expect(pending == missing, f"{missing} uploads still waiting for their document (got {pending})")
+    expect(logged == images, f"all {images} uploads logged (got {logged})")
+    check_batches()
+
+    print("\nRun 3: missing documents created, pending updates retried")
+    for item in with_docs[:missing]:
+        documents_path = (pi.INDEX_TO_COLLECTION[item["sourceIndex"]], item["objectID"])
+        db.documents[documents_path] = {"imageUrl": None}
+    before = bucket.upload_count
+    pi.upload_results()
+    logged, pending = upload_rows()
+    expect(bucket.upload_count == before, "nothing re-uploaded")
+    expect(pending == 0 and updated_docs() == len(with_docs), f"all {len(with_docs)} documents updated")
+    check_batches()
+
+    if problems:
+        print(f"\n{len(problems)} checks failed (work dir kept: {work})")
+        return False
+    shutil.rmtree(work)
+    print("\nAll checks passed")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Firebase Storage/Firestore for offline upload runs")
+    parser.add_argument("--check", action="store_true", help="Run the upload step against the fakes")
+    parser.add_argument("--images", type=int, default=1200)
+    parser.add_argument("--missing", type=int, default=3, help="Firestore documents that do not exist")
+    parser.add_argument("--fail-uploads", type=int, default=10, help="Uploads that fail on the first run")
+    args = parser.parse_args()
+
+    if not args.check:
+        parser.print_help()
+        return
+    sys.exit(0 if run_check(args.images, args.missing, args.fail_uploads) else 1)
+
+
+if __name__ == "__main__":
+    main()
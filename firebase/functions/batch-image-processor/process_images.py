@@ -12,14 +12,20 @@ Usage:
     python process_images.py --test 10       # Test with 10 images
     python process_images.py --all           # Process all images
     python process_images.py --resume        # Resume from last checkpoint
+    python process_images.py --build-off-index openfoodfacts-products.jsonl.gz
 """
 
 import os
 import sys
+import csv
+import gzip
 import json
 import time
+import sqlite3
 import argparse
 import hashlib
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -45,6 +51,11 @@ except ImportError:
 ALGOLIA_APP_ID = "WK0TIF84M2"
 ALGOLIA_API_KEY = "577cc4ee3fed660318917bbb54abfb2e"  # Search key
 
+# Override to point at a local mock (see mock_algolia.py) for offline runs
+ALGOLIA_HOST = os.environ.get("ALGOLIA_HOST", f"https://{ALGOLIA_APP_ID}-dsn.algolia.net")
+
+ALGOLIA_ATTRIBUTES = ["objectID", "barcode", "gtin", "ean", "name", "brandName", "imageUrl"]
+
 ALGOLIA_INDICES = [
     "verified_foods",
     "foods",
@@ -58,6 +69,9 @@ ALGOLIA_INDICES = [
     "generic_database",
 ]
 
+# Earlier indices win when the same barcode appears in several
+INDEX_PRIORITY = {name: rank for rank, name in enumerate(ALGOLIA_INDICES)}
+
 # Index to Firestore collection mapping
 INDEX_TO_COLLECTION = {
     "verified_foods": "verifiedFoods",
@@ -76,17 +90,31 @@ INDEX_TO_COLLECTION = {
 OFF_API_BASE = "https://world.openfoodfacts.org/api/v2/product"
 OFF_UK_API_BASE = "https://uk.openfoodfacts.org/api/v2/product"
 
+# Only ask OFF for (and cache) the fields image selection needs
+OFF_FIELDS = ["code", "product_name", "brands", "selected_images", "image_front_url", "image_url"]
+
 # Directories
 SCRIPT_DIR = Path(__file__).parent
 WORK_DIR = SCRIPT_DIR / "work"
 ORIGINALS_DIR = WORK_DIR / "originals"
 CLEANED_DIR = WORK_DIR / "cleaned"
-CHECKPOINT_FILE = WORK_DIR / "checkpoint.json"
+CHECKPOINT_FILE = WORK_DIR / "checkpoint.db"
+LEGACY_CHECKPOINT_FILE = WORK_DIR / "checkpoint.json"
 RESULTS_FILE = WORK_DIR / "results.json"
+OFF_INDEX_FILE = WORK_DIR / "off_index.db"
+SNAPSHOT_FILE = WORK_DIR / "algolia_snapshot.jsonl"
+
+# Long edge (px) of the proxy rembg segments on; the mask is upsampled back
+# to full resolution. 0 = segment the full-res image.
+PROXY_MAX_EDGE = 1024
 
 # Firebase Storage bucket
 STORAGE_BUCKET = "nutrasafe-705c7.appspot.com"
 
+# Parallel Storage uploads, and Firestore's per-batch write limit
+UPLOAD_WORKERS = 16
+FIRESTORE_BATCH_SIZE = 500
+
 # ============================================================================
 # Helpers
 # ============================================================================
@@ -97,17 +125,101 @@ def setup_directories():
     ORIGINALS_DIR.mkdir(exist_ok=True)
     CLEANED_DIR.mkdir(exist_ok=True)
 
-def load_checkpoint():
-    """Load processing checkpoint."""
-    if CHECKPOINT_FILE.exists():
-        with open(CHECKPOINT_FILE) as f:
-            return json.load(f)
-    return {"processed": [], "failed": [], "last_index": 0}
+def open_checkpoint():
+    """
+    Open the checkpoint log: one row per barcode with its status
+    ('processed' or 'failed'), the stage it reached and timestamps.
+
+    Each update is a single-row upsert, so checkpointing costs the same at
+    100 barcodes as at 100k. A legacy checkpoint.json is imported once.
+    """
+    is_new = not CHECKPOINT_FILE.exists()
+    conn = sqlite3.connect(str(CHECKPOINT_FILE))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoint (
+            barcode TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoint_stage ON checkpoint (stage)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            barcode TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            firestore_updated INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+    """)
+
+    if is_new and LEGACY_CHECKPOINT_FILE.exists():
+        with open(LEGACY_CHECKPOINT_FILE) as f:
+            legacy = json.load(f)
+        now = datetime.now().isoformat(timespec="seconds")
+        conn.executemany(
+            "INSERT OR IGNORE INTO checkpoint VALUES (?, ?, ?, ?, ?)",
+            [(barcode, "processed", "legacy", now, now) for barcode in legacy.get("processed", [])]
+            + [(barcode, "failed", "legacy", now, now) for barcode in legacy.get("failed", [])],
+        )
+        conn.commit()
+        print(f"  Imported legacy {LEGACY_CHECKPOINT_FILE.name}")
+
+    return conn
+
+def record_status(conn, barcode, status, stage):
+    """Upsert one barcode's checkpoint row."""
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.execute("""
+        INSERT INTO checkpoint (barcode, status, stage, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (barcode) DO UPDATE SET
+            status = excluded.status, stage = excluded.stage, updated_at = excluded.updated_at
+    """, (barcode, status, stage, now, now))
+    conn.commit()
+
+def load_processed_barcodes(conn):
+    """Barcodes that don't need processing again (failures are retried)."""
+    return {row[0] for row in conn.execute("SELECT barcode FROM checkpoint WHERE status = 'processed'")}
+
+def record_upload(conn, barcode, url, firestore_updated=False):
+    """Log an uploaded image (and whether its Firestore doc was updated)."""
+    conn.execute("""
+        INSERT INTO uploads (barcode, url, firestore_updated, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (barcode) DO UPDATE SET
+            url = excluded.url,
+            firestore_updated = MAX(firestore_updated, excluded.firestore_updated),
+            updated_at = excluded.updated_at
+    """, (barcode, url, int(firestore_updated), datetime.now().isoformat(timespec="seconds")))
+
+def mark_firestore_updated(conn, barcodes):
+    """Flag uploaded barcodes whose Firestore document now has the new URL."""
+    conn.executemany(
+        "UPDATE uploads SET firestore_updated = 1 WHERE barcode = ?",
+        [(barcode,) for barcode in barcodes],
+    )
+    conn.commit()
+
+def load_uploads(conn):
+    """Return {barcode: (url, firestore_updated)} for everything already uploaded."""
+    return {
+        barcode: (url, bool(firestore_updated))
+        for barcode, url, firestore_updated in conn.execute(
+            "SELECT barcode, url, firestore_updated FROM uploads"
+        )
+    }
 
-def save_checkpoint(checkpoint):
-    """Save processing checkpoint."""
-    with open(CHECKPOINT_FILE, "w") as f:
-        json.dump(checkpoint, f, indent=2)
+def checkpoint_stats(conn):
+    """Return {(status, stage): count}."""
+    return {
+        (status, stage): count
+        for status, stage, count in conn.execute(
+            "SELECT status, stage, COUNT(*) FROM checkpoint GROUP BY status, stage ORDER BY status, stage"
+        )
+    }
 
 def get_image_hash(barcode):
     """Generate a unique filename from barcode."""
@@ -117,120 +229,363 @@ def get_image_hash(barcode):
 # Step 1: Fetch barcodes from Algolia
 # ============================================================================
 
-def algolia_search(index_name, query="", page=0, hits_per_page=1000):
-    """Search Algolia using REST API."""
-    url = f"https://{ALGOLIA_APP_ID}-dsn.algolia.net/1/indexes/{index_name}/query"
-    headers = {
+def algolia_session(pool_size=len(ALGOLIA_INDICES)):
+    """Create a pooled HTTP session with Algolia auth headers."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
         "X-Algolia-Application-Id": ALGOLIA_APP_ID,
         "X-Algolia-API-Key": ALGOLIA_API_KEY,
         "Content-Type": "application/json",
-    }
+    })
+    return session
+
+def algolia_search(index_name, query="", page=0, hits_per_page=1000, session=None):
+    """Search Algolia using REST API."""
+    url = f"{ALGOLIA_HOST}/1/indexes/{index_name}/query"
     data = {
         "query": query,
         "page": page,
         "hitsPerPage": hits_per_page,
-        "attributesToRetrieve": ["objectID", "barcode", "gtin", "ean", "name", "brandName", "imageUrl"],
+        "attributesToRetrieve": ALGOLIA_ATTRIBUTES,
     }
-    response = requests.post(url, headers=headers, json=data, timeout=30)
+    response = (session or algolia_session()).post(url, json=data, timeout=30)
     response.raise_for_status()
     return response.json()
 
-def fetch_all_barcodes():
-    """Fetch all foods with barcodes from all Algolia indices."""
+def algolia_browse(session, index_name, hits_per_page=1000):
+    """
+    Yield every hit in an index using the browse (cursor) API.
+
+    Unlike search pagination this isn't capped at paginationLimitedTo, so
+    large indices come back complete.
+    """
+    url = f"{ALGOLIA_HOST}/1/indexes/{index_name}/browse"
+    body = {"hitsPerPage": hits_per_page, "attributesToRetrieve": ALGOLIA_ATTRIBUTES}
+
+    while True:
+        response = session.post(url, json=body, timeout=30)
+        response.raise_for_status()
+        result = response.json()
+
+        yield from result.get("hits", [])
+
+        cursor = result.get("cursor")
+        if not cursor:
+            break
+        body = {"cursor": cursor}
+
+def algolia_paged_search(session, index_name):
+    """Yield hits via search pagination (for API keys without the browse ACL)."""
+    page = 0
+    while True:
+        result = algolia_search(index_name, page=page, session=session)
+        hits = result.get("hits", [])
+        if not hits:
+            break
+
+        yield from hits
+
+        page += 1
+        if page >= result.get("nbPages", 0):
+            break
+
+def iter_index_hits(session, index_name):
+    """Yield all hits from an index, falling back to search if browse is forbidden."""
+    try:
+        yield from algolia_browse(session, index_name)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 403:
+            raise
+        print(f"  {index_name}: browse not allowed for this key, using search pagination")
+        yield from algolia_paged_search(session, index_name)
+
+def hit_to_food(hit, index_name):
+    """Convert an Algolia hit to a food record, or None if it has no barcode."""
+    barcode = hit.get("barcode") or hit.get("gtin") or hit.get("ean")
+    if not barcode:
+        return None
+    return {
+        "objectID": hit.get("objectID", ""),
+        "barcode": str(barcode).strip(),
+        "name": hit.get("name", ""),
+        "brandName": hit.get("brandName", ""),
+        "currentImageUrl": hit.get("imageUrl"),
+        "sourceIndex": index_name,
+        "firestoreCollection": INDEX_TO_COLLECTION.get(index_name),
+    }
+
+def stream_index_foods(session, index_name, out_queue, failed):
+    """Worker: push every food with a barcode from one index onto the queue (index_name goes into failed on error)."""
+    count = 0
+    try:
+        for hit in iter_index_hits(session, index_name):
+            food = hit_to_food(hit, index_name)
+            if food:
+                out_queue.put(food)
+                count += 1
+        print(f"  {index_name}: {count} with barcodes")
+    except Exception as e:
+        print(f"  {index_name}: Error after {count} records: {e}")
+        failed.append(index_name)
+    finally:
+        out_queue.put(None)
+
+def load_snapshot():
+    """Load the previous Algolia export as {barcode: food}."""
+    if not SNAPSHOT_FILE.exists():
+        return {}
+    with open(SNAPSHOT_FILE) as f:
+        return {food["barcode"]: food for food in map(json.loads, f)}
+
+def save_snapshot(foods):
+    """Write the export to the snapshot file (one JSON record per line), via a temp file and rename."""
+    tmp_path = SNAPSHOT_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        for food in foods:
+            f.write(json.dumps(food) + "\n")
+    tmp_path.replace(SNAPSHOT_FILE)
+
+def diff_snapshot(previous, foods):
+    """Print what changed since the previous snapshot."""
+    current = {food["barcode"]: food for food in foods}
+    added = current.keys() - previous.keys()
+    removed = previous.keys() - current.keys()
+    changed = sum(1 for barcode in current.keys() & previous.keys()
+                  if current[barcode] != previous[barcode])
+    print(f"  Since last snapshot: +{len(added)} new, -{len(removed)} removed, {changed} changed")
+
+def fetch_all_barcodes(use_snapshot=False):
+    """
+    Fetch all foods with barcodes from all Algolia indices.
+
+    Indices are browsed concurrently over one pooled session and hits are
+    deduplicated as they stream in. A complete result is saved to
+    SNAPSHOT_FILE (an export with a failed index is used but not saved);
+    with use_snapshot the previous export is reused without hitting Algolia.
+    """
+    if use_snapshot and SNAPSHOT_FILE.exists():
+        foods = list(load_snapshot().values())
+        print(f"\n📊 Step 1: Loaded {len(foods)} foods from snapshot {SNAPSHOT_FILE.name}")
+        return foods
+
     print("\n📊 Step 1: Fetching barcodes from Algolia...")
 
-    all_foods = []
-
-    for index_name in ALGOLIA_INDICES:
-        print(f"  Scanning {index_name}...", end=" ", flush=True)
-
-        foods_in_index = []
-
-        # Browse all records using search with pagination
-        page = 0
-        while True:
-            try:
-                result = algolia_search(index_name, page=page)
-            except Exception as e:
-                print(f"Error: {e}")
-                break
-
-            hits = result.get("hits", [])
-            if not hits:
-                break
-
-            for hit in hits:
-                barcode = hit.get("barcode") or hit.get("gtin") or hit.get("ean")
-                if barcode:
-                    foods_in_index.append({
-                        "objectID": hit.get("objectID", ""),
-                        "barcode": str(barcode).strip(),
-                        "name": hit.get("name", ""),
-                        "brandName": hit.get("brandName", ""),
-                        "currentImageUrl": hit.get("imageUrl"),
-                        "sourceIndex": index_name,
-                        "firestoreCollection": INDEX_TO_COLLECTION.get(index_name),
-                    })
-
-            page += 1
-            if page >= result.get("nbPages", 0):
-                break
-
-        print(f"{len(foods_in_index)} with barcodes")
-        all_foods.extend(foods_in_index)
-
-    # Deduplicate by barcode (keep first occurrence)
-    seen_barcodes = set()
-    unique_foods = []
-    for food in all_foods:
-        if food["barcode"] not in seen_barcodes:
-            seen_barcodes.add(food["barcode"])
-            unique_foods.append(food)
-
-    print(f"\n  Total: {len(all_foods)} foods with barcodes")
+    session = algolia_session()
+    food_queue = queue.Queue(maxsize=10000)
+    failed = []
+    workers = [
+        threading.Thread(target=stream_index_foods, args=(session, name, food_queue, failed), daemon=True)
+        for name in ALGOLIA_INDICES
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Deduplicate by barcode as hits arrive (highest-priority index wins).
+    # rank = (index priority, position within that index) keeps the output
+    # order deterministic however the threads interleave.
+    unique = {}
+    per_index = {name: 0 for name in ALGOLIA_INDICES}
+    total = 0
+    remaining = len(workers)
+    while remaining:
+        food = food_queue.get()
+        if food is None:
+            remaining -= 1
+            continue
+
+        total += 1
+        index_name = food["sourceIndex"]
+        rank = (INDEX_PRIORITY[index_name], per_index[index_name])
+        per_index[index_name] += 1
+
+        existing = unique.get(food["barcode"])
+        if existing is None or rank < existing[0]:
+            unique[food["barcode"]] = (rank, food)
+
+    unique_foods = [food for _, food in sorted(unique.values(), key=lambda item: item[0])]
+
+    print(f"\n  Total: {total} foods with barcodes")
     print(f"  Unique barcodes: {len(unique_foods)}")
 
+    if failed:
+        # A partial export would show the missing foods as removals next time
+        print(f"  ⚠️  Export incomplete ({', '.join(failed)} failed): {SNAPSHOT_FILE.name} not updated")
+    else:
+        diff_snapshot(load_snapshot(), unique_foods)
+        save_snapshot(unique_foods)
+
     return unique_foods
 
 # ============================================================================
 # Step 2: Fetch images from OpenFoodFacts
 # ============================================================================
 
-def fetch_off_image(barcode):
-    """Fetch best image URL from OpenFoodFacts."""
+def pick_off_image(product):
+    """Pick the best front image URL from an OFF product record."""
+    # Try to get best front image
+    selected = product.get("selected_images") or {}
+    front = selected.get("front") or {}
+    display = front.get("display") or {}
+
+    # Prefer English
+    for lang in ["en", "uk", "gb"]:
+        if lang in display:
+            return display[lang]
+
+    # Any language
+    if display:
+        return list(display.values())[0]
+
+    # Fall back to main front image (image_url is the CSV export's name for it)
+    return product.get("image_front_url") or product.get("image_url") or None
+
+def open_off_index():
+    """Open (creating if needed) the local OFF product index."""
+    conn = sqlite3.connect(str(OFF_INDEX_FILE))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS off_products (
+            barcode TEXT PRIMARY KEY,
+            image_url TEXT,
+            product_json TEXT,
+            source TEXT NOT NULL,
+            fetched_at TEXT NOT NULL
+        )
+    """)
+    return conn
+
+def compact_off_product(product):
+    """Keep just the OFF fields we cache."""
+    return {k: product[k] for k in OFF_FIELDS if product.get(k)}
+
+def store_off_products(conn, rows):
+    """Upsert (barcode, image_url, product, source) tuples into the index."""
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        "INSERT OR REPLACE INTO off_products VALUES (?, ?, ?, ?, ?)",
+        ((barcode, image_url, json.dumps(product) if product else None, source, now)
+         for barcode, image_url, product, source in rows),
+    )
+    conn.commit()
+
+def lookup_off_index(conn, barcode):
+    """
+    Look up a barcode in the local index.
+
+    Returns (found, image_url) - a found barcode with no image is a cached
+    miss, so we don't ask OFF about it again.
+    """
+    row = conn.execute(
+        "SELECT image_url FROM off_products WHERE barcode = ?", (barcode,)
+    ).fetchone()
+    if row is None:
+        return False, None
+    return True, row[0]
+
+def iter_off_dump(dump_path):
+    """
+    Stream (barcode, product) pairs from an OpenFoodFacts bulk export.
+
+    Supports the JSONL dump (openfoodfacts-products.jsonl[.gz]) and the
+    tab-separated CSV dump (en.openfoodfacts.org.products.csv[.gz]).
+    """
+    dump_path = Path(dump_path)
+    opener = gzip.open if dump_path.suffix == ".gz" else open
+    is_jsonl = ".jsonl" in dump_path.suffixes or ".json" in dump_path.suffixes
+
+    with opener(dump_path, "rt", encoding="utf-8", errors="replace", newline="") as f:
+        if is_jsonl:
+            for line in f:
+                try:
+                    product = json.loads(line)
+                except ValueError:
+                    continue
+                if product.get("code"):
+                    yield str(product["code"]).strip(), product
+        else:
+            csv.field_size_limit(sys.maxsize)
+            for product in csv.DictReader(f, delimiter="\t"):
+                if product.get("code"):
+                    yield product["code"].strip(), product
+
+def build_off_index(dump_path, batch_size=5000):
+    """Build the local OFF index from a bulk export, keeping only products with images."""
+    print(f"\n📦 Building OFF index from {dump_path}...")
+
+    conn = open_off_index()
+    batch = []
+    total = 0
+    start_time = time.time()
+
+    for barcode, product in iter_off_dump(dump_path):
+        image_url = pick_off_image(product)
+        if not image_url:
+            continue
+
+        batch.append((barcode, image_url, compact_off_product(product), "dump"))
+        if len(batch) >= batch_size:
+            store_off_products(conn, batch)
+            total += len(batch)
+            batch = []
+            print(f"  {total} products indexed...", end="\r", flush=True)
+
+    if batch:
+        store_off_products(conn, batch)
+        total += len(batch)
+
+    conn.close()
+    print(f"  Indexed {total} products with images in {time.time() - start_time:.0f}s")
+    return total
+
+def fetch_off_image(barcode, off_index=None):
+    """
+    Fetch best image URL from OpenFoodFacts.
+
+    Checks the local OFF index first; API answers (including definitive
+    misses) are written back to it so re-runs never re-query the same barcode.
+    """
+    if off_index is not None:
+        found, image_url = lookup_off_index(off_index, barcode)
+        if found:
+            return image_url
+
+    image_url = None
+    product = None
+    # A miss is only cached when every endpoint gave a definitive answer
+    # (200 with or without a product, or 404); timeouts, 429s and 5xx are retried next run
+    definitive = True
+
     # Try UK first, then world
     for base_url in [OFF_UK_API_BASE, OFF_API_BASE]:
         try:
             url = f"{base_url}/{barcode}.json"
-            response = requests.get(url, timeout=10)
+            response = requests.get(url, params={"fields": ",".join(OFF_FIELDS)}, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
                 product = data.get("product", {})
 
                 if product:
-                    # Try to get best front image
-                    selected = product.get("selected_images", {})
-                    front = selected.get("front", {})
-                    display = front.get("display", {})
-
-                    # Prefer English
-                    for lang in ["en", "uk", "gb"]:
-                        if lang in display:
-                            return display[lang]
-
-                    # Any language
-                    if display:
-                        return list(display.values())[0]
-
-                    # Fall back to main front image
-                    if product.get("image_front_url"):
-                        return product["image_front_url"]
+                    image_url = pick_off_image(product)
+                    if image_url:
+                        break
+            elif response.status_code != 404:
+                definitive = False
+                print(f"    OFF {base_url} returned HTTP {response.status_code} for {barcode}")
 
         except Exception as e:
-            pass
+            definitive = False
+            print(f"    OFF lookup failed for {barcode}: {e}")
 
-    return None
+    if off_index is not None and (image_url or definitive):
+        store_off_products(off_index, [
+            (barcode, image_url, compact_off_product(product) if product else None, "api")
+        ])
+
+    return image_url
 
 def download_image(url, filepath):
     """Download image to local file."""
@@ -248,6 +603,22 @@ def download_image(url, filepath):
 # Step 3: Clean images with rembg
 # ============================================================================
 
+def segment_on_proxy(image, max_edge=PROXY_MAX_EDGE):
+    """Run rembg on a downscaled copy and apply the upsampled mask at full res."""
+    width, height = image.size
+    if not max_edge or max(width, height) <= max_edge:
+        return remove(image)
+
+    scale = max_edge / max(width, height)
+    proxy = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+    mask = remove(proxy, only_mask=True).resize(image.size, Image.BILINEAR)
+
+    # Snap the soft fringe left by upsampling
+    mask = mask.point([0 if v <= 10 else 255 if v >= 245 else v for v in range(256)])
+
+    empty = Image.new("RGBA", image.size, 0)
+    return Image.composite(image.convert("RGBA"), empty, mask)
+
 def clean_image(input_path, output_path):
     """Remove background from image using rembg."""
     try:
@@ -263,8 +634,8 @@ def clean_image(input_path, output_path):
         elif input_image.mode not in ("RGB", "RGBA"):
             input_image = input_image.convert("RGB")
 
-        # Remove background
-        output_image = remove(input_image)
+        # Remove background (mask computed on a bounded-size proxy)
+        output_image = segment_on_proxy(input_image)
 
         # Save as PNG with transparency
         output_image.save(output_path, "PNG", optimize=True)
@@ -303,10 +674,10 @@ def init_firebase():
         print(f"  Firebase init error: {e}")
         return None
 
-def upload_to_storage(local_path, remote_path):
+def upload_to_storage(local_path, remote_path, bucket=None):
     """Upload file to Firebase Storage and return public URL."""
     try:
-        bucket = storage.bucket()
+        bucket = bucket or storage.bucket()
         blob = bucket.blob(remote_path)
         blob.upload_from_filename(str(local_path), content_type="image/png")
         blob.make_public()
@@ -319,28 +690,83 @@ def upload_to_storage(local_path, remote_path):
 # Step 5: Update Firestore
 # ============================================================================
 
-def update_firestore(collection, doc_id, image_url):
+def image_update_fields(image_url):
+    """Fields written to a food document when its image is replaced."""
+    return {
+        "imageUrl": image_url,
+        "imageUpdatedAt": datetime.now(),
+        "imageSource": "off_cleaned"
+    }
+
+def update_firestore(collection, doc_id, image_url, db=None):
     """Update Firestore document with new image URL."""
     if not collection:
         return False  # Algolia-only index
 
     try:
-        db = firestore.client()
-        db.collection(collection).document(doc_id).update({
-            "imageUrl": image_url,
-            "imageUpdatedAt": datetime.now(),
-            "imageSource": "off_cleaned"
-        })
+        db = db or firestore.client()
+        db.collection(collection).document(doc_id).update(image_update_fields(image_url))
         return True
     except Exception as e:
         print(f"    Firestore error: {e}")
         return False
 
+def existing_documents(db, updates):
+    """The (barcode, collection, doc_id, image_url) updates whose document exists, in one read"""
+    refs = [db.collection(collection).document(doc_id) for _, collection, doc_id, _ in updates]
+    found = {snapshot.reference.path for snapshot in db.get_all(refs) if snapshot.exists}
+    return [update for update, ref in zip(updates, refs) if ref.path in found]
+
+def commit_firestore_batch(db, updates):
+    """
+    Apply at most FIRESTORE_BATCH_SIZE (barcode, collection, doc_id, image_url)
+    updates in one WriteBatch.
+
+    A batch is atomic, so one missing document fails the whole commit; in
+    that case the missing documents are looked up and dropped, and the rest
+    committed again. Only if that fails too is each document updated on its own.
+
+    Returns the barcodes whose document was updated.
+    """
+    def commit(chunk):
+        batch = db.batch()
+        for _, collection, doc_id, image_url in chunk:
+            batch.update(db.collection(collection).document(doc_id), image_update_fields(image_url))
+        batch.commit()
+        return [barcode for barcode, *_ in chunk]
+
+    try:
+        return commit(updates)
+    except Exception as e:
+        print(f"    Firestore batch of {len(updates)} failed ({e})")
+
+    try:
+        existing = existing_documents(db, updates)
+        if len(existing) < len(updates):
+            print(f"    {len(updates) - len(existing)} documents not found, committing the other {len(existing)}")
+        return commit(existing) if existing else []
+    except Exception as e:
+        print(f"    Firestore batch failed again ({e}), retrying individually")
+        return [
+            barcode for barcode, collection, doc_id, image_url in updates
+            if update_firestore(collection, doc_id, image_url, db)
+        ]
+
+def commit_firestore_updates(db, updates):
+    """
+    Apply (barcode, collection, doc_id, image_url) updates in WriteBatches of
+    FIRESTORE_BATCH_SIZE. Returns the barcodes whose document was updated.
+    """
+    updated = []
+    for start in range(0, len(updates), FIRESTORE_BATCH_SIZE):
+        updated.extend(commit_firestore_batch(db, updates[start:start + FIRESTORE_BATCH_SIZE]))
+    return updated
+
 # ============================================================================
 # Main Processing Pipeline
 # ============================================================================
 
-def process_food(food, download_only=False):
+def process_food(food, download_only=False, off_index=None):
     """Process a single food item."""
     barcode = food["barcode"]
     img_hash = get_image_hash(barcode)
@@ -358,7 +784,7 @@ def process_food(food, download_only=False):
 
     # Step 2: Fetch from OFF
     if not original_path.exists():
-        off_url = fetch_off_image(barcode)
+        off_url = fetch_off_image(barcode, off_index)
         if not off_url:
             result["status"] = "no_off_image"
             return result
@@ -386,8 +812,8 @@ def process_food(food, download_only=False):
 
 def process_batch(foods, args):
     """Process a batch of foods."""
-    checkpoint = load_checkpoint()
-    processed_barcodes = set(checkpoint["processed"])
+    checkpoint = open_checkpoint()
+    processed_barcodes = load_processed_barcodes(checkpoint)
 
     # Filter out already processed
     to_process = [f for f in foods if f["barcode"] not in processed_barcodes]
@@ -404,6 +830,7 @@ def process_batch(foods, args):
     }
 
     start_time = time.time()
+    off_index = open_off_index()
 
     for i, food in enumerate(to_process):
         barcode = food["barcode"]
@@ -411,31 +838,30 @@ def process_batch(foods, args):
 
         print(f"\n[{i+1}/{len(to_process)}] {barcode} - {name}")
 
-        result = process_food(food, download_only=args.download_only)
+        result = process_food(food, download_only=args.download_only, off_index=off_index)
 
         if result["status"] == "cleaned" or result["status"] == "downloaded":
             print(f"  ✅ {result['status']}")
             results["success"].append(result)
-            checkpoint["processed"].append(barcode)
+            record_status(checkpoint, barcode, "processed", result["status"])
         elif result["status"] == "no_off_image":
             print(f"  ⚪ No image in OFF")
             results["no_image"].append(result)
-            checkpoint["processed"].append(barcode)
+            record_status(checkpoint, barcode, "processed", result["status"])
         else:
             print(f"  ❌ {result['status']}")
             results["failed"].append(result)
-            checkpoint["failed"].append(barcode)
+            record_status(checkpoint, barcode, "failed", result["status"])
 
-        # Save checkpoint every 50 items
+        # Progress every 50 items (the checkpoint itself is updated per item)
         if (i + 1) % 50 == 0:
-            save_checkpoint(checkpoint)
             elapsed = time.time() - start_time
             rate = (i + 1) / elapsed
             remaining = (len(to_process) - i - 1) / rate / 3600
-            print(f"\n  💾 Checkpoint saved. Rate: {rate:.1f}/sec, ETA: {remaining:.1f}h")
+            print(f"\n  💾 Rate: {rate:.1f}/sec, ETA: {remaining:.1f}h")
 
-    # Final save
-    save_checkpoint(checkpoint)
+    checkpoint.close()
+    off_index.close()
 
     # Summary
     elapsed = time.time() - start_time
@@ -454,7 +880,14 @@ def process_batch(foods, args):
     return results
 
 def upload_results():
-    """Upload cleaned images to Firebase Storage and update Firestore."""
+    """
+    Upload cleaned images to Firebase Storage and update Firestore.
+
+    Uploads run on a thread pool sharing one bucket client; Firestore
+    updates are committed in WriteBatches of FIRESTORE_BATCH_SIZE. Every
+    upload is logged to the checkpoint db as it completes, so an interrupted
+    run picks up where it stopped.
+    """
     print("\n☁️  Uploading to Firebase Storage...")
 
     if not init_firebase():
@@ -471,36 +904,74 @@ def upload_results():
 
     success_items = results.get("success", [])
 
-    print(f"  {len(success_items)} images to upload")
+    checkpoint = open_checkpoint()
+    previous_uploads = load_uploads(checkpoint)
+
+    db = firestore.client()
+    bucket = storage.bucket()
+
+    to_upload = []
+    firestore_pending = []
 
-    uploaded = 0
     for item in success_items:
-        if "localCleanedPath" not in item:
-            continue
+        barcode = item["barcode"]
+        collection = INDEX_TO_COLLECTION.get(item.get("sourceIndex"))
 
-        local_path = Path(item["localCleanedPath"])
-        if not local_path.exists():
+        if barcode in previous_uploads:
+            url, firestore_updated = previous_uploads[barcode]
+            item["uploadedUrl"] = url
+            if collection and not firestore_updated:
+                firestore_pending.append((barcode, collection, item["objectID"], url))
             continue
 
-        barcode = item["barcode"]
-        remote_path = f"food-images/cleaned/{barcode}.png"
+        if "localCleanedPath" in item and Path(item["localCleanedPath"]).exists():
+            to_upload.append(item)
+
+    print(f"  {len(to_upload)} images to upload ({len(previous_uploads)} already uploaded)")
+
+    def flush_firestore():
+        if firestore_pending:
+            mark_firestore_updated(checkpoint, commit_firestore_updates(db, firestore_pending))
+            firestore_pending.clear()
+
+    uploaded = 0
+    start_time = time.time()
 
-        print(f"  Uploading {barcode}...", end=" ", flush=True)
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        futures = {
+            pool.submit(upload_to_storage, item["localCleanedPath"],
+                        f"food-images/cleaned/{item['barcode']}.png", bucket): item
+            for item in to_upload
+        }
+
+        for done, future in enumerate(as_completed(futures), 1):
+            item = futures[future]
+            url = future.result()
+            if not url:
+                print(f"  ❌ {item['barcode']}")
+                continue
 
-        url = upload_to_storage(local_path, remote_path)
-        if url:
             item["uploadedUrl"] = url
             uploaded += 1
-            print("✅")
+            record_upload(checkpoint, item["barcode"], url)
 
             # Update Firestore if applicable
             collection = INDEX_TO_COLLECTION.get(item.get("sourceIndex"))
             if collection:
-                update_firestore(collection, item["objectID"], url)
-        else:
-            print("❌")
+                firestore_pending.append((item["barcode"], collection, item["objectID"], url))
+            if len(firestore_pending) >= FIRESTORE_BATCH_SIZE:
+                flush_firestore()
+            else:
+                checkpoint.commit()
 
-    print(f"\n  Uploaded: {uploaded}/{len(success_items)}")
+            if done % 100 == 0:
+                rate = done / (time.time() - start_time)
+                print(f"  {done}/{len(to_upload)} uploaded ({rate:.1f}/sec)")
+
+    flush_firestore()
+    checkpoint.close()
+
+    print(f"\n  Uploaded: {uploaded}/{len(to_upload)} in {time.time() - start_time:.0f}s")
 
     # Save updated results
     with open(RESULTS_FILE, "w") as f:
@@ -518,25 +989,42 @@ def main():
     parser.add_argument("--download-only", action="store_true", help="Only download, don't clean")
     parser.add_argument("--upload", action="store_true", help="Upload cleaned images to Firebase")
     parser.add_argument("--stats", action="store_true", help="Show statistics only")
+    parser.add_argument("--use-snapshot", action="store_true",
+                        help="Reuse the last Algolia export instead of re-downloading")
+    parser.add_argument("--build-off-index", metavar="DUMP",
+                        help="Build local OFF index from a bulk export (.jsonl[.gz] or .csv[.gz])")
 
     args = parser.parse_args()
 
     setup_directories()
 
+    if args.build_off_index:
+        build_off_index(args.build_off_index)
+        return
+
     if args.upload:
         upload_results()
         return
 
     if args.stats:
-        checkpoint = load_checkpoint()
-        print(f"Processed: {len(checkpoint['processed'])}")
-        print(f"Failed: {len(checkpoint['failed'])}")
-        print(f"Originals: {len(list(ORIGINALS_DIR.glob('*')))}")
-        print(f"Cleaned: {len(list(CLEANED_DIR.glob('*')))}")
+        checkpoint = open_checkpoint()
+        stats = checkpoint_stats(checkpoint)
+        uploads = checkpoint.execute("SELECT COUNT(*), SUM(firestore_updated) FROM uploads").fetchone()
+        checkpoint.close()
+        for status in ("processed", "failed"):
+            print(f"{status.capitalize()}: {sum(n for (st, _), n in stats.items() if st == status)}")
+        for (status, stage), count in stats.items():
+            print(f"  {status:9} {stage:16} {count}")
+        print(f"Uploaded: {uploads[0]} ({uploads[1] or 0} Firestore docs updated)")
+        if OFF_INDEX_FILE.exists():
+            off_index = open_off_index()
+            indexed = off_index.execute("SELECT COUNT(*), COUNT(image_url) FROM off_products").fetchone()
+            off_index.close()
+            print(f"OFF index: {indexed[0]} barcodes ({indexed[1]} with images)")
         return
 
     # Fetch all barcodes
-    foods = fetch_all_barcodes()
+    foods = fetch_all_barcodes(use_snapshot=args.use_snapshot)
 
     if args.test:
         foods = foods[:args.test]
@@ -7,27 +7,27 @@ and enhanced synonyms for better detection
 import json
 import sys
 
-def update_database(db_path):
-    # Load existing database
-    with open(db_path, 'r') as f:
-        db = json.load(f)
-
-    print(f"✅ Loaded database with {db['metadata']['total_additives']} additives")
-
-    # Track changes
+def find_additive(db, e_number):
+    """Look up an additive by E-number in whichever category/range holds it"""
+    for ranges in db['categories'].values():
+        for additives in ranges.values():
+            if e_number in additives:
+                return additives[e_number]
+    return None
+
+def apply_updates(db):
+    """Apply the additions below to a loaded database in place; returns the changes made"""
     changes = []
 
     # 1. Update E322 (Lecithin) to add "lecithin" as a synonym
-    if 'E322' in db['categories']['emulsifiers']['E300-E399']:
-        e322 = db['categories']['emulsifiers']['E300-E399']['E322']
-        if 'lecithin' not in [s.lower() for s in e322['synonyms']]:
-            e322['synonyms'].append('Lecithin')
+    e322 = find_additive(db, 'E322')
+    if e322 is not None:
+        synonyms = e322.setdefault('synonyms', [])
+        if 'lecithin' not in {s.lower() for s in synonyms}:
+            synonyms.append('Lecithin')
             changes.append('Added "Lecithin" synonym to E322')
 
-    # 2. Add E330 synonym for "citric acid" (without E)
-    if 'E330' in db['categories']['antioxidants']['E300-E399']:
-        e330 = db['categories']['antioxidants']['E300-E399']['E330']
-        # Already has "Citric acid" as name, should match
+    # 2. E330 already has "Citric acid" as its name, so it matches without a synonym
 
     # 3. Add maltodextrin (no E-number, but should be flagged)
     # Add to "other" category
@@ -93,6 +93,17 @@ def update_database(db_path):
     db['metadata']['version'] = "2025.3"
     db['metadata']['last_updated'] = "2025-10-26"
 
+    return changes
+
+def update_database(db_path):
+    # Load existing database
+    with open(db_path, 'r') as f:
+        db = json.load(f)
+
+    print(f"✅ Loaded database with {db['metadata']['total_additives']} additives")
+
+    changes = apply_updates(db)
+
     # Save updated database
     with open(db_path, 'w') as f:
         json.dump(db, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Regression checks + micro-benchmarks for the image geometry pipeline.
+
+Default mode runs each image through rembg at full resolution and through
+the downscale-then-upsample path, reports the time for both and the IoU of
+the two masks. Exits non-zero if any image falls below --min-iou.
+
+--geometry compares the old straighten_image + crop_to_content steps with
+the fused straighten_and_crop pass on RGBA cutouts (or a synthetic tilted
+4000x3000 product if no images are given), reporting time and peak NumPy
+allocations per image.
+
+Usage:
+    python bench_geometry.py photos/*.jpg
+    python bench_geometry.py --max-edge 768 --min-iou 0.97 photos/*.jpg
+    python bench_geometry.py --geometry [cutouts/*.png]
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import main
+
+
+def mask_iou(mask_a, mask_b, threshold=main.ALPHA_THRESHOLD):
+    """Intersection-over-union of two same-size masks binarised at threshold."""
+    a = np.asarray(mask_a) > threshold
+    b = np.asarray(mask_b) > threshold
+    union = np.count_nonzero(a | b)
+    if union == 0:
+        return 1.0
+    return np.count_nonzero(a & b) / union
+
+
+def compare(path, max_edge):
+    """Return (full_res_seconds, proxy_seconds, iou) for one image."""
+    image = Image.open(path).convert('RGB')
+
+    start = time.perf_counter()
+    full_mask = main.remove(image, session=main.REMBG_SESSION, alpha_matting=False, only_mask=True)
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cutout, _ = main.segment_image(image, max_edge=max_edge)
+    proxy_time = time.perf_counter() - start
+
+    return full_time, proxy_time, mask_iou(full_mask, cutout.getchannel('A'))
+
+
+def synthetic_cutout(width=4000, height=3000, angle=17.0):
+    """A tilted opaque box on a transparent canvas, roughly OFF photo sized."""
+    pixels = np.zeros((height, width, 4), np.uint8)
+    box = main.cv2.boxPoints(((width / 2, height / 2), (width * 0.2, height * 0.6), angle))
+    main.cv2.fillPoly(pixels, [box.astype(np.int32)], (200, 120, 60, 255))
+    return Image.fromarray(pixels)
+
+
+def measure(func, image, repeats):
+    """Return (mean seconds, peak traced bytes, output size) for func(image)."""
+    tracemalloc.start()
+    output = func(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(image)
+    return (time.perf_counter() - start) / repeats, peak, output.size
+
+
+def two_step(image):
+    return main.crop_to_content(main.straighten_image(image))
+
+
+def run_geometry(paths, repeats):
+    """Benchmark two-step vs fused geometry on each cutout."""
+    images = [(p, Image.open(p).convert('RGBA')) for p in paths] or [('synthetic', synthetic_cutout())]
+
+    for name, image in images:
+        old_time, old_peak, old_size = measure(two_step, image, repeats)
+        new_time, new_peak, new_size = measure(main.straighten_and_crop, image, repeats)
+        print(f"{name} {image.size[0]}x{image.size[1]}:")
+        print(f"  two-step: {old_time * 1000:7.1f} ms  peak {old_peak / 2**20:6.1f} MiB  -> {old_size}")
+        print(f"  fused:    {new_time * 1000:7.1f} ms  peak {new_peak / 2**20:6.1f} MiB  -> {new_size}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Image geometry regression checks and benchmarks")
+    parser.add_argument("images", nargs="*", help="Product photos (or cutouts with --geometry)")
+    parser.add_argument("--max-edge", type=int, default=main.PROXY_MAX_EDGE, help="Proxy long edge")
+    parser.add_argument("--min-iou", type=float, default=0.97, help="Fail below this mask IoU")
+    parser.add_argument("--geometry", action="store_true", help="Benchmark fused straighten+crop")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats for --geometry")
+    args = parser.parse_args()
+
+    if args.geometry:
+        run_geometry(args.images, args.repeats)
+        return
+
+    if not args.images:
+        parser.error("give at least one image to compare")
+
+    failures = 0
+    total_full = total_proxy = 0.0
+
+    for path in args.images:
+        full_time, proxy_time, iou = compare(path, args.max_edge)
+        total_full += full_time
+        total_proxy += proxy_time
+        status = "OK" if iou >= args.min_iou else "FAIL"
+        if status == "FAIL":
+            failures += 1
+        print(f"{status:4} {path}: full={full_time:.2f}s proxy={proxy_time:.2f}s iou={iou:.4f}")
+
+    print(f"\nTotal: full={total_full:.2f}s proxy={total_proxy:.2f}s "
+          f"({total_full / max(total_proxy, 1e-9):.1f}x), {failures} below IoU {args.min_iou}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -33,6 +33,15 @@ except Exception as e:
     print(f"Failed to load isnet-general-use, falling back to default: {e}")
     REMBG_SESSION = None
 
+# Long edge (px) of the proxy image used for segmentation and orientation.
+# OFF photos are often 3-4k px but isnet only ever sees a 1024x1024 input,
+# so running rembg on the full-res image just burns CPU on resizing.
+# Set PROXY_MAX_EDGE=0 to segment at full resolution.
+PROXY_MAX_EDGE = int(os.environ.get('PROXY_MAX_EDGE', '1024'))
+
+# Alpha values at or below this are treated as background
+ALPHA_THRESHOLD = 10
+
 app = Flask(__name__)
 CORS(app, origins=[
     'http://localhost:*',
@@ -41,109 +50,319 @@ CORS(app, origins=[
 ])
 
 
-def straighten_image(pil_image, max_angle=45):
+def make_proxy(pil_image, max_edge=PROXY_MAX_EDGE):
     """
-    Straighten a product image by detecting the main object and rotating to align it.
+    Downscale an image so its long edge is at most max_edge pixels.
+
+    Returns:
+        (proxy PIL Image, scale factor from full-res to proxy)
+    """
+    width, height = pil_image.size
+    long_edge = max(width, height)
+    if not max_edge or long_edge <= max_edge:
+        return pil_image, 1.0
+
+    scale = max_edge / long_edge
+    proxy_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return pil_image.resize(proxy_size, Image.BILINEAR), scale
+
+
+def refine_mask(mask):
+    """
+    Clean up an upsampled mask: snap near-transparent and near-opaque
+    values so bilinear upsampling doesn't leave a faint halo.
+    """
+    lut = [0 if v <= ALPHA_THRESHOLD else 255 if v >= 255 - ALPHA_THRESHOLD else v
+           for v in range(256)]
+    return mask.point(lut)
+
+
+def segment_image(pil_image, max_edge=PROXY_MAX_EDGE):
+    """
+    Remove the background using a mask computed on a bounded-size proxy.
+
+    The mask is predicted on the proxy, upsampled and refined, then applied
+    to the full-resolution pixels.
 
     Args:
-        pil_image: PIL Image with transparent background
+        pil_image: RGB/RGBA PIL Image
+        max_edge: Long edge of the proxy (0 disables the fast path)
+
+    Returns:
+        (full-res RGBA cutout, proxy mask as an 'L' PIL Image)
+    """
+    proxy, scale = make_proxy(pil_image, max_edge)
+
+    proxy_mask = remove(
+        proxy,
+        session=REMBG_SESSION,
+        alpha_matting=False,  # Disabled - was cutting products
+        only_mask=True,
+    )
+
+    if scale == 1.0:
+        full_mask = proxy_mask
+    else:
+        full_mask = refine_mask(proxy_mask.resize(pil_image.size, Image.BILINEAR))
+
+    # Same compositing rembg does internally (transparent pixels are zeroed)
+    empty = Image.new('RGBA', pil_image.size, 0)
+    cutout = Image.composite(pil_image.convert('RGBA'), empty, full_mask)
+    return cutout, proxy_mask
+
+
+def binarize_alpha(alpha):
+    """Threshold an alpha channel / mask (2D uint8 array) to 0/255."""
+    _, binary_mask = cv2.threshold(alpha, ALPHA_THRESHOLD, 255, cv2.THRESH_BINARY)
+    return binary_mask
+
+
+def compute_straighten_angle(binary_mask, max_angle=45):
+    """
+    Work out the rotation needed to make the main object upright.
+
+    Args:
+        binary_mask: 2D uint8 0/255 NumPy array from binarize_alpha, at any
+            resolution - the angle is scale-invariant
         max_angle: Maximum rotation angle to apply (to avoid over-rotation)
 
     Returns:
-        Straightened PIL Image
+        Rotation angle in degrees, or None if no rotation should be applied
+    """
+    # Apply morphological operations to clean up the mask
+    kernel = np.ones((5, 5), np.uint8)
+    binary_mask = cv2.morphologyEx(binary_mask, cv2.MORPH_CLOSE, kernel)
+    binary_mask = cv2.morphologyEx(binary_mask, cv2.MORPH_OPEN, kernel, dst=binary_mask)
+
+    # Find contours
+    contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if not contours:
+        print("No contours found")
+        return None
+
+    # Find the largest contour (the main product)
+    largest_contour = max(contours, key=cv2.contourArea)
+
+    # Check if contour is large enough to be meaningful
+    contour_area = cv2.contourArea(largest_contour)
+    image_area = binary_mask.shape[0] * binary_mask.shape[1]
+    if contour_area < image_area * 0.05:  # Less than 5% of image
+        print(f"Contour too small: {contour_area} vs {image_area}")
+        return None
+
+    # Get minimum area bounding rectangle
+    rect = cv2.minAreaRect(largest_contour)
+    center, (rect_width, rect_height), angle = rect
+
+    print(f"Detected rect: width={rect_width:.1f}, height={rect_height:.1f}, angle={angle:.1f}")
+
+    # minAreaRect returns angle in range [-90, 0)
+    # angle is the rotation of the rectangle from horizontal
+
+    # Determine the rotation needed to make the product upright
+    # For products like bottles/boxes, we want the longer side vertical
+    if rect_width > rect_height:
+        # Rectangle is wider than tall, so it's rotated
+        # We need to rotate by (angle + 90) to make the long side vertical
+        rotation_angle = angle + 90
+    else:
+        # Rectangle is already taller than wide
+        rotation_angle = angle
+
+    # Normalize angle to [-45, 45] range
+    while rotation_angle > 45:
+        rotation_angle -= 90
+    while rotation_angle < -45:
+        rotation_angle += 90
+
+    print(f"Calculated rotation angle: {rotation_angle:.1f} degrees")
+
+    # Only rotate if the angle is significant (> 1 degree) but not too extreme
+    if abs(rotation_angle) < 1:
+        print("Angle too small, skipping rotation")
+        return None
+
+    if abs(rotation_angle) > max_angle:
+        print(f"Angle {rotation_angle} exceeds max {max_angle}, skipping")
+        return None
+
+    return rotation_angle
+
+
+def rotation_transform(width, height, rotation_angle):
+    """
+    Affine matrix rotating an image about its centre, translated so the
+    whole rotated image fits on the returned canvas.
+
+    Returns:
+        (2x3 rotation matrix, (canvas width, canvas height))
+    """
+    center_point = (width / 2, height / 2)
+
+    # Calculate new dimensions to fit rotated image
+    angle_rad = math.radians(abs(rotation_angle))
+    new_w = int(width * math.cos(angle_rad) + height * math.sin(angle_rad)) + 2
+    new_h = int(height * math.cos(angle_rad) + width * math.sin(angle_rad)) + 2
+
+    # Create rotation matrix
+    rotation_matrix = cv2.getRotationMatrix2D(center_point, rotation_angle, 1.0)
+
+    # Adjust translation to center the rotated image
+    rotation_matrix[0, 2] += (new_w - width) / 2
+    rotation_matrix[1, 2] += (new_h - height) / 2
+
+    return rotation_matrix, (new_w, new_h)
+
+
+def straighten_and_crop(pil_image, max_angle=45, padding=10, orientation_mask=None,
+                        straighten=True, crop=True):
+    """
+    Straighten and crop in one geometry pass.
+
+    The alpha channel (or orientation_mask) is binarised once; the same array
+    gives the contour for the rotation angle and the content bounds. The
+    bounds are pushed through the rotation matrix, so the rotate and the crop
+    become a single warpAffine into the final crop rectangle and no
+    intermediate full-size rotated image is allocated.
+
+    Args:
+        pil_image: RGBA PIL Image with transparent background
+        max_angle: Maximum rotation angle to apply (to avoid over-rotation)
+        padding: Pixels of padding around content
+        orientation_mask: Optional 'L' PIL Image (e.g. the proxy mask from
+            segment_image) to derive the geometry from instead of the
+            full-res alpha
+        straighten: Detect and apply rotation
+        crop: Crop to content bounds
+
+    Returns:
+        Straightened and cropped PIL Image
     """
     if not OPENCV_AVAILABLE:
-        print("OpenCV not available for straightening")
+        return crop_to_content(pil_image, padding) if crop else pil_image
+
+    if pil_image.mode != 'RGBA' or not (straighten or crop):
         return pil_image
 
     try:
-        # Convert PIL to OpenCV format
-        img_array = np.array(pil_image)
+        w, h = pil_image.size
+        img_array = None
 
-        # Check if image has alpha channel
-        if len(img_array.shape) < 3 or img_array.shape[2] != 4:
-            print("Image doesn't have alpha channel, skipping straighten")
-            return pil_image
+        # One binarised array drives everything below
+        if orientation_mask is not None:
+            binary_mask = binarize_alpha(np.asarray(orientation_mask))
+        else:
+            img_array = np.asarray(pil_image)
+            binary_mask = binarize_alpha(np.ascontiguousarray(img_array[:, :, 3]))
 
-        # Get alpha channel as mask
-        alpha = img_array[:, :, 3]
+        # Mask -> full-res coordinates (mask may be a downscaled proxy)
+        scale_x = w / binary_mask.shape[1]
+        scale_y = h / binary_mask.shape[0]
+        slack = math.ceil(max(scale_x, scale_y) / 2) if (scale_x, scale_y) != (1, 1) else 0
 
-        # Threshold to get binary mask
-        _, binary_mask = cv2.threshold(alpha, 10, 255, cv2.THRESH_BINARY)
+        rotation_angle = None
+        if straighten:
+            rotation_angle = compute_straighten_angle(binary_mask, max_angle)
 
-        # Apply morphological operations to clean up the mask
-        kernel = np.ones((5, 5), np.uint8)
-        binary_mask = cv2.morphologyEx(binary_mask, cv2.MORPH_CLOSE, kernel)
-        binary_mask = cv2.morphologyEx(binary_mask, cv2.MORPH_OPEN, kernel)
+        if rotation_angle is None:
+            rotation_matrix = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+            canvas_w, canvas_h = w, h
+        else:
+            rotation_matrix, (canvas_w, canvas_h) = rotation_transform(w, h, rotation_angle)
+
+        if crop:
+            contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if not contours:
+                crop_box = None
+            else:
+                points = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+                # Pixel centres in full-res space, then through the rotation
+                points[:, 0] = (points[:, 0] + 0.5) * scale_x - 0.5
+                points[:, 1] = (points[:, 1] + 0.5) * scale_y - 0.5
+                rotated = points @ rotation_matrix[:, :2].T + rotation_matrix[:, 2]
+
+                margin = padding + slack
+                left = max(0, math.floor(rotated[:, 0].min()) - margin)
+                top = max(0, math.floor(rotated[:, 1].min()) - margin)
+                right = min(canvas_w, math.ceil(rotated[:, 0].max()) + 1 + margin)
+                bottom = min(canvas_h, math.ceil(rotated[:, 1].max()) + 1 + margin)
+                crop_box = (left, top, right, bottom) if right > left and bottom > top else None
+        else:
+            crop_box = None
 
-        # Find contours
-        contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if rotation_angle is None:
+            # No warp needed - a plain crop is cheaper
+            return pil_image.crop(crop_box) if crop_box else pil_image
 
-        if not contours:
-            print("No contours found")
-            return pil_image
+        if crop_box is None:
+            crop_box = (0, 0, canvas_w, canvas_h)
 
-        # Find the largest contour (the main product)
-        largest_contour = max(contours, key=cv2.contourArea)
+        # Shift the rotation so the crop rectangle lands at the origin
+        left, top, right, bottom = crop_box
+        rotation_matrix[0, 2] -= left
+        rotation_matrix[1, 2] -= top
 
-        # Check if contour is large enough to be meaningful
-        contour_area = cv2.contourArea(largest_contour)
-        image_area = img_array.shape[0] * img_array.shape[1]
-        if contour_area < image_area * 0.05:  # Less than 5% of image
-            print(f"Contour too small: {contour_area} vs {image_area}")
-            return pil_image
+        if img_array is None:
+            img_array = np.asarray(pil_image)
 
-        # Get minimum area bounding rectangle
-        rect = cv2.minAreaRect(largest_contour)
-        center, (rect_width, rect_height), angle = rect
+        warped = cv2.warpAffine(
+            img_array,
+            rotation_matrix,
+            (right - left, bottom - top),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0, 0)
+        )
 
-        print(f"Detected rect: width={rect_width:.1f}, height={rect_height:.1f}, angle={angle:.1f}")
+        print(f"Straightened by {rotation_angle:.1f} degrees and cropped to {right - left}x{bottom - top}")
+        return Image.fromarray(warped)
 
-        # minAreaRect returns angle in range [-90, 0)
-        # angle is the rotation of the rectangle from horizontal
+    except Exception as e:
+        print(f"Geometry error: {e}")
+        import traceback
+        traceback.print_exc()
+        return pil_image
 
-        # Determine the rotation needed to make the product upright
-        # For products like bottles/boxes, we want the longer side vertical
-        if rect_width > rect_height:
-            # Rectangle is wider than tall, so it's rotated
-            # We need to rotate by (angle + 90) to make the long side vertical
-            rotation_angle = angle + 90
-        else:
-            # Rectangle is already taller than wide
-            rotation_angle = angle
 
-        # Normalize angle to [-45, 45] range
-        while rotation_angle > 45:
-            rotation_angle -= 90
-        while rotation_angle < -45:
-            rotation_angle += 90
+def straighten_image(pil_image, max_angle=45, orientation_mask=None):
+    """
+    Straighten a product image by detecting the main object and rotating to align it.
 
-        print(f"Calculated rotation angle: {rotation_angle:.1f} degrees")
+    Args:
+        pil_image: PIL Image with transparent background
+        max_angle: Maximum rotation angle to apply (to avoid over-rotation)
+        orientation_mask: Optional 'L' PIL Image (e.g. the proxy mask from
+            segment_image) to detect the angle on instead of the full-res alpha
 
-        # Only rotate if the angle is significant (> 1 degree) but not too extreme
-        if abs(rotation_angle) < 1:
-            print("Angle too small, skipping rotation")
-            return pil_image
+    Returns:
+        Straightened PIL Image
+    """
+    if not OPENCV_AVAILABLE:
+        print("OpenCV not available for straightening")
+        return pil_image
 
-        if abs(rotation_angle) > max_angle:
-            print(f"Angle {rotation_angle} exceeds max {max_angle}, skipping")
-            return pil_image
+    try:
+        # Convert PIL to OpenCV format
+        img_array = np.array(pil_image)
 
-        # Get image dimensions
-        h, w = img_array.shape[:2]
-        center_point = (w / 2, h / 2)
+        # Check if image has alpha channel
+        if len(img_array.shape) < 3 or img_array.shape[2] != 4:
+            print("Image doesn't have alpha channel, skipping straighten")
+            return pil_image
 
-        # Calculate new dimensions to fit rotated image
-        angle_rad = math.radians(abs(rotation_angle))
-        new_w = int(w * math.cos(angle_rad) + h * math.sin(angle_rad)) + 2
-        new_h = int(h * math.cos(angle_rad) + w * math.sin(angle_rad)) + 2
+        # Detect orientation on the small mask when we have one
+        if orientation_mask is not None:
+            alpha = np.asarray(orientation_mask)
+        else:
+            alpha = img_array[:, :, 3]
 
-        # Create rotation matrix
-        rotation_matrix = cv2.getRotationMatrix2D(center_point, rotation_angle, 1.0)
+        rotation_angle = compute_straighten_angle(binarize_alpha(alpha), max_angle)
+        if rotation_angle is None:
+            return pil_image
 
-        # Adjust translation to center the rotated image
-        rotation_matrix[0, 2] += (new_w - w) / 2
-        rotation_matrix[1, 2] += (new_h - h) / 2
+        h, w = img_array.shape[:2]
+        rotation_matrix, (new_w, new_h) = rotation_transform(w, h, rotation_angle)
 
         # Apply rotation with transparent background
         rotated = cv2.warpAffine(
@@ -203,6 +422,37 @@ def crop_to_content(pil_image, padding=10):
         return pil_image
 
 
+def process_product_image(input_image, do_straighten=True, do_crop=True, use_proxy=True):
+    """
+    Full cleaning pipeline: background removal, straightening and cropping.
+
+    With use_proxy the mask and orientation are computed on a downscaled
+    proxy and only the final warp touches full-res pixels.
+
+    Returns:
+        Processed RGBA PIL Image
+    """
+    if use_proxy:
+        output_image, proxy_mask = segment_image(input_image)
+    else:
+        # IMPORTANT: Alpha matting disabled - it's too aggressive and cuts into products
+        # The isnet-general-use model already provides clean edges
+        output_image = remove(
+            input_image,
+            session=REMBG_SESSION,
+            alpha_matting=False,  # Disabled - was cutting products
+        )
+        proxy_mask = None
+
+    # Straighten and crop in a single warp
+    return straighten_and_crop(
+        output_image,
+        orientation_mask=proxy_mask,
+        straighten=do_straighten,
+        crop=do_crop,
+    )
+
+
 # Health check endpoint
 @app.route('/', methods=['GET'])
 def health():
@@ -211,7 +461,8 @@ def health():
         'service': 'rembg-background-removal',
         'features': {
             'straightening': OPENCV_AVAILABLE,
-            'cropping': True
+            'cropping': True,
+            'proxyMaxEdge': PROXY_MAX_EDGE,
         }
     })
 
@@ -228,6 +479,7 @@ def remove_background():
     Optional parameters:
     - 'straighten': boolean (default: true) - auto-straighten tilted products
     - 'crop': boolean (default: true) - crop to content bounds
+    - 'proxy': boolean (default: true) - segment on a downscaled proxy
 
     Returns:
     - JSON with 'success', 'imageData' (base64 PNG with transparency)
@@ -241,6 +493,7 @@ def remove_background():
         input_image = None
         do_straighten = data.get('straighten', True)
         do_crop = data.get('crop', True)
+        use_proxy = data.get('proxy', True)
 
         # Option 1: Fetch from URL
         if 'imageUrl' in data:
@@ -276,22 +529,8 @@ def remove_background():
         elif input_image.mode != 'RGB':
             input_image = input_image.convert('RGB')
 
-        # Remove background using rembg
-        # IMPORTANT: Alpha matting disabled - it's too aggressive and cuts into products
-        # The isnet-general-use model already provides clean edges
-        output_image = remove(
-            input_image,
-            session=REMBG_SESSION,
-            alpha_matting=False,  # Disabled - was cutting products
-        )
-
-        # Auto-straighten if enabled
-        if do_straighten and OPENCV_AVAILABLE:
-            output_image = straighten_image(output_image)
-
-        # Crop to content if enabled
-        if do_crop:
-            output_image = crop_to_content(output_image)
+        # Remove background, straighten and crop
+        output_image = process_product_image(input_image, do_straighten, do_crop, use_proxy)
 
         # Convert to PNG with transparency
         output_buffer = io.BytesIO()
@@ -308,6 +547,7 @@ def remove_background():
             'height': output_image.height,
             'straightened': do_straighten and OPENCV_AVAILABLE,
             'cropped': do_crop,
+            'proxy': use_proxy,
         })
 
     except Exception as e:
@@ -326,6 +566,7 @@ def remove_background_batch():
     Optional parameters:
     - 'straighten': boolean (default: true) - auto-straighten tilted products
     - 'crop': boolean (default: true) - crop to content bounds
+    - 'proxy': boolean (default: true) - segment on a downscaled proxy
 
     Returns:
     - JSON with 'results' array containing processed images
@@ -342,6 +583,7 @@ def remove_background_batch():
 
         do_straighten = data.get('straighten', True)
         do_crop = data.get('crop', True)
+        use_proxy = data.get('proxy', True)
 
         results = []
 
@@ -370,20 +612,8 @@ def remove_background_batch():
                 elif input_image.mode not in ('RGB', 'RGBA', 'LA'):
                     input_image = input_image.convert('RGB')
 
-                # Remove background - no alpha matting (too aggressive)
-                output_image = remove(
-                    input_image,
-                    session=REMBG_SESSION,
-                    alpha_matting=False,
-                )
-
-                # Auto-straighten if enabled
-                if do_straighten and OPENCV_AVAILABLE:
-                    output_image = straighten_image(output_image)
-
-                # Crop to content if enabled
-                if do_crop:
-                    output_image = crop_to_content(output_image)
+                # Remove background, straighten and crop
+                output_image = process_product_image(input_image, do_straighten, do_crop, use_proxy)
 
                 # Encode as base64
                 output_buffer = io.BytesIO()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Local Food Search (SQLite FTS5)
+Ranked full-text search over a food table's name, brand, category and
+ingredients, stored next to the table in the same database:
+
+    food_search        FTS5 index of the normalized text, rowid = source rowid
+    food_search_docs   content hash per indexed row, for incremental sync
+    food_search_meta   source table and normalizer version
+
+Text is normalized the same way at index and query time: lowercased,
+E-number spellings collapsed (additive_detector.normalize_text),
+apostrophes dropped ("Jerry's" -> "jerrys") and US spellings mapped to UK
+ones ("flavor" -> "flavour", "pasteurized" -> "pasteurised"). Results are
+ordered by BM25 with name > brand > category > ingredients weights. Terms
+match as prefixes by default, and search_many() answers a whole batch of
+queries on one connection.
+
+Usage:
+    python food_search.py [db_path] --rebuild
+    python food_search.py [db_path] "heinz baked beans"
+    python food_search.py [db_path] --batch queries.txt [--limit 5]
+"""
+
+import re
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from additive_detector import normalize_text
+from ingredient_parser import DEFAULT_DB_PATH
+
+# Bump when normalization or the index layout changes (forces a rebuild)
+NORMALIZER_VERSION = 1
+
+SEARCH_COLUMNS = ('name', 'brand', 'category', 'ingredients')
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)   # bm25() weights, same order as SEARCH_COLUMNS
+BATCH_SIZE = 5000
+
+US_TO_UK = {
+    'color': 'colour', 'colors': 'colours', 'colored': 'coloured', 'coloring': 'colouring',
+    'flavor': 'flavour', 'flavors': 'flavours', 'flavored': 'flavoured', 'flavoring': 'flavouring',
+    'flavorings': 'flavourings', 'savory': 'savoury', 'favorite': 'favourite',
+    'fiber': 'fibre', 'center': 'centre', 'liter': 'litre', 'liters': 'litres',
+    'yogurt': 'yoghurt', 'yogurts': 'yoghurts', 'donut': 'doughnut', 'donuts': 'doughnuts',
+    'chili': 'chilli', 'chilies': 'chillies', 'mold': 'mould', 'aluminum': 'aluminium',
+    'licorice': 'liquorice', 'catsup': 'ketchup', 'gray': 'grey', 'mustache': 'moustache',
+    'zucchini': 'courgette', 'zucchinis': 'courgettes', 'eggplant': 'aubergine',
+    'eggplants': 'aubergines', 'cilantro': 'coriander', 'arugula': 'rocket',
+    'garbanzo': 'chickpea', 'garbanzos': 'chickpeas', 'cookie': 'biscuit', 'cookies': 'biscuits',
+}
+# -ize/-ization -> -ise/-isation on words with at least three letters before the suffix
+# (keeps "size", "maize", "prize")
+IZE_SUFFIX = re.compile(r'\b(\w{3,})iz(e|ed|er|ers|es|ing|ation|ations)\b')
+US_WORDS = re.compile(r'\b(?:' + '|'.join(sorted(US_TO_UK, key=len, reverse=True)) + r')\b')
+APOSTROPHES = re.compile(r"['’`]")
+# A term needs at least one character the unicode61 tokenizer keeps ("&" alone is a separator)
+TOKEN_CHARACTER = re.compile(r'[^\W_]')
+
+
+@lru_cache(maxsize=65536)
+def normalize_search_text(text: Optional[str]) -> str:
+    """Index/query form of a piece of text (space-separated tokens)"""
+    if not text:
+        return ''
+    normalized = normalize_text(APOSTROPHES.sub('', str(text))).strip()
+    normalized = IZE_SUFFIX.sub(r'\1is\2', normalized)
+    return US_WORDS.sub(lambda m: US_TO_UK[m.group(0)], normalized)
+
+
+def build_query(text: str, prefix: bool = True, columns: Optional[Sequence[str]] = None) -> str:
+    """
+    FTS5 MATCH expression requiring every term of text, optionally as prefixes
+    and restricted to some of SEARCH_COLUMNS. '' when text has no terms.
+    """
+    terms = [term for term in normalize_search_text(text).split() if TOKEN_CHARACTER.search(term)]
+    if not terms:
+        return ''
+    star = '*' if prefix else ''
+    expression = ' AND '.join(f'"{term}"{star}' for term in terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+def row_digest(values: Sequence[Optional[str]]) -> str:
+    content = '\x1f'.join('' if v is None else str(v) for v in values)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+# ============================================================================
+# Index maintenance
+# ============================================================================
+
+def create_index(conn: sqlite3.Connection):
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS food_search_meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS food_search_docs (doc INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+        CREATE VIRTUAL TABLE IF NOT EXISTS food_search USING fts5(
+            {', '.join(SEARCH_COLUMNS)},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+    """)
+    conn.execute("INSERT INTO food_search(food_search, rank) VALUES ('rank', ?)",
+                 (f"bm25({', '.join(str(w) for w in COLUMN_WEIGHTS)})",))
+
+
+def sync_index(conn: sqlite3.Connection, table: str = 'foods', batch_size: int = BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Bring the index in line with table: re-index rows whose text changed,
+    drop rows that are gone. A different table or normalizer version
+    rebuilds from scratch. Returns (rows indexed, rows removed)
+    """
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if not present:
+        raise ValueError(f"No table named {table}")
+    select = ', '.join(c if c in present else 'NULL' for c in SEARCH_COLUMNS)
+
+    with conn:
+        create_index(conn)
+        meta = dict(conn.execute("SELECT key, value FROM food_search_meta"))
+        if meta.get('table') != table or meta.get('normalizer_version') != str(NORMALIZER_VERSION):
+            conn.execute("DELETE FROM food_search")
+            conn.execute("DELETE FROM food_search_docs")
+            conn.executemany("INSERT OR REPLACE INTO food_search_meta VALUES (?, ?)",
+                             [('table', table), ('normalizer_version', str(NORMALIZER_VERSION))])
+
+        indexed = dict(conn.execute("SELECT doc, hash FROM food_search_docs"))
+        seen = set()
+        changed: List[tuple] = []
+        hashes: List[tuple] = []
+        count = 0
+
+        def flush():
+            conn.executemany("DELETE FROM food_search WHERE rowid = ?", [(row[0],) for row in changed if row[0] in indexed])
+            conn.executemany(f"INSERT INTO food_search (rowid, {', '.join(SEARCH_COLUMNS)}) "
+                             f"VALUES (?, {', '.join('?' * len(SEARCH_COLUMNS))})", changed)
+            conn.executemany("INSERT OR REPLACE INTO food_search_docs VALUES (?, ?)", hashes)
+
+        for rowid, *values in conn.execute(f"SELECT rowid, {select} FROM {table}").fetchall():
+            seen.add(rowid)
+            digest = row_digest(values)
+            if indexed.get(rowid) == digest:
+                continue
+            changed.append((rowid, *(normalize_search_text(v) for v in values)))
+            hashes.append((rowid, digest))
+            if len(changed) >= batch_size:
+                flush()
+                count += len(changed)
+                changed, hashes = [], []
+        flush()
+        count += len(changed)
+
+        removed = [(doc,) for doc in indexed if doc not in seen]
+        conn.executemany("DELETE FROM food_search WHERE rowid = ?", removed)
+        conn.executemany("DELETE FROM food_search_docs WHERE doc = ?", removed)
+        if count or removed:
+            conn.execute("INSERT INTO food_search(food_search) VALUES ('optimize')")
+    return count, len(removed)
+
+
+# ============================================================================
+# Queries
+# ============================================================================
+
+class FoodSearch:
+    """Ranked search over one table; the index is synced when opened"""
+
+    def __init__(self, conn: sqlite3.Connection, table: str = 'foods', sync: bool = True):
+        self.conn = conn
+        self.table = table
+        self.synced = sync_index(conn, table) if sync else (0, 0)
+
+    @classmethod
+    def open(cls, db_path: str, table: str = 'foods', sync: bool = True) -> 'FoodSearch':
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return cls(conn, table, sync)
+
+    def search(self, text: str, limit: int = 20, fields: str = 't.rowid', columns: Optional[Sequence[str]] = None,
+               prefix: bool = True, where: Optional[str] = None, params: tuple = ()) -> List[tuple]:
+        """
+        Best matches for text: (bm25 score, *fields) rows, best first. fields
+        and where are SQL over the source table aliased as t (e.g. where=
+        "t.ingredients IS NULL"); columns restricts which columns may match.
+        """
+        match = build_query(text, prefix, columns)
+        if not match:
+            return []
+        sql = (f"SELECT s.rank, {fields} FROM food_search s JOIN {self.table} t ON t.rowid = s.rowid "
+               f"WHERE food_search MATCH ?" + (f" AND ({where})" if where else "") +
+               " ORDER BY s.rank LIMIT ?")
+        return self.conn.execute(sql, (match, *params, limit)).fetchall()
+
+    def search_many(self, queries: Iterable[str], limit: int = 20, **options) -> Dict[str, List[tuple]]:
+        """search() for a batch of queries in one read transaction; identical queries run once"""
+        results: Dict[str, List[tuple]] = {}
+        self.conn.execute("BEGIN")
+        try:
+            for text in queries:
+                if text not in results:
+                    results[text] = self.search(text, limit, **options)
+        finally:
+            self.conn.execute("COMMIT")
+        return results
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over the foods table")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("query", nargs="?", help="Search text")
+    parser.add_argument("--table", default="foods", help="Source table (foods, products)")
+    parser.add_argument("--batch", metavar="FILE", help="Run one query per line of FILE")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--exact", action="store_true", help="Whole terms only (no prefix matching)")
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the index")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    print("🔎 LOCAL FOOD SEARCH")
+    print("=" * 80)
+
+    conn = sqlite3.connect(args.db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if args.rebuild:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS food_search")
+            conn.execute("DROP TABLE IF EXISTS food_search_docs")
+            conn.execute("DROP TABLE IF EXISTS food_search_meta")
+
+    start = time.time()
+    try:
+        engine = FoodSearch(conn, args.table)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    indexed, removed = engine.synced
+    print(f"✅ Index in sync ({indexed} rows indexed, {removed} removed) in {time.time() - start:.2f}s")
+
+    queries = []
+    if args.batch:
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    elif args.query:
+        queries = [args.query]
+
+    start = time.time()
+    results = engine.search_many(queries, args.limit, fields='t.name, t.brand', prefix=not args.exact)
+    for text in queries:
+        print(f"\n🔍 {text}")
+        for score, name, brand in results[text]:
+            print(f"   {score:8.2f}  {name} ({brand or 'no brand'})")
+        if not results[text]:
+            print("   no matches")
+    if queries:
+        print(f"\n⏱️  {len(queries)} queries in {(time.time() - start) * 1000:.1f}ms")
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Columnar Food Snapshots (Parquet)
+Exports the foods table, or any of the catalogue CSVs
+(uk_foods_complete_backup.csv, fast_food_database.csv, ...), to a Parquet
+snapshot that analysis tools load instead of re-parsing CSV or re-querying
+SQLite row by row:
+
+    typed columns          REAL/nutrient columns float64, INTEGER int64,
+                           is_verified/is_per_unit bool, everything else text
+                           (barcodes always text, leading zeros kept)
+    dictionary encoding    text columns with few distinct values (brand,
+                           category, source...) load as categoricals
+    statistics             min/max/null count per column and row group, so
+                           filters skip row groups without reading them
+
+Loading reads only the requested columns from a memory-mapped file. The
+snapshot records where it came from and a fingerprint of the source file, so
+load_or_export() re-exports only when the source has changed. Values that do
+not fit a column's type (text in a REAL column) become null and are counted in
+the snapshot metadata.
+
+Usage:
+    python food_snapshot.py [db_path] [--table foods] [--out foods.parquet]
+    python food_snapshot.py --csv uk_foods_complete_backup.csv [--out backup.parquet]
+    python food_snapshot.py --info foods.parquet
+    python food_snapshot.py --load foods.parquet --columns name,brand,calories
+    python food_snapshot.py --diff old.parquet new.parquet [--key id] [--columns calories,sugar]
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from ingredient_parser import DEFAULT_DB_PATH
+
+SNAPSHOT_VERSION = 1
+METADATA_KEY = b'nutrasafe.snapshot'
+
+BATCH_SIZE = 50000
+ROW_GROUP_SIZE = 100000
+# Text columns with at most this share of distinct values are dictionary-encoded
+DICTIONARY_MAX_SHARE = 0.5
+
+# Catalogue CSV columns (there is no declared type to go on); portions is JSON text
+CSV_FLOAT_COLUMNS = ('calories', 'protein', 'carbs', 'fat', 'saturated_fat', 'fiber', 'sugar', 'sodium',
+                     'serving_size_g')
+CSV_BOOL_COLUMNS = ('is_verified', 'is_per_unit')
+NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+
+def require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Snapshots need pyarrow (pip install pyarrow)")
+
+
+def source_fingerprint(path: str) -> str:
+    """Size and modification time of a file, plus its SQLite -wal file if that holds any changes"""
+    parts = []
+    for candidate in (path, f"{path}-wal"):
+        if os.path.exists(candidate):
+            stat = os.stat(candidate)
+            if stat.st_size or candidate == path:
+                parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return '/'.join(parts)
+
+
+def default_snapshot_path(source: str, table: Optional[str] = None) -> str:
+    base = Path(source)
+    return str(base.with_suffix(f".{table}.parquet" if table else ".parquet"))
+
+
+def column_type(declared: str) -> 'pa.DataType':
+    """Arrow type for a SQLite declared column type (SQLite affinity rules)"""
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(word in declared for word in ('CHAR', 'CLOB', 'TEXT')):
+        return pa.string()
+    if any(word in declared for word in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    return pa.string()
+
+
+def should_encode(distinct: int, rows: int) -> bool:
+    return rows > 0 and distinct <= rows * DICTIONARY_MAX_SHARE
+
+
+def snapshot_metadata(source: str, fingerprint: str, table: Optional[str], rows: int,
+                      coerced: Dict[str, int]) -> Dict[bytes, bytes]:
+    info = {
+        'version': SNAPSHOT_VERSION,
+        'source': os.path.abspath(source),
+        'table': table,
+        'fingerprint': fingerprint,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': rows,
+        'coerced': {col: n for col, n in coerced.items() if n},
+    }
+    return {METADATA_KEY: json.dumps(info).encode('utf-8')}
+
+
+def write_snapshot(batches, schema: 'pa.Schema', out_path: str, metadata: Dict[bytes, bytes]):
+    """Write record batches to out_path (via a temporary file, so readers never see half a snapshot)"""
+    partial = f"{out_path}.partial"
+    try:
+        with pq.ParquetWriter(partial, schema.with_metadata(metadata), compression='zstd',
+                              use_dictionary=True, write_statistics=True) as writer:
+            for batch in batches:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema), row_group_size=ROW_GROUP_SIZE)
+        os.replace(partial, out_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+# ============================================================================
+# Export
+# ============================================================================
+
+def export_table(db_path: str, out_path: Optional[str] = None, table: str = 'foods',
+                 batch_size: int = BATCH_SIZE) -> Dict:
+    """Snapshot a SQLite table, streaming batch_size rows at a time. Returns the snapshot metadata"""
+    require_pyarrow()
+    out_path = out_path or default_snapshot_path(db_path, table)
+    fingerprint = source_fingerprint(db_path)   # before connecting: opening can create the -wal file
+    conn = sqlite3.connect(db_path)
+    columns = [(row[1], column_type(row[2])) for row in conn.execute(f"PRAGMA table_info({table})")]
+    if not columns:
+        conn.close()
+        raise ValueError(f"No table named {table} in {db_path}")
+
+    # One scan for row count, distinct counts of text columns and values that do not fit their type
+    text = [name for name, kind in columns if kind == pa.string()]
+    typed = [name for name, kind in columns if kind != pa.string()]
+    stats = conn.execute(
+        "SELECT COUNT(*)" +
+        ''.join(f", COUNT(DISTINCT {name})" for name in text) +
+        ''.join(f", SUM(typeof({name}) NOT IN ('integer', 'real', 'null'))" for name in typed) +
+        f" FROM {table}"
+    ).fetchone()
+    rows = stats[0]
+    encoded = {name for name, distinct in zip(text, stats[1:1 + len(text)]) if should_encode(distinct, rows)}
+    coerced = {name: count or 0 for name, count in zip(typed, stats[1 + len(text):])}
+
+    fields, select = [], []
+    for name, kind in columns:
+        if kind == pa.string():
+            select.append(f"CAST({name} AS TEXT)")
+            kind = pa.dictionary(pa.int32(), pa.string()) if name in encoded else kind
+        elif kind == pa.int64():
+            # Whole-number REALs are kept; anything else that is not an integer becomes null
+            select.append(f"CASE WHEN typeof({name}) = 'integer' THEN {name} "
+                          f"WHEN typeof({name}) = 'real' AND {name} = CAST({name} AS INTEGER) "
+                          f"THEN CAST({name} AS INTEGER) END")
+        else:
+            select.append(f"CASE WHEN typeof({name}) IN ('integer', 'real') THEN {name} END")
+        fields.append(pa.field(name, kind))
+    schema = pa.schema(fields)
+
+    def batches():
+        cursor = conn.execute(f"SELECT {', '.join(select)} FROM {table} ORDER BY rowid")
+        while True:
+            chunk = cursor.fetchmany(batch_size)
+            if not chunk:
+                break
+            values = list(zip(*chunk))
+            arrays = []
+            for field, column in zip(fields, values):
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(pa.array(column, pa.string()).dictionary_encode().cast(field.type))
+                else:
+                    arrays.append(pa.array(column, field.type))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    metadata = snapshot_metadata(db_path, fingerprint, table, rows, coerced)
+    try:
+        write_snapshot(batches(), schema, out_path, metadata)
+    finally:
+        conn.close()
+    return json.loads(metadata[METADATA_KEY])
+
+
+def coerce_float(column: 'pa.ChunkedArray') -> 'pa.ChunkedArray':
+    """Text to float64; anything that is not a number becomes null"""
+    column = pc.utf8_trim_whitespace(column)
+    numeric = pc.match_substring_regex(column, NUMBER_PATTERN)
+    return pc.if_else(numeric, column, pa.scalar(None, pa.string())).cast(pa.float64())
+
+
+def coerce_bool(column: 'pa.ChunkedArray') -> 'pa.ChunkedArray':
+    """'true'/'false' in any case to bool; anything else becomes null"""
+    lowered = pc.utf8_lower(pc.utf8_trim_whitespace(column))
+    known = pc.is_in(lowered, value_set=pa.array(['true', 'false']))
+    return pc.if_else(known, pc.equal(lowered, 'true'), pa.scalar(None, pa.bool_()))
+
+
+def read_csv_text(csv_path: str) -> 'pa.Table':
+    """
+    Read a CSV with every column as text and empty cells as null.
+
+    The catalogue CSVs have ragged rows (9 or 17 cells under an 18 column
+    header), which Arrow's CSV reader rejects. Like csv.DictReader, short
+    rows are padded with nulls, cells past the header are dropped and blank
+    lines are skipped.
+    """
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        values = [[] for _ in header]
+        for row in reader:
+            if not row:
+                continue
+            row = row[:len(header)] + [''] * (len(header) - len(row))
+            for cells, cell in zip(values, row):
+                cells.append(cell or None)
+    return pa.Table.from_arrays([pa.array(cells, pa.string()) for cells in values], names=header)
+
+
+def export_csv(csv_path: str, out_path: Optional[str] = None) -> Dict:
+    """Snapshot a catalogue CSV. Returns the snapshot metadata"""
+    require_pyarrow()
+    out_path = out_path or default_snapshot_path(csv_path)
+    fingerprint = source_fingerprint(csv_path)
+
+    # Everything is read as text and typed here, so one bad cell cannot fail the parse
+    table = read_csv_text(csv_path)
+    columns, coerced = [], {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in CSV_FLOAT_COLUMNS:
+            typed = coerce_float(column)
+        elif name in CSV_BOOL_COLUMNS:
+            typed = coerce_bool(column)
+        else:
+            distinct = pc.count_distinct(column).as_py()
+            columns.append(column.dictionary_encode() if should_encode(distinct, len(table)) else column)
+            continue
+        coerced[name] = typed.null_count - column.null_count
+        columns.append(typed)
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+
+    metadata = snapshot_metadata(csv_path, fingerprint, None, len(table), coerced)
+    write_snapshot(table.to_batches(BATCH_SIZE), table.schema, out_path, metadata)
+    return json.loads(metadata[METADATA_KEY])
+
+
+def export_snapshot(source: str, out_path: Optional[str] = None, table: str = 'foods') -> Dict:
+    """export_csv() for .csv sources, export_table() for anything else"""
+    if source.lower().endswith('.csv'):
+        return export_csv(source, out_path)
+    return export_table(source, out_path, table)
+
+
+# ============================================================================
+# Load
+# ============================================================================
+
+def snapshot_info(path: str) -> Dict:
+    """The metadata stored at export time ({} for Parquet files written elsewhere)"""
+    require_pyarrow()
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else {}
+
+
+def is_stale(path: str) -> bool:
+    """True if the snapshot is missing, or its source file has changed since it was exported"""
+    if not os.path.exists(path):
+        return True
+    info = snapshot_info(path)
+    source = info.get('source')
+    return (info.get('version') != SNAPSHOT_VERSION or not source or not os.path.exists(source)
+            or source_fingerprint(source) != info.get('fingerprint'))
+
+
+def read_snapshot(path: str, columns: Optional[Sequence[str]] = None, filters=None) -> 'pa.Table':
+    """
+    Arrow table of only the given columns, memory-mapped. filters use
+    pyarrow's form, e.g. [('calories', '>', 900)]; row groups whose
+    statistics rule the filter out are skipped.
+    """
+    require_pyarrow()
+    return pq.read_table(path, columns=list(columns) if columns else None, filters=filters, memory_map=True)
+
+
+def load_frame(path: str, columns: Optional[Sequence[str]] = None, filters=None):
+    """pandas DataFrame of a snapshot; dictionary-encoded columns come back as categoricals"""
+    return read_snapshot(path, columns, filters).to_pandas()
+
+
+def load_or_export(source: str, columns: Optional[Sequence[str]] = None, table: str = 'foods',
+                   snapshot_path: Optional[str] = None, filters=None) -> 'pa.Table':
+    """read_snapshot() of a source's snapshot, exporting it first if it is missing or out of date"""
+    snapshot_path = snapshot_path or default_snapshot_path(source, None if source.lower().endswith('.csv') else table)
+    if is_stale(snapshot_path):
+        export_snapshot(source, snapshot_path, table)
+    return read_snapshot(snapshot_path, columns, filters)
+
+
+def column_statistics(path: str) -> Dict[str, Dict]:
+    """Per column: type, null count, and min/max over all row groups"""
+    require_pyarrow()
+    parquet = pq.ParquetFile(path)
+    schema = parquet.schema_arrow
+    stats = {name: {'type': str(schema.field(name).type), 'nulls': 0, 'min': None, 'max': None}
+             for name in schema.names}
+    metadata = parquet.metadata
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        for index in range(row_group.num_columns):
+            chunk = row_group.column(index)
+            column = stats.get(chunk.path_in_schema)
+            if column is None or chunk.statistics is None:
+                continue
+            column['nulls'] += chunk.statistics.null_count or 0
+            if chunk.statistics.has_min_max:
+                low, high = chunk.statistics.min, chunk.statistics.max
+                column['min'] = low if column['min'] is None else min(column['min'], low)
+                column['max'] = high if column['max'] is None else max(column['max'], high)
+    return stats
+
+
+# ============================================================================
+# Diff
+# ============================================================================
+
+def plain(table: 'pa.Table') -> 'pa.Table':
+    """Dictionary columns decoded (joins and comparisons need plain values)"""
+    columns = [column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+               for column in table.columns]
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+def diff_snapshots(old_path: str, new_path: str, key: Sequence[str] = ('id',),
+                   columns: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Compare two snapshots by key, reading only the key and compared columns
+    (default: every column both have). key should be unique in each snapshot.
+    Returns {'added': n, 'removed': n, 'changed': {column: n}, 'rows_changed': n}
+    """
+    require_pyarrow()
+    key = list(key)
+    if columns is None:
+        old_names = pq.read_schema(old_path).names
+        new_names = set(pq.read_schema(new_path).names)
+        columns = [name for name in old_names if name in new_names and name not in key]
+    columns = list(columns)
+
+    old = plain(read_snapshot(old_path, key + columns))
+    new = plain(read_snapshot(new_path, key + columns))
+    old = old.append_column('_old', pa.repeat(True, old.num_rows))
+    new = new.append_column('_new', pa.repeat(True, new.num_rows))
+    joined = old.join(new, keys=key, join_type='full outer', left_suffix='_a', right_suffix='_b')
+
+    in_old = pc.fill_null(joined.column('_old'), False)
+    in_new = pc.fill_null(joined.column('_new'), False)
+    both = pc.and_(in_old, in_new)
+    changed: Dict[str, int] = {}
+    any_changed = pa.array([False] * joined.num_rows, pa.bool_())
+    for name in columns:
+        a, b = joined.column(f"{name}_a"), joined.column(f"{name}_b")
+        differs = pc.fill_null(pc.not_equal(a, b), False)
+        differs = pc.or_(differs, pc.xor(pc.is_null(a), pc.is_null(b)))
+        differs = pc.and_(differs, both)
+        changed[name] = pc.sum(differs).as_py() or 0
+        any_changed = pc.or_(any_changed, differs)
+    return {
+        'added': pc.sum(pc.and_(in_new, pc.invert(in_old))).as_py() or 0,
+        'removed': pc.sum(pc.and_(in_old, pc.invert(in_new))).as_py() or 0,
+        'changed': changed,
+        'rows_changed': pc.sum(any_changed).as_py() or 0,
+    }
+
+
+def print_statistics(path: str):
+    for name, column in column_statistics(path).items():
+        low = '' if column['min'] is None else str(column['min'])[:24]
+        high = '' if column['max'] is None else str(column['max'])[:24]
+        print(f"   {name:20} {column['type'][:40]:40} nulls {column['nulls']:8}  {low:24} .. {high}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and load columnar (Parquet) snapshots of the foods catalogue")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--table", default="foods")
+    parser.add_argument("--csv", help="Snapshot this CSV instead of the database")
+    parser.add_argument("--out", help="Snapshot path (default: next to the source, .parquet)")
+    parser.add_argument("--info", metavar="SNAPSHOT", help="Show a snapshot's metadata and column statistics")
+    parser.add_argument("--load", metavar="SNAPSHOT", help="Time loading a snapshot (with --columns)")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Compare two snapshots")
+    parser.add_argument("--key", default="id", help="With --diff: comma-separated key columns (default: id)")
+    parser.add_argument("--columns", help="Comma-separated columns to load or compare")
+    args = parser.parse_args()
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow is not installed (pip install pyarrow)")
+        sys.exit(1)
+
+    print("🧊 FOOD SNAPSHOTS (PARQUET)")
+    print("=" * 80)
+
+    if args.info:
+        info = snapshot_info(args.info)
+        for key, value in info.items():
+            print(f"   {key:12} {value}")
+        print(f"   {'stale':12} {is_stale(args.info)}\n")
+        print_statistics(args.info)
+        return
+
+    if args.load:
+        start = time.time()
+        table = read_snapshot(args.load, columns)
+        print(f"✅ {table.num_rows} rows x {table.num_columns} columns loaded in {(time.time() - start) * 1000:.1f}ms "
+              f"({table.nbytes / 1024 / 1024:.1f} MB in memory)")
+        return
+
+    if args.diff:
+        start = time.time()
+        result = diff_snapshots(*args.diff, key=[k.strip() for k in args.key.split(',')], columns=columns)
+        print(f"✅ Compared in {time.time() - start:.2f}s: {result['added']} added, {result['removed']} removed, "
+              f"{result['rows_changed']} changed")
+        for name, count in sorted(result['changed'].items(), key=lambda item: -item[1]):
+            if count:
+                print(f"   {name:20} {count:8}")
+        return
+
+    source = args.csv or args.db_path
+    if not Path(source).exists():
+        print(f"❌ Source not found: {source}")
+        sys.exit(1)
+    out_path = args.out or default_snapshot_path(source, None if args.csv else args.table)
+
+    start = time.time()
+    try:
+        info = export_csv(source, out_path) if args.csv else export_table(source, out_path, args.table)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {info['rows']} rows exported to {out_path} in {time.time() - start:.2f}s "
+          f"({os.path.getsize(out_path) / 1024 / 1024:.1f} MB)")
+    for name, count in info['coerced'].items():
+        print(f"   ⚠️  {count} {name} values were not valid for the column type and are null")
+    print()
+    print_statistics(out_path)
+
+
+if __name__ == "__main__":
+    main()
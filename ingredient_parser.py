@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Structured Ingredient-List Parser
+Turns cleaned ingredient strings into compact trees:
+
+    "Chicken Breast 22%, Hoisin Sauce (Sugar, Soya Bean (5%)), Salt. Contains: Soya. May contain Sesame."
+
+    -> Chicken Breast [22%]
+       Hoisin Sauce
+         Sugar
+         Soya Bean [5%]  {soya}
+       Salt
+       contains {soya}, may contain {sesame}
+
+Each node carries name, percent, sub-ingredients and a bitmask of the 14 UK
+regulated allergens. Tokenizing is a single regex pass over bracket/separator
+characters (no backtracking), so whole-table parses are cheap. Trees are
+cached by ingredient-string hash in the ingredient_trees table so additive,
+allergen and micronutrient analyses share one parse.
+
+Usage:
+    python ingredient_parser.py [db_path]
+    python ingredient_parser.py --parse "Sugar, Cocoa Butter, MILK Powder. May contain nuts."
+    python ingredient_parser.py --check       # allergen keyword regression cases
+"""
+
+import re
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_DB_PATH = SCRIPT_DIR / "NutraSafe Beta" / "Database" / "nutrasafe_foods.db"
+
+# Bump when parsing rules change so cached trees are rebuilt
+PARSER_VERSION = 3
+
+# ============================================================================
+# UK allergens (Food Information Regulations, Annex II) as bit flags
+# ============================================================================
+
+UK_ALLERGENS = [
+    'celery', 'gluten', 'crustaceans', 'eggs', 'fish', 'lupin', 'milk',
+    'molluscs', 'mustard', 'nuts', 'peanuts', 'sesame', 'soya', 'sulphites',
+]
+ALLERGEN_BITS = {name: 1 << i for i, name in enumerate(UK_ALLERGENS)}
+
+ALLERGEN_KEYWORDS = {
+    'celery': ['celery', 'celeriac'],
+    'gluten': ['wheat', 'rye', 'barley', 'oat', 'oats', 'oatmeal', 'spelt', 'kamut', 'gluten', 'semolina',
+               'durum', 'couscous', 'malt', 'triticale', 'cereals containing gluten'],
+    'crustaceans': ['crab', 'lobster', 'prawn', 'prawns', 'shrimp', 'shrimps', 'crayfish',
+                    'langoustine', 'langoustines', 'crustacean', 'crustaceans', 'scampi'],
+    'eggs': ['egg', 'eggs', 'albumen', 'egg white', 'egg yolk'],
+    'fish': ['fish', 'anchovy', 'anchovies', 'salmon', 'tuna', 'cod', 'haddock', 'mackerel',
+             'sardine', 'sardines', 'pollock', 'trout', 'hake', 'pilchard', 'pilchards'],
+    'lupin': ['lupin', 'lupine'],
+    'milk': ['milk', 'butter', 'buttermilk', 'cream', 'cheese', 'whey', 'lactose', 'casein',
+             'caseinate', 'caseinates', 'yoghurt', 'yogurt', 'ghee', 'curd', 'milk fat'],
+    'molluscs': ['mussel', 'mussels', 'oyster', 'oysters', 'squid', 'clam', 'clams', 'scallop',
+                 'scallops', 'octopus', 'snail', 'snails', 'mollusc', 'molluscs', 'whelk', 'whelks'],
+    'mustard': ['mustard'],
+    'nuts': ['nut', 'nuts', 'tree nuts', 'almond', 'almonds', 'hazelnut', 'hazelnuts', 'walnut',
+             'walnuts', 'cashew', 'cashews', 'pecan', 'pecans', 'brazil nut', 'brazil nuts',
+             'pistachio', 'pistachios', 'macadamia', 'macadamias', 'praline'],
+    'peanuts': ['peanut', 'peanuts', 'groundnut', 'groundnuts', 'arachis'],
+    'sesame': ['sesame', 'tahini'],
+    'soya': ['soya', 'soy', 'soybean', 'soybeans', 'soyabean', 'soyabeans', 'edamame', 'tofu'],
+    'sulphites': ['sulphite', 'sulphites', 'sulfite', 'sulfites', 'sulphur dioxide', 'sulfur dioxide',
+                  'metabisulphite', 'metabisulfite', 'e220', 'e221', 'e222', 'e223', 'e224',
+                  'e225', 'e226', 'e227', 'e228'],
+}
+
+# Phrases that contain an allergen keyword but aren't that allergen
+ALLERGEN_EXCLUSIONS = re.compile(
+    r'\b(?:cocoa butter|shea butter|butter beans?|cream of tartar|cream crackers?|gluten[- ]free|butternut|'
+    r'buckwheat|nutmeg|e\s?-?\s?(?:22[0-8]))\b',
+    re.IGNORECASE
+)
+
+# Plant "milk"/"butter"/"cream": only the dairy word is dropped, so "Peanut Butter"
+# still flags peanuts and "Oat Milk" still flags gluten
+PLANT_DAIRY_PREFIXES = (ALLERGEN_KEYWORDS['nuts'] + ALLERGEN_KEYWORDS['peanuts'] +
+                        ['oat', 'oats', 'rice', 'soya', 'soy', 'coconut', 'seed', 'sunflower', 'sesame'])
+PLANT_DAIRY = re.compile(
+    r'\b((?:' + '|'.join(re.escape(k) for k in sorted(PLANT_DAIRY_PREFIXES, key=len, reverse=True)) +
+    r')\s+)(?:milk|butter|cream)\b',
+    re.IGNORECASE
+)
+
+# keyword -> bit, matched with one alternation regex (longest keywords first)
+ALLERGEN_KEYWORD_BITS = {
+    keyword: ALLERGEN_BITS[allergen]
+    for allergen, keywords in ALLERGEN_KEYWORDS.items()
+    for keyword in keywords
+}
+ALLERGEN_WORDS = re.compile(
+    r'\b(?:' + '|'.join(re.escape(k) for k in sorted(ALLERGEN_KEYWORD_BITS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+SULPHITE_E_NUMBER = re.compile(r'\be\s?-?\s?22[0-8]\b', re.IGNORECASE)
+
+
+def allergen_flags(text: str) -> int:
+    """Bitmask of UK allergens mentioned in text"""
+    flags = ALLERGEN_BITS['sulphites'] if SULPHITE_E_NUMBER.search(text) else 0
+    text = PLANT_DAIRY.sub(r'\1', ALLERGEN_EXCLUSIONS.sub(' ', text))
+    for match in ALLERGEN_WORDS.finditer(text):
+        flags |= ALLERGEN_KEYWORD_BITS[match.group().lower()]
+    return flags
+
+
+def allergen_names(flags: int) -> List[str]:
+    """Expand an allergen bitmask to names"""
+    return [name for name in UK_ALLERGENS if flags & ALLERGEN_BITS[name]]
+
+
+# ============================================================================
+# Tree
+# ============================================================================
+
+class IngredientNode:
+    """One ingredient: name, optional percent, sub-ingredients, allergen bits"""
+    __slots__ = ('name', 'percent', 'children', 'allergens', 'emphasized')
+
+    def __init__(self, name: str, percent: Optional[float] = None):
+        self.name = name
+        self.percent = percent
+        self.children: List['IngredientNode'] = []
+        self.allergens = 0
+        self.emphasized = False  # allergen written in CAPITALS (bold on pack)
+
+    def to_compact(self) -> list:
+        """[name, percent, allergens, emphasized, children] for JSON storage"""
+        return [self.name, self.percent, self.allergens, int(self.emphasized),
+                [child.to_compact() for child in self.children]]
+
+    @classmethod
+    def from_compact(cls, data: list) -> 'IngredientNode':
+        node = cls(data[0], data[1])
+        node.allergens = data[2]
+        node.emphasized = bool(data[3])
+        node.children = [cls.from_compact(child) for child in data[4]]
+        return node
+
+    def __repr__(self):
+        percent = f" {self.percent:g}%" if self.percent is not None else ""
+        return f"IngredientNode({self.name!r}{percent}, {len(self.children)} children)"
+
+
+class ParsedIngredients:
+    """Top-level ingredient list plus 'Contains:' / 'May contain:' allergen bits"""
+    __slots__ = ('items', 'contains', 'may_contain')
+
+    def __init__(self, items: List[IngredientNode], contains: int = 0, may_contain: int = 0):
+        self.items = items
+        self.contains = contains
+        self.may_contain = may_contain
+
+    @property
+    def allergens(self) -> int:
+        """Every allergen in the list or its 'Contains:' statement"""
+        flags = self.contains
+        for node, _, _ in iter_nodes(self.items):
+            flags |= node.allergens
+        return flags
+
+    def to_compact(self) -> list:
+        return [[item.to_compact() for item in self.items], self.contains, self.may_contain]
+
+    @classmethod
+    def from_compact(cls, data: list) -> 'ParsedIngredients':
+        return cls([IngredientNode.from_compact(item) for item in data[0]], data[1], data[2])
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_compact(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'ParsedIngredients':
+        return cls.from_compact(json.loads(text))
+
+
+def iter_nodes(items: List[IngredientNode], depth: int = 0) -> Iterator[Tuple[IngredientNode, int, int]]:
+    """Depth-first (node, depth, position among siblings) over a tree"""
+    for position, node in enumerate(items):
+        yield node, depth, position
+        if node.children:
+            yield from iter_nodes(node.children, depth + 1)
+
+
+# ============================================================================
+# Parser
+# ============================================================================
+
+# One token per bracket, separator, sentence-ending full stop or run of other
+# characters - plain character classes, so matching never backtracks
+TOKEN = re.compile(r'[(\[{]|[)\]}]|[,;]|\.(?=\s|$)|[^()\[\]{},;.]+|\.')
+PERCENT = re.compile(r'(\d+(?:[.,]\d+)?)\s*%')
+PERCENT_QUALIFIER = re.compile(r'^(?:(?:min|max)(?:imum)?\.?)?$', re.IGNORECASE)
+PREFIX = re.compile(r'^\s*ingredients?\s*[:\-]\s*', re.IGNORECASE)
+SENTENCE_END = re.compile(r'\.(?:\s+|$)')
+TAIL_SPLIT = re.compile(r'\.(?:\s+|$)|;|\s(?=may (?:also )?contain)', re.IGNORECASE)
+LAST_WORD = re.compile(r'(\w+)$')
+ABBREVIATIONS = {'vit', 'approx', 'min', 'max', 'inc', 'incl', 'eg', 'e.g', 'etc', 'no', 'st', 'var', 'conc'}
+MAY_CONTAIN = re.compile(
+    r'^(?:allergy advice\s*[:\-]?\s*)?(?:may (?:also )?contain|made (?:in|on) .*?(?:also|handles?)|'
+    r'produced in .*?(?:also|handles?)|not suitable for .*?allerg)',
+    re.IGNORECASE
+)
+CONTAINS = re.compile(r'^(?:allergy advice\s*[:\-]?\s*)?(?:contains?|allergens?)\b', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+CAPS_WORD = re.compile(r'\b[A-Z]{3,}\b')
+
+
+def _emphasized(name: str) -> bool:
+    """Allergen keyword written in CAPITALS (how bold emphasis survives as text)"""
+    return any(allergen_flags(word) for word in CAPS_WORD.findall(name))
+
+
+def _make_node(raw: str) -> Optional[IngredientNode]:
+    """Build a node from a name fragment, pulling out an embedded percentage"""
+    text = SPACES.sub(' ', raw).strip(' :*-')
+    if not text:
+        return None
+
+    percent = None
+    match = PERCENT.search(text)
+    if match:
+        percent = float(match.group(1).replace(',', '.'))
+        text = SPACES.sub(' ', text[:match.start()] + text[match.end():]).strip(' :*-')
+
+    node = IngredientNode(text, percent)
+    node.allergens = allergen_flags(text)
+    node.emphasized = bool(node.allergens) and _emphasized(text)
+    return node
+
+
+def _parse_tail(result: 'ParsedIngredients', tail: str):
+    """Apply 'Contains: ...' / 'May contain ...' sentences; other notes are ignored"""
+    for sentence in TAIL_SPLIT.split(tail):
+        sentence = sentence.strip(' ,;')
+        if MAY_CONTAIN.match(sentence):
+            result.may_contain |= allergen_flags(sentence)
+        elif CONTAINS.match(sentence):
+            result.contains |= allergen_flags(sentence)
+
+
+MAY_CONTAIN_ITEM = re.compile(r'\(\s*may (?:also )?contain', re.IGNORECASE)
+
+
+def declared_allergens(text: Optional[str]) -> Tuple[int, int]:
+    """
+    (contains, may contain) bitmasks for a declared allergens string:
+    "Contains Peanuts. May contain Tree Nuts", "Oats, may contain Gluten",
+    "Milk, Nuts (may contain - factory)"
+    """
+    contains = may_contain = 0
+    for sentence in TAIL_SPLIT.split(text or ''):
+        sentence = sentence.strip(' ,;')
+        if MAY_CONTAIN.match(sentence):
+            may_contain |= allergen_flags(sentence)
+            continue
+        for item in sentence.split(','):
+            if MAY_CONTAIN_ITEM.search(item):
+                may_contain |= allergen_flags(item)
+            else:
+                contains |= allergen_flags(item)
+    return contains, may_contain & ~contains
+
+
+def parse_ingredients(text: Optional[str]) -> ParsedIngredients:
+    """Parse one ingredients string into a tree"""
+    result = ParsedIngredients([])
+    if not text:
+        return result
+
+    text = PREFIX.sub('', text)
+
+    # (children being filled, owning node or None at the top level)
+    stack: List[Tuple[List[IngredientNode], Optional[IngredientNode]]] = [(result.items, None)]
+    buffer: List[str] = []
+    last: Optional[IngredientNode] = None   # latest node at this level
+    after_close = False                     # a bracket group just closed on `last`
+    tail: Optional[str] = None              # 'Contains:' etc. found mid-list
+
+    def flush() -> Optional[IngredientNode]:
+        nonlocal last, tail
+        raw = ''.join(buffer)
+        buffer.clear()
+        if not raw.strip():
+            return None
+
+        children, parent = stack[-1]
+
+        if after_close and last is not None:
+            # Text after a closing bracket continues that ingredient:
+            # "Palm Fat (Palm) Blend", "Milk Chocolate (Sugar, ...) 18%"
+            extra = _make_node(raw)
+            if extra is not None:
+                if extra.name:
+                    last.name = f"{last.name} {extra.name}".strip()
+                    last.allergens |= extra.allergens
+                    last.emphasized = last.emphasized or extra.emphasized
+                if extra.percent is not None and last.percent is None:
+                    last.percent = extra.percent
+            return last
+
+        if parent is None and (CONTAINS.match(raw.strip()) or MAY_CONTAIN.match(raw.strip())):
+            tail = raw
+            return None
+
+        node = _make_node(raw)
+        if node is None:
+            return None
+
+        # "(4%)" / "(5% max)" groups are the owner's percentage, not an ingredient
+        if parent is not None and node.percent is not None and PERCENT_QUALIFIER.match(node.name):
+            if parent.percent is None:
+                parent.percent = node.percent
+            return None
+
+        children.append(node)
+        last = node
+        return node
+
+    for match in TOKEN.finditer(text):
+        token = match.group()
+
+        if token in '([{':
+            node = flush()
+            owner = node or (last if after_close else None)
+            if owner is None:
+                # Anonymous group: "..., (Sugar, Salt)"
+                owner = IngredientNode('')
+                stack[-1][0].append(owner)
+            stack.append((owner.children, owner))
+            last, after_close = None, False
+        elif token in ')]}':
+            flush()
+            if len(stack) > 1:
+                _, owner = stack.pop()
+                owner.allergens |= _children_allergens(owner)
+                last, after_close = owner, True
+        elif token in ',;':
+            flush()
+            last, after_close = None, False
+        elif token == '.' and _ends_sentence(text, match.start()):
+            flush()
+            last, after_close = None, False
+            if len(stack) == 1:
+                # End of the ingredient sentence: the rest is allergen statements or notes
+                _parse_tail(result, text[match.end():])
+                break
+        else:
+            buffer.append(token)
+
+        if tail is not None:
+            _parse_tail(result, tail + text[match.start():])
+            break
+    else:
+        flush()
+        if tail is not None:
+            _parse_tail(result, tail)
+
+    # Unbalanced brackets: close whatever is still open
+    while len(stack) > 1:
+        _, owner = stack.pop()
+        owner.allergens |= _children_allergens(owner)
+
+    return result
+
+
+def _ends_sentence(text: str, dot: int) -> bool:
+    """A full stop followed by space/end that isn't an abbreviation ("Vit. C")"""
+    if not SENTENCE_END.match(text, dot):
+        return False
+    word = LAST_WORD.search(text, 0, dot)
+    return not word or word.group(1).lower() not in ABBREVIATIONS
+
+
+def _children_allergens(node: IngredientNode) -> int:
+    flags = 0
+    for child in node.children:
+        flags |= child.allergens
+    return flags
+
+
+# ============================================================================
+# Batch API
+# ============================================================================
+
+def ingredient_hash(text: str) -> str:
+    """Cache key for an ingredients string"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def create_tree_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingredient_trees (
+            hash TEXT PRIMARY KEY,
+            parser_version INTEGER NOT NULL,
+            tree TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def load_trees(conn: sqlite3.Connection) -> Dict[str, ParsedIngredients]:
+    """Load every cached tree for the current parser version, keyed by hash"""
+    return {
+        key: ParsedIngredients.from_json(tree)
+        for key, tree in conn.execute(
+            "SELECT hash, tree FROM ingredient_trees WHERE parser_version = ?", (PARSER_VERSION,)
+        )
+    }
+
+
+def get_tree(conn: sqlite3.Connection, ingredients: str) -> ParsedIngredients:
+    """Cached tree for one ingredients string (parsed and stored on a miss)"""
+    key = ingredient_hash(ingredients)
+    row = conn.execute(
+        "SELECT tree FROM ingredient_trees WHERE hash = ? AND parser_version = ?", (key, PARSER_VERSION)
+    ).fetchone()
+    if row:
+        return ParsedIngredients.from_json(row[0])
+
+    tree = parse_ingredients(ingredients)
+    conn.execute("INSERT OR REPLACE INTO ingredient_trees VALUES (?, ?, ?)", (key, PARSER_VERSION, tree.to_json()))
+    return tree
+
+
+def iter_food_trees(conn: sqlite3.Connection) -> Iterator[Tuple[str, str, ParsedIngredients]]:
+    """
+    Yield (food_id, ingredients hash, tree) for every food with ingredients,
+    using cached trees. Run parse_foods first so every tree is cached.
+    """
+    cursor = conn.execute("""
+        SELECT id, ingredients FROM foods
+        WHERE ingredients IS NOT NULL AND ingredients != ''
+    """)
+    cache: Dict[str, ParsedIngredients] = {}
+    for food_id, ingredients in cursor:
+        key = ingredient_hash(ingredients)
+        tree = cache.get(key)
+        if tree is None:
+            tree = cache[key] = get_tree(conn, ingredients)
+        yield food_id, key, tree
+
+
+def parse_foods(db_path: str, batch_size: int = 5000) -> Tuple[int, int]:
+    """
+    Parse every distinct ingredients string in the foods table that isn't
+    already cached for this parser version.
+
+    Returns (distinct strings, newly parsed)
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_tree_table(conn)
+    conn.execute("DELETE FROM ingredient_trees WHERE parser_version != ?", (PARSER_VERSION,))
+
+    cached = {row[0] for row in conn.execute("SELECT hash FROM ingredient_trees")}
+    seen = set()
+    batch = []
+    parsed = 0
+
+    read = sqlite3.connect(db_path)
+    for (ingredients,) in read.execute(
+        "SELECT DISTINCT ingredients FROM foods WHERE ingredients IS NOT NULL AND ingredients != ''"
+    ):
+        key = ingredient_hash(ingredients)
+        seen.add(key)
+        if key in cached:
+            continue
+
+        batch.append((key, PARSER_VERSION, parse_ingredients(ingredients).to_json()))
+        if len(batch) >= batch_size:
+            conn.executemany("INSERT OR REPLACE INTO ingredient_trees VALUES (?, ?, ?)", batch)
+            conn.commit()
+            parsed += len(batch)
+            batch = []
+    read.close()
+
+    if batch:
+        conn.executemany("INSERT OR REPLACE INTO ingredient_trees VALUES (?, ?, ?)", batch)
+        parsed += len(batch)
+    conn.commit()
+    conn.close()
+
+    return len(seen), parsed
+
+
+def format_tree(parsed: ParsedIngredients) -> str:
+    """Human-readable tree (for --parse)"""
+    lines = []
+    for node, depth, _ in iter_nodes(parsed.items):
+        percent = f" [{node.percent:g}%]" if node.percent is not None else ""
+        allergens = f"  {{{', '.join(allergen_names(node.allergens))}}}" if node.allergens else ""
+        emphasis = " *" if node.emphasized else ""
+        lines.append(f"{'  ' * depth}{node.name}{percent}{allergens}{emphasis}")
+    if parsed.contains:
+        lines.append(f"contains {{{', '.join(allergen_names(parsed.contains))}}}")
+    if parsed.may_contain:
+        lines.append(f"may contain {{{', '.join(allergen_names(parsed.may_contain))}}}")
+    return '\n'.join(lines)
+
+
+# text -> allergens allergen_flags must report (plant milks/butters keep their nut/cereal flag)
+ALLERGEN_CHECKS = [
+    ("Peanut Butter", ['peanuts']),
+    ("Nut butter", ['nuts']),
+    ("Hazelnut butter", ['nuts']),
+    ("Almond Milk", ['nuts']),
+    ("Cashew milk", ['nuts']),
+    ("Oat Milk", ['gluten']),
+    ("Oatmeal", ['gluten']),
+    ("Soya milk, Butter", ['milk', 'soya']),
+    ("Coconut Milk, Cocoa Butter", []),
+    ("Butternut Squash, Nutmeg", []),
+    ("Butter Beans (45%), Water, Salt", []),
+    ("Butter, Butter Beans", ['milk']),
+    ("Butterscotch Flavouring", []),
+    ("Cream Crackers", []),
+    ("Whole Milk, Cream", ['milk']),
+]
+
+# declared allergens text -> (contains, may contain) declared_allergens must report
+DECLARED_CHECKS = [
+    ("Contains Peanuts. May contain Tree Nuts", (['peanuts'], ['nuts'])),
+    ("Oats, may contain Gluten", (['gluten'], [])),
+    ("Milk, Nuts (may contain - factory)", (['milk'], ['nuts'])),
+    ("Wheat, Soya", (['gluten', 'soya'], [])),
+]
+
+
+def run_checks() -> bool:
+    """Run ALLERGEN_CHECKS and DECLARED_CHECKS, printing each result"""
+    results = [(text, allergen_names(allergen_flags(text)), expected) for text, expected in ALLERGEN_CHECKS]
+    results += [(text, tuple(allergen_names(flags) for flags in declared_allergens(text)), expected)
+                for text, expected in DECLARED_CHECKS]
+    failures = 0
+    for text, got, expected in results:
+        ok = got == expected
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} {text!r}: {got}" + ('' if ok else f" (expected {expected})"))
+    print(f"\n{len(results) - failures}/{len(results)} allergen checks passed")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse ingredient lists into structured trees")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--parse", metavar="TEXT", help="Parse and print a single ingredients string")
+    parser.add_argument("--check", action="store_true", help="Run the allergen keyword regression cases")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if run_checks() else 1)
+
+    if args.parse:
+        print(format_tree(parse_ingredients(args.parse)))
+        return
+
+    print("🌳 INGREDIENT TREE PARSE")
+    print("=" * 80)
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    start = time.time()
+    distinct, parsed = parse_foods(args.db_path)
+    print(f"✅ {distinct} distinct ingredient lists, {parsed} parsed "
+          f"({distinct - parsed} cached) in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -92,150 +92,130 @@ def parse_csv_sources(sources_str: str) -> List[Dict[str, str]]:
         print(f"⚠️  Error parsing sources: {sources_str[:100]}... Error: {e}")
         return []
 
-def parse_csv_components(line: str) -> List[str]:
-    """Parse CSV line handling quoted fields with commas."""
-    components = []
-    current = ""
-    in_quotes = False
-    i = 0
-
-    while i < len(line):
-        char = line[i]
-
-        if in_quotes:
-            if char == '"':
-                # Check if next char is also a quote (escaped)
-                if i + 1 < len(line) and line[i + 1] == '"':
-                    current += '"'
-                    i += 1  # Skip the second quote
-                else:
-                    in_quotes = False
-            else:
-                current += char
-        else:
-            if char == '"':
-                in_quotes = True
-            elif char == ',':
-                components.append(current.strip())
-                current = ""
-            else:
-                current += char
-
-        i += 1
+def csv_row_to_additive(components: List[str]) -> Dict[str, Any]:
+    """Build an additive record from one CSV row (already split into fields)."""
+    components = [c.strip() for c in components]
+    e_number = components[0].strip()
+    name = components[1].strip()
+
+    # Get sources from column 20 (index 19)
+    sources = []
+    if len(components) > 19:
+        sources = parse_csv_sources(components[19])
+
+    # Parse synonyms from column 17 (index 16)
+    synonyms = []
+    if len(components) > 16:
+        raw_synonyms = components[16].split(';')
+        synonyms = [s.strip() for s in raw_synonyms if s.strip() and s.strip() != e_number and s.strip().lower() != name.lower()]
+
+    # Map raw CSV text to enum values
+    raw_group = components[2].strip() if len(components) > 2 else "other"
+    raw_origin = components[11].strip() if len(components) > 11 else "unknown"
+    raw_verdict = components[15].strip() if len(components) > 15 else "neutral"
+
+    return {
+        "id": e_number,  # Add id field for Swift Identifiable conformance
+        "eNumber": e_number,
+        "name": name,
+        "group": map_to_additive_group(raw_group),  # Map to enum value
+        "category": map_to_additive_category(raw_group),  # Map to enum value
+        "origin": map_to_additive_origin(raw_origin),  # Map to enum value
+        "overview": components[12].strip() if len(components) > 12 else "",  # overview column
+        "typicalUses": components[13].strip() if len(components) > 13 else "",  # typical_uses column
+        "effectsVerdict": map_to_additive_verdict(raw_verdict),  # Map to enum value
+        "effectsSummary": components[14].strip() if len(components) > 14 else "",  # effects_summary column
+        "hasChildWarning": components[7].strip().lower() == 'true' if len(components) > 7 else False,  # child_warning column
+        "hasPKUWarning": components[8].strip().lower() == 'true' if len(components) > 8 else False,  # PKU_warning column
+        "hasSulphitesAllergenLabel": components[10].strip().lower() == 'true' if len(components) > 10 else False,  # sulphites_allergen_label column
+        "hasPolyolsWarning": components[9].strip().lower() == 'true' if len(components) > 9 else False,  # polyols_warning column
+        "isPermittedGB": components[3].strip().lower() != 'false' if len(components) > 3 else True,  # permitted_GB column
+        "isPermittedNI": components[4].strip().lower() != 'false' if len(components) > 4 else True,  # permitted_NI column
+        "isPermittedEU": components[5].strip().lower() != 'false' if len(components) > 5 else True,  # permitted_EU column
+        "synonyms": synonyms,
+        "sources": sources,
+        "statusNotes": components[6].strip() if len(components) > 6 and components[6].strip() else None,  # status_notes column
+        "insNumber": components[18].strip() if len(components) > 18 and components[18].strip() else None,  # ins_number column
+        "consumerInfo": None
+    }
 
-    # Add the last field
-    components.append(current.strip())
-    return components
+def parse_csv_rows(rows) -> Dict[str, Dict[str, Any]]:
+    """Additives by E-number from csv.reader rows (title and header rows already skipped)."""
+    additives = {}
+    for components in rows:
+        if len(components) < 16:
+            continue
+        additive = csv_row_to_additive(components)
+        additives[additive['eNumber']] = additive
+    return additives
 
 def parse_csv_database(csv_path: str) -> Dict[str, Dict[str, Any]]:
     """Parse CSV database and return dict of additives by E-number."""
-    additives = {}
-
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        lines = content.split('\n')
-
-        # Skip title row and header row (lines 0 and 1)
-        for line in lines[2:]:
-            if not line.strip():
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        # Skip title row and header row
+        next(reader, None)
+        next(reader, None)
+        return parse_csv_rows(reader)
+
+def iter_json_additives(data: Dict[str, Any]):
+    """Yield (category, code, record) from the nested categories structure.
+
+    Ranges normally nest records ({"E100-E199": {"E100": {...}}}), but
+    categories added later hold records directly ({"MISC-001": {...}}).
+    """
+    for category_name, category_data in data.get("categories", {}).items():
+        for range_name, range_data in category_data.items():
+            if isinstance(range_data.get("name"), str):
+                yield category_name, range_name, range_data
                 continue
+            for e_number, additive_data in range_data.items():
+                yield category_name, e_number, additive_data
 
-            components = parse_csv_components(line)
-            if len(components) < 16:
-                continue
+def json_to_additives(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Additives by E-number from a loaded additives_master_database.json."""
+    additives = {}
 
-            e_number = components[0].strip()
-            name = components[1].strip()
-
-            # Get sources from column 20 (index 19)
-            sources = []
-            if len(components) > 19:
-                sources = parse_csv_sources(components[19])
-
-            # Parse synonyms from column 17 (index 16)
-            synonyms = []
-            if len(components) > 16:
-                raw_synonyms = components[16].split(';')
-                synonyms = [s.strip() for s in raw_synonyms if s.strip() and s.strip() != e_number and s.strip().lower() != name.lower()]
-
-            # Map raw CSV text to enum values
-            raw_group = components[2].strip() if len(components) > 2 else "other"
-            raw_origin = components[11].strip() if len(components) > 11 else "unknown"
-            raw_verdict = components[15].strip() if len(components) > 15 else "neutral"
-
-            additives[e_number] = {
-                "id": e_number,  # Add id field for Swift Identifiable conformance
-                "eNumber": e_number,
-                "name": name,
-                "group": map_to_additive_group(raw_group),  # Map to enum value
-                "category": map_to_additive_category(raw_group),  # Map to enum value
-                "origin": map_to_additive_origin(raw_origin),  # Map to enum value
-                "overview": components[12].strip() if len(components) > 12 else "",  # overview column
-                "typicalUses": components[13].strip() if len(components) > 13 else "",  # typical_uses column
-                "effectsVerdict": map_to_additive_verdict(raw_verdict),  # Map to enum value
-                "effectsSummary": components[14].strip() if len(components) > 14 else "",  # effects_summary column
-                "hasChildWarning": components[7].strip().lower() == 'true' if len(components) > 7 else False,  # child_warning column
-                "hasPKUWarning": components[8].strip().lower() == 'true' if len(components) > 8 else False,  # PKU_warning column
-                "hasSulphitesAllergenLabel": components[10].strip().lower() == 'true' if len(components) > 10 else False,  # sulphites_allergen_label column
-                "hasPolyolsWarning": components[9].strip().lower() == 'true' if len(components) > 9 else False,  # polyols_warning column
-                "isPermittedGB": components[3].strip().lower() != 'false' if len(components) > 3 else True,  # permitted_GB column
-                "isPermittedNI": components[4].strip().lower() != 'false' if len(components) > 4 else True,  # permitted_NI column
-                "isPermittedEU": components[5].strip().lower() != 'false' if len(components) > 5 else True,  # permitted_EU column
-                "synonyms": synonyms,
-                "sources": sources,
-                "statusNotes": components[6].strip() if len(components) > 6 and components[6].strip() else None,  # status_notes column
-                "insNumber": components[18].strip() if len(components) > 18 and components[18].strip() else None,  # ins_number column
-                "consumerInfo": None
-            }
+    for category_name, e_number, additive_data in iter_json_additives(data):
+        name = additive_data.get("name", "")
+        origin = additive_data.get("origin", "unknown")
+        uses = additive_data.get("uses", "")
+        safety = additive_data.get("safety", "neutral")
+        concerns = additive_data.get("concerns", "")
+        synonyms = additive_data.get("synonyms", [])
+
+        # Map to enum values using same functions
+        additives[e_number] = {
+            "id": e_number,  # Add id field for Swift Identifiable conformance
+            "eNumber": e_number,
+            "name": name,
+            "group": map_to_additive_group(category_name),  # Map to enum
+            "category": map_to_additive_category(category_name),  # Map to enum
+            "origin": map_to_additive_origin(origin),  # Map to enum
+            "overview": "",
+            "typicalUses": uses,
+            "effectsVerdict": map_to_additive_verdict(safety),  # Map to enum
+            "effectsSummary": concerns if concerns else "Generally recognized as safe when used as directed.",
+            "hasChildWarning": "child" in concerns.lower() or "hyperactivity" in concerns.lower(),
+            "hasPKUWarning": "pku" in concerns.lower() or "phenylketonuria" in concerns.lower(),
+            "hasSulphitesAllergenLabel": "sulphite" in concerns.lower() or "sulfite" in concerns.lower(),
+            "hasPolyolsWarning": "polyol" in concerns.lower() or "laxative" in concerns.lower(),
+            "isPermittedGB": "banned" not in concerns.lower(),
+            "isPermittedNI": "banned" not in concerns.lower(),
+            "isPermittedEU": "banned" not in concerns.lower(),
+            "synonyms": synonyms if isinstance(synonyms, list) else [],
+            "sources": [],  # JSON doesn't have sources
+            "statusNotes": concerns if "banned" in concerns.lower() else None,
+            "insNumber": None,
+            "consumerInfo": None
+        }
 
     return additives
 
 def parse_json_database(json_path: str) -> Dict[str, Dict[str, Any]]:
     """Parse JSON database and return dict of additives by E-number."""
-    additives = {}
-
     with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Navigate through nested categories structure
-    if "categories" in data:
-        for category_name, category_data in data["categories"].items():
-            for range_name, range_data in category_data.items():
-                for e_number, additive_data in range_data.items():
-                    name = additive_data.get("name", "")
-                    origin = additive_data.get("origin", "unknown")
-                    uses = additive_data.get("uses", "")
-                    safety = additive_data.get("safety", "neutral")
-                    concerns = additive_data.get("concerns", "")
-                    synonyms = additive_data.get("synonyms", [])
-
-                    # Map to enum values using same functions
-                    additives[e_number] = {
-                        "id": e_number,  # Add id field for Swift Identifiable conformance
-                        "eNumber": e_number,
-                        "name": name,
-                        "group": map_to_additive_group(category_name),  # Map to enum
-                        "category": map_to_additive_category(category_name),  # Map to enum
-                        "origin": map_to_additive_origin(origin),  # Map to enum
-                        "overview": "",
-                        "typicalUses": uses,
-                        "effectsVerdict": map_to_additive_verdict(safety),  # Map to enum
-                        "effectsSummary": concerns if concerns else "Generally recognized as safe when used as directed.",
-                        "hasChildWarning": "child" in concerns.lower() or "hyperactivity" in concerns.lower(),
-                        "hasPKUWarning": "pku" in concerns.lower() or "phenylketonuria" in concerns.lower(),
-                        "hasSulphitesAllergenLabel": "sulphite" in concerns.lower() or "sulfite" in concerns.lower(),
-                        "hasPolyolsWarning": "polyol" in concerns.lower() or "laxative" in concerns.lower(),
-                        "isPermittedGB": "banned" not in concerns.lower(),
-                        "isPermittedNI": "banned" not in concerns.lower(),
-                        "isPermittedEU": "banned" not in concerns.lower(),
-                        "synonyms": synonyms if isinstance(synonyms, list) else [],
-                        "sources": [],  # JSON doesn't have sources
-                        "statusNotes": concerns if "banned" in concerns.lower() else None,
-                        "insNumber": None,
-                        "consumerInfo": None
-                    }
-
-    return additives
+        return json_to_additives(json.load(f))
 
 def merge_databases(csv_additives: Dict[str, Dict], json_additives: Dict[str, Dict]) -> List[Dict[str, Any]]:
     """Merge CSV and JSON databases, preferring CSV data when available."""
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Micronutrient Lookup Engine
+Loads micronutrients_ingredients_v6 (.db or .json) into compact in-memory
+arrays and scores ingredient lists for micronutrient coverage:
+
+    - nutrient ids interned to small integers
+    - CSR adjacency: ingredient row -> slice of (nutrient, strength) pairs
+    - strengths stored as uint8 (1 trace, 2 moderate, 3 strong)
+    - synonyms, ingredient names and micronutrient tokens resolved through
+      prebuilt dicts and one compiled token regex instead of table scans
+
+The same engine can regenerate the .db with proper indexes.
+
+Usage:
+    python micronutrient_engine.py [foods_db_path]         # score the catalogue
+    python micronutrient_engine.py --profile "Wheat Flour, Spinach, Iron"
+    python micronutrient_engine.py --rebuild-db [--from-json]
+"""
+
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ingredient_parser import DEFAULT_DB_PATH, iter_food_trees, iter_nodes, parse_foods, parse_ingredients
+
+SCRIPT_DIR = Path(__file__).parent
+MICRO_DB = SCRIPT_DIR / "NutraSafe Beta" / "micronutrients_ingredients_v6.db"
+MICRO_JSON = SCRIPT_DIR / "NutraSafe Beta" / "micronutrients_ingredients_v6.json"
+
+STRENGTHS = ['trace', 'moderate', 'strong']
+STRENGTH_CODES = {name: code for code, name in enumerate(STRENGTHS, 1)}
+# Fortificants named in an ingredient list ("Iron", "Niacin") are real but small additions
+TOKEN_STRENGTH = STRENGTH_CODES['moderate']
+
+# Longest contiguous word run tried when an ingredient name has no exact match
+MAX_NGRAM = 4
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_name(name: str) -> str:
+    """'Garbanzo Beans' / 'garbanzo-beans' -> 'garbanzo_beans'"""
+    return NON_WORD.sub('_', name.lower()).strip('_')
+
+
+class MicronutrientEngine:
+    """In-memory micronutrient data with CSR ingredient -> nutrient adjacency"""
+
+    def __init__(self):
+        self.nutrient_ids: List[str] = []
+        self.nutrient_index: Dict[str, int] = {}
+        self.nutrient_info: Dict[str, Dict] = {}
+
+        self.ingredient_names: List[str] = []
+        self.ingredient_categories: List[str] = []
+        self.ingredient_index: Dict[str, int] = {}
+
+        # Row i's nutrients are nutrient_col/strength[offsets[i]:offsets[i + 1]]
+        self.offsets = array('I', [0])
+        self.nutrient_col = array('B')
+        self.strength = array('B')
+
+        self.synonyms: Dict[str, str] = {}
+        self.tokens: Dict[str, int] = {}
+        self.token_pattern: Optional[re.Pattern] = None
+
+        self._resolve_cache: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _intern(self, nutrient: str) -> int:
+        index = self.nutrient_index.get(nutrient)
+        if index is None:
+            index = self.nutrient_index[nutrient] = len(self.nutrient_ids)
+            self.nutrient_ids.append(nutrient)
+        return index
+
+    def _add_ingredient(self, name: str, category: str, nutrients: Iterable[Tuple[str, str]]):
+        self.ingredient_index[name] = len(self.ingredient_names)
+        self.ingredient_names.append(name)
+        self.ingredient_categories.append(category)
+        for nutrient, strength in nutrients:
+            code = STRENGTH_CODES.get(strength)
+            if code:
+                self.nutrient_col.append(self._intern(nutrient))
+                self.strength.append(code)
+        self.offsets.append(len(self.nutrient_col))
+
+    def _finish(self, synonyms: Dict[str, str], tokens: Dict[str, str]):
+        self.synonyms = {normalize_name(alt): normalize_name(canonical) for alt, canonical in synonyms.items()}
+        self.tokens = {token.lower(): self._intern(nutrient) for token, nutrient in tokens.items()}
+        self.token_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(t) for t in sorted(self.tokens, key=len, reverse=True)) + r')\b'
+        ) if self.tokens else None
+        self._resolve_cache = {}
+
+    @classmethod
+    def from_db(cls, path: Path = MICRO_DB) -> 'MicronutrientEngine':
+        """Load from the SQLite database with one pass per table"""
+        engine = cls()
+        conn = sqlite3.connect(str(path))
+
+        by_ingredient: Dict[int, List[Tuple[str, str]]] = {}
+        for ingredient_id, nutrient, strength in conn.execute(
+            "SELECT ingredient_id, nutrient, strength FROM nutrients ORDER BY ingredient_id, rowid"
+        ):
+            by_ingredient.setdefault(ingredient_id, []).append((nutrient, strength))
+
+        for nutrient, name, category, benefits, deficiency, sources, rdi in conn.execute(
+            "SELECT nutrient, name, category, benefits, deficiency_signs, common_sources, "
+            "recommended_daily_intake FROM nutrient_info"
+        ):
+            engine._intern(nutrient)
+            engine.nutrient_info[nutrient] = {
+                'name': name, 'category': category,
+                'benefits': json.loads(benefits or '[]'),
+                'deficiency_signs': json.loads(deficiency or '[]'),
+                'common_sources': json.loads(sources or '[]'),
+                'recommended_daily_intake': rdi,
+            }
+
+        for ingredient_id, name, category in conn.execute("SELECT id, name, category FROM ingredients ORDER BY id"):
+            engine._add_ingredient(name, category, by_ingredient.get(ingredient_id, []))
+
+        engine._finish(
+            dict(conn.execute("SELECT alt_name, canonical FROM synonyms")),
+            dict(conn.execute("SELECT token, nutrient FROM micronutrient_tokens")),
+        )
+        conn.close()
+        return engine
+
+    @classmethod
+    def from_json(cls, path: Path = MICRO_JSON) -> 'MicronutrientEngine':
+        """Load from the source JSON"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        engine = cls()
+        for nutrient, info in data.get('nutrient_info', {}).items():
+            engine._intern(nutrient)
+            engine.nutrient_info[nutrient] = info
+        for name, record in data['ingredients'].items():
+            engine._add_ingredient(name, record.get('category'), record.get('nutrients', {}).items())
+        engine._finish(data.get('synonyms', {}), data.get('micronutrient_tokens', {}))
+        return engine
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _exact(self, key: str) -> int:
+        row = self.ingredient_index.get(key)
+        if row is None and key in self.synonyms:
+            row = self.ingredient_index.get(self.synonyms[key])
+        if row is None and key.endswith('s'):
+            row = self.ingredient_index.get(key[:-1])
+        return -1 if row is None else row
+
+    def resolve(self, name: str) -> int:
+        """
+        Ingredient row for a free-text name, or -1. Falls back to the longest
+        contiguous run of words that is a known ingredient, preferring the
+        rightmost ("Fresh Baby Spinach Leaves" -> "spinach"). Names with no known
+        word run, such as "Pasteurised Semi-Skimmed Milk" (the table only has
+        milk_whole, milk_semi, ...), stay -1.
+        """
+        key = normalize_name(name)
+        cached = self._resolve_cache.get(key)
+        if cached is not None:
+            return cached
+
+        row = self._exact(key)
+        if row < 0 and key:
+            words = key.split('_')
+            for size in range(min(len(words), MAX_NGRAM), 0, -1):
+                for start in range(len(words) - size, -1, -1):
+                    row = self._exact('_'.join(words[start:start + size]))
+                    if row >= 0:
+                        break
+                if row >= 0:
+                    break
+
+        self._resolve_cache[key] = row
+        return row
+
+    def ingredient_nutrients(self, row: int) -> List[Tuple[str, str]]:
+        """(nutrient, strength) pairs for an ingredient row"""
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return [(self.nutrient_ids[self.nutrient_col[i]], STRENGTHS[self.strength[i] - 1]) for i in range(start, end)]
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """Resolved ingredient with its nutrients, or None"""
+        row = self.resolve(name)
+        if row < 0:
+            return None
+        return {
+            'name': self.ingredient_names[row],
+            'category': self.ingredient_categories[row],
+            'nutrients': dict(self.ingredient_nutrients(row)),
+        }
+
+    # ------------------------------------------------------------------
+    # Profiles
+    # ------------------------------------------------------------------
+
+    def profile_codes(self, names: Iterable[str]) -> bytearray:
+        """Strongest strength code per nutrient index across ingredient names"""
+        profile = bytearray(len(self.nutrient_ids))
+        offsets, columns, strengths = self.offsets, self.nutrient_col, self.strength
+
+        for name in names:
+            row = self.resolve(name)
+            if row >= 0:
+                for i in range(offsets[row], offsets[row + 1]):
+                    if strengths[i] > profile[columns[i]]:
+                        profile[columns[i]] = strengths[i]
+
+            if self.token_pattern is not None:
+                for match in self.token_pattern.finditer(name.lower()):
+                    index = self.tokens[match.group()]
+                    if profile[index] < TOKEN_STRENGTH:
+                        profile[index] = TOKEN_STRENGTH
+        return profile
+
+    def profile_to_dict(self, profile: bytearray) -> Dict[str, str]:
+        return {self.nutrient_ids[i]: STRENGTHS[code - 1] for i, code in enumerate(profile) if code}
+
+    def profile(self, names: Iterable[str]) -> Dict[str, str]:
+        """Ingredient names -> {nutrient: strongest strength}"""
+        return self.profile_to_dict(self.profile_codes(names))
+
+    def profile_text(self, ingredients: Optional[str]) -> Dict[str, str]:
+        """Raw ingredients string -> {nutrient: strongest strength}"""
+        tree = parse_ingredients(ingredients)
+        return self.profile(node.name for node, _, _ in iter_nodes(tree.items))
+
+    def profile_many(self, ingredient_lists: Iterable[List[str]]) -> List[Dict[str, str]]:
+        """Batch version of profile()"""
+        return [self.profile(names) for names in ingredient_lists]
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def write_db(self, path: Path = MICRO_DB):
+        """
+        Regenerate the SQLite database (same tables the app reads) with
+        indexes on nutrients.ingredient_id, nutrients.nutrient and keyed
+        synonym/token tables. Written to a temp file then swapped in.
+        """
+        path = Path(path)
+        tmp_path = path.with_suffix('.db.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+        conn = sqlite3.connect(str(tmp_path))
+        conn.executescript("""
+            CREATE TABLE ingredients (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                category TEXT
+            );
+            CREATE TABLE nutrients (
+                ingredient_id INTEGER,
+                nutrient TEXT,
+                strength TEXT,
+                FOREIGN KEY (ingredient_id) REFERENCES ingredients(id)
+            );
+            CREATE TABLE nutrient_info (
+                nutrient TEXT PRIMARY KEY,
+                name TEXT,
+                category TEXT,
+                benefits TEXT,
+                deficiency_signs TEXT,
+                common_sources TEXT,
+                recommended_daily_intake TEXT
+            );
+            CREATE TABLE synonyms (
+                alt_name TEXT PRIMARY KEY,
+                canonical TEXT
+            );
+            CREATE TABLE micronutrient_tokens (
+                token TEXT PRIMARY KEY,
+                nutrient TEXT
+            );
+        """)
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO ingredients (id, name, category) VALUES (?, ?, ?)",
+                [(row + 1, name, self.ingredient_categories[row]) for row, name in enumerate(self.ingredient_names)]
+            )
+            conn.executemany(
+                "INSERT INTO nutrients VALUES (?, ?, ?)",
+                [(row + 1, nutrient, strength)
+                 for row in range(len(self.ingredient_names))
+                 for nutrient, strength in self.ingredient_nutrients(row)]
+            )
+            conn.executemany(
+                "INSERT INTO nutrient_info VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(nutrient, info.get('name'), info.get('category'),
+                  json.dumps(info.get('benefits', []), ensure_ascii=False),
+                  json.dumps(info.get('deficiency_signs', []), ensure_ascii=False),
+                  json.dumps(info.get('common_sources', []), ensure_ascii=False),
+                  info.get('recommended_daily_intake'))
+                 for nutrient, info in self.nutrient_info.items()]
+            )
+            conn.executemany("INSERT INTO synonyms VALUES (?, ?)", self.synonyms.items())
+            conn.executemany(
+                "INSERT INTO micronutrient_tokens VALUES (?, ?)",
+                [(token, self.nutrient_ids[index]) for token, index in self.tokens.items()]
+            )
+
+        conn.executescript("""
+            CREATE INDEX idx_nutrients_ingredient ON nutrients (ingredient_id, nutrient);
+            CREATE INDEX idx_nutrients_nutrient ON nutrients (nutrient, strength);
+            CREATE INDEX idx_ingredients_category ON ingredients (category);
+            ANALYZE;
+        """)
+        conn.execute("VACUUM")
+        conn.close()
+        tmp_path.replace(path)
+
+
+# ============================================================================
+# Catalogue scoring
+# ============================================================================
+
+def score_catalogue(engine: MicronutrientEngine, db_path: str) -> Dict:
+    """
+    Micronutrient coverage across the foods table: profiles each distinct
+    ingredient tree once and tallies per-nutrient food counts.
+    """
+    parse_foods(db_path)
+
+    conn = sqlite3.connect(db_path)
+    profiles: Dict[str, bytearray] = {}
+    per_nutrient = [0] * len(engine.nutrient_ids)
+    foods = covered = total_nutrients = 0
+
+    for _, key, tree in iter_food_trees(conn):
+        profile = profiles.get(key)
+        if profile is None:
+            profile = profiles[key] = engine.profile_codes(node.name for node, _, _ in iter_nodes(tree.items))
+
+        foods += 1
+        found = 0
+        for index, code in enumerate(profile):
+            if code:
+                per_nutrient[index] += 1
+                found += 1
+        if found:
+            covered += 1
+            total_nutrients += found
+    conn.close()
+
+    return {
+        'foods': foods,
+        'distinct_lists': len(profiles),
+        'covered': covered,
+        'mean_nutrients': total_nutrients / covered if covered else 0.0,
+        'per_nutrient': {engine.nutrient_ids[i]: count for i, count in enumerate(per_nutrient)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micronutrient lookup engine")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH), help="Foods database to score")
+    parser.add_argument("--micro-db", default=str(MICRO_DB), help="micronutrients_ingredients_v6.db")
+    parser.add_argument("--from-json", action="store_true", help="Load from micronutrients_ingredients_v6.json")
+    parser.add_argument("--profile", metavar="TEXT", help="Profile a single ingredients string")
+    parser.add_argument("--rebuild-db", action="store_true", help="Regenerate --micro-db with indexes")
+    args = parser.parse_args()
+
+    start = time.time()
+    engine = MicronutrientEngine.from_json(MICRO_JSON) if args.from_json else MicronutrientEngine.from_db(args.micro_db)
+    load_time = time.time() - start
+
+    if args.profile:
+        for nutrient, strength in sorted(engine.profile_text(args.profile).items()):
+            print(f"{nutrient:18} {strength}")
+        return
+
+    print("💊 MICRONUTRIENT ENGINE")
+    print("=" * 80)
+    print(f"📚 {len(engine.ingredient_names)} ingredients, {len(engine.nutrient_col)} nutrient links, "
+          f"{len(engine.nutrient_ids)} nutrients loaded in {load_time * 1000:.0f}ms")
+
+    if args.rebuild_db:
+        start = time.time()
+        engine.write_db(Path(args.micro_db))
+        print(f"✅ Rebuilt {args.micro_db} in {time.time() - start:.1f}s")
+        return
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    start = time.time()
+    stats = score_catalogue(engine, args.db_path)
+    print(f"✅ Scored {stats['foods']} foods ({stats['distinct_lists']} distinct lists) "
+          f"in {time.time() - start:.1f}s")
+    print(f"   {stats['covered']} foods with at least one micronutrient, "
+          f"{stats['mean_nutrients']:.1f} nutrients on average\n")
+    for nutrient, count in sorted(stats['per_nutrient'].items(), key=lambda item: -item[1]):
+        print(f"   {nutrient:18} {count:7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Micronutrient Profile Materializer
+Precomputes every food's micronutrient profile from its parsed ingredient
+tree and micronutrients_ingredients_v6.db, weighting each ingredient by its
+declared percentage or, failing that, its position in the list.
+
+Profiles are packed one byte per nutrient (0 none, 1 trace, 2 moderate,
+3 strong) into the micronutrient_profiles table. Rebuilds are incremental:
+only foods whose ingredients changed, or every food when the micronutrient
+database, the ingredient parser version or the weighting rules change, are
+recomputed.
+
+Usage:
+    python micronutrient_profiles.py [db_path] [--micro-db PATH] [--full]
+    python micronutrient_profiles.py [db_path] --show FOOD_ID
+"""
+
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ingredient_parser import DEFAULT_DB_PATH, PARSER_VERSION, IngredientNode, iter_food_trees, parse_foods
+from micronutrient_engine import MICRO_DB, STRENGTHS, TOKEN_STRENGTH, MicronutrientEngine
+
+# Contribution thresholds, aligned with UK/EU nutrition claims:
+# "high in" >= 30% NRV, "source of" >= 15% NRV
+STRONG_THRESHOLD = 0.30
+MODERATE_THRESHOLD = 0.15
+TRACE_THRESHOLD = 0.01
+
+# Bump when position_weight / sibling_weights / weighted_contributions change
+# so stored profiles are recomputed
+WEIGHTING_VERSION = 1
+
+UPSERT_PROFILE = """
+    INSERT INTO micronutrient_profiles VALUES (?, ?, ?, ?)
+    ON CONFLICT(food_id) DO UPDATE SET
+        ingredients_hash = excluded.ingredients_hash,
+        nutrient_count = excluded.nutrient_count,
+        profile = excluded.profile
+"""
+
+
+def data_version(path: Path) -> str:
+    """Content hash of the micronutrient database"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def profile_version(micro_db: Path) -> str:
+    """
+    Everything a stored profile depends on besides the food's ingredients:
+    micronutrient data, parser version, weighting rules and thresholds
+    """
+    return (f"{data_version(micro_db)}:parser{PARSER_VERSION}:weights{WEIGHTING_VERSION}:"
+            f"{STRONG_THRESHOLD}/{MODERATE_THRESHOLD}/{TRACE_THRESHOLD}")
+
+
+def position_weight(position: int, total: int) -> float:
+    """Share of a list for an ingredient without a declared percentage"""
+    if total <= 3:
+        return 1.0 / total
+    if position < 3:
+        return 0.35 if total <= 5 else 0.22
+    if position < 5:
+        return 0.12 if total <= 10 else 0.08
+    return 0.10 / max(total - 5, 1)
+
+
+def sibling_weights(nodes: List[IngredientNode]) -> List[float]:
+    """Weights for one level: declared percentages, position weights for the rest"""
+    weights = []
+    for position, node in enumerate(nodes):
+        if node.percent is not None:
+            weights.append(min(node.percent, 100.0) / 100.0)
+        else:
+            weights.append(position_weight(position, len(nodes)))
+    return weights
+
+
+def weighted_contributions(engine: MicronutrientEngine, items: List[IngredientNode]) -> List[float]:
+    """
+    Summed contribution per nutrient index. A node that resolves to a known
+    ingredient contributes weight * strength / 3; otherwise its weight is
+    split across its sub-ingredients.
+    """
+    contributions = [0.0] * len(engine.nutrient_ids)
+    offsets, columns, strengths = engine.offsets, engine.nutrient_col, engine.strength
+    stack = [(items, 1.0)]
+
+    while stack:
+        nodes, scale = stack.pop()
+        for node, weight in zip(nodes, sibling_weights(nodes)):
+            weight *= scale
+            row = engine.resolve(node.name) if node.name else -1
+            if row >= 0:
+                for i in range(offsets[row], offsets[row + 1]):
+                    contributions[columns[i]] += weight * strengths[i] / 3
+            elif node.children:
+                stack.append((node.children, weight))
+
+            if engine.token_pattern is not None and node.name:
+                # Named fortificants ("Iron", "Niacin") count even inside a resolved ingredient
+                for match in engine.token_pattern.finditer(node.name.lower()):
+                    contributions[engine.tokens[match.group()]] += weight * TOKEN_STRENGTH / 3
+
+    return contributions
+
+
+def pack_profile(contributions: List[float]) -> bytes:
+    """Contributions -> one strength code byte per nutrient"""
+    return bytes(
+        3 if value >= STRONG_THRESHOLD else
+        2 if value >= MODERATE_THRESHOLD else
+        1 if value >= TRACE_THRESHOLD else 0
+        for value in contributions
+    )
+
+
+def unpack_profile(profile: bytes, nutrient_ids: List[str]) -> Dict[str, str]:
+    return {nutrient_ids[i]: STRENGTHS[code - 1] for i, code in enumerate(profile) if code}
+
+
+# ============================================================================
+# Storage
+# ============================================================================
+
+def create_profile_tables(conn: sqlite3.Connection):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS micronutrient_profiles (
+            food_id TEXT PRIMARY KEY,
+            ingredients_hash TEXT NOT NULL,
+            nutrient_count INTEGER NOT NULL,
+            profile BLOB NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_micronutrient_profiles_count
+            ON micronutrient_profiles (nutrient_count);
+        CREATE TABLE IF NOT EXISTS micronutrient_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """)
+
+
+def get_meta(conn: sqlite3.Connection, key: str):
+    row = conn.execute("SELECT value FROM micronutrient_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: str):
+    conn.execute(
+        "INSERT INTO micronutrient_meta VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value)
+    )
+
+
+def load_profile(conn: sqlite3.Connection, food_id: str) -> Dict[str, str]:
+    """Unpacked {nutrient: strength} for one food, or {} if not materialized"""
+    row = conn.execute("SELECT profile FROM micronutrient_profiles WHERE food_id = ?", (food_id,)).fetchone()
+    if not row:
+        return {}
+    return unpack_profile(row[0], json.loads(get_meta(conn, 'nutrients')))
+
+
+def materialize_profiles(db_path: str, micro_db: Path = MICRO_DB, full: bool = False,
+                         batch_size: int = 5000) -> Tuple[int, int, int]:
+    """
+    Bring micronutrient_profiles up to date.
+
+    Returns (foods seen, profiles written, stale profiles removed)
+    """
+    version = profile_version(micro_db)
+    engine = MicronutrientEngine.from_db(micro_db)
+    nutrients = json.dumps(engine.nutrient_ids)
+
+    parse_foods(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_profile_tables(conn)
+
+    if full or get_meta(conn, 'version') != version or get_meta(conn, 'nutrients') != nutrients:
+        # New micronutrient data, parser or weighting rules (or nutrient order): every profile is stale
+        conn.execute("DELETE FROM micronutrient_profiles")
+
+    existing = dict(conn.execute("SELECT food_id, ingredients_hash FROM micronutrient_profiles"))
+    packed: Dict[str, Tuple[int, bytes]] = {}
+    seen = 0
+    written = 0
+    batch = []
+
+    with conn:
+        read = sqlite3.connect(db_path)
+        for food_id, key, tree in iter_food_trees(read):
+            seen += 1
+            if existing.pop(food_id, None) == key:
+                continue
+
+            result = packed.get(key)
+            if result is None:
+                profile = pack_profile(weighted_contributions(engine, tree.items))
+                result = packed[key] = (sum(1 for code in profile if code), profile)
+
+            batch.append((food_id, key, result[0], result[1]))
+            if len(batch) >= batch_size:
+                conn.executemany(UPSERT_PROFILE, batch)
+                written += len(batch)
+                batch = []
+        read.close()
+
+        conn.executemany(UPSERT_PROFILE, batch)
+        written += len(batch)
+
+        # Anything left in `existing` lost its ingredients or was deleted
+        conn.executemany("DELETE FROM micronutrient_profiles WHERE food_id = ?", [(f,) for f in existing])
+
+        set_meta(conn, 'version', version)
+        set_meta(conn, 'nutrients', nutrients)
+
+    conn.close()
+    return seen, written, len(existing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize per-food micronutrient profiles")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--micro-db", default=str(MICRO_DB), help="micronutrients_ingredients_v6.db")
+    parser.add_argument("--full", action="store_true", help="Recompute every profile")
+    parser.add_argument("--show", metavar="FOOD_ID", help="Print one food's stored profile")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    if args.show:
+        conn = sqlite3.connect(args.db_path)
+        create_profile_tables(conn)
+        profile = load_profile(conn, args.show)
+        conn.close()
+        if not profile:
+            print(f"❌ No profile for {args.show}")
+            sys.exit(1)
+        for nutrient, strength in sorted(profile.items()):
+            print(f"{nutrient:18} {strength}")
+        return
+
+    print("💊 MICRONUTRIENT PROFILE BUILD")
+    print("=" * 80)
+
+    start = time.time()
+    seen, written, removed = materialize_profiles(args.db_path, Path(args.micro_db), args.full)
+    print(f"✅ {seen} foods checked, {written} profiles written, {removed} removed "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
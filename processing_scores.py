@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+NOVA / Processing Score Batch Classifier
+Scores every food with ingredients in one pass and stores the result as
+indexed columns on the foods table, so search and ranking can filter and
+sort on processing without scoring per request:
+
+    nova_group         1 unprocessed .. 4 ultra-processed
+    processing_score   0-100, higher is less processed
+    processing_grade   A-E (same bands as the Database Manager)
+
+Signals come from the shared ingredient-tree cache (ingredient_parser.py)
+and the additive matcher (additive_detector.py) run over the parsed
+ingredient names. Each distinct ingredient list is matched once; NOVA
+groups and penalties are then aggregated over all lists at once with
+numpy where available (pure Python otherwise).
+
+Foods without ingredients stay NULL.
+
+Usage:
+    python processing_scores.py [db_path] [--additives PATH]
+"""
+
+import re
+import sys
+import time
+import sqlite3
+import argparse
+from array import array
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from additive_detector import ADDITIVES_JSON, AdditiveMatcher, additive_key, is_e_number, load_additives
+from ingredient_parser import DEFAULT_DB_PATH, ParsedIngredients, iter_food_trees, parse_foods
+
+PROCESSING_COLUMNS = [('nova_group', 'INTEGER'), ('processing_score', 'INTEGER'), ('processing_grade', 'TEXT')]
+
+# Additive groups with a cosmetic function mark NOVA 4 when the record has no explicit novaGroup
+COSMETIC_GROUPS = {
+    'colour', 'sweetener', 'flavour_enhancer', 'flavor_enhancer', 'emulsifier',
+    'thickener', 'stabilizer', 'bulking_agent',
+}
+# Penalty for an additive without an explicit processingPenalty, by its NOVA group
+DEFAULT_PENALTY = {0: 0, 1: 0, 2: 2, 3: 5, 4: 10}
+NOVA_PENALTY = [0, 0, 5, 15, 30]   # indexed by NOVA group
+
+# NOVA 2 processed culinary ingredients; added to whole foods they make a NOVA 3 food
+CULINARY = re.compile(r'\b(?:salt|sugar|oil|vinegar|butter|honey|lard|ghee|syrup)\b', re.IGNORECASE)
+
+# Vitamins/minerals are nutrients, not processing markers ("Niacin" would otherwise match E375),
+# and UK flour's mandatory fortification (calcium carbonate, iron, niacin, thiamin) is skipped
+FORTIFICANT = re.compile(
+    r'^(?:iron|niacin|thiamin|riboflavin|folic acid|vitamins?\b.*|(?:calcium|zinc|potassium) iodide)$', re.IGNORECASE
+)
+FLOUR = re.compile(r'\bflour\b', re.IGNORECASE)
+
+GRADE_BANDS = [(80, 'A'), (60, 'B'), (40, 'C'), (20, 'D'), (0, 'E')]
+
+
+def additive_weights(matcher: AdditiveMatcher, additives: List[Dict]) -> Tuple[array, array]:
+    """(NOVA group, penalty) per matcher additive index"""
+    info = {}
+    for record in additives:
+        key = additive_key(record)
+        if key in info:
+            continue
+        nova = record.get('novaGroup') or 0
+        if not nova:
+            if (record.get('group') or record.get('category')) in COSMETIC_GROUPS:
+                nova = 4
+            elif any(is_e_number(code) for code in record.get('eNumbers') or []):
+                nova = 3
+        penalty = record.get('processingPenalty') or DEFAULT_PENALTY[nova]
+        info[key] = (nova, penalty)
+
+    nova_groups = array('B', (info[key][0] for key in matcher.additive_ids))
+    penalties = array('H', (info[key][1] for key in matcher.additive_ids))
+    return nova_groups, penalties
+
+
+def base_nova(tree: ParsedIngredients) -> int:
+    """NOVA group from the ingredient list alone, before additives"""
+    culinary = sum(1 for node in tree.items if CULINARY.search(node.name))
+    if culinary and len(tree.items) == culinary:
+        return 2
+    return 3 if culinary else 1
+
+
+def additive_text(tree: ParsedIngredients) -> str:
+    """Parsed ingredient names to run the additive matcher over, minus fortification"""
+    names = []
+    stack = list(reversed(tree.items))
+    while stack:
+        node = stack.pop()
+        if FORTIFICANT.match(node.name):
+            continue
+        names.append(node.name)
+        if not FLOUR.search(node.name):
+            stack.extend(reversed(node.children))
+    return ', '.join(names)
+
+
+def score_to_grade(score: int) -> str:
+    for floor, grade in GRADE_BANDS:
+        if score >= floor:
+            return grade
+    return 'E'
+
+
+def aggregate(rows: array, cols: array, base: array, nova_groups: array, penalties: array) -> Tuple[list, list]:
+    """
+    Per-list NOVA group and score from (list index, additive index) pairs.
+    Returns (nova groups, scores), one entry per distinct ingredient list.
+    """
+    if NUMPY_AVAILABLE:
+        rows_np = np.frombuffer(rows, dtype=np.uint32).astype(np.intp)
+        cols_np = np.frombuffer(cols, dtype=np.uint32).astype(np.intp)
+        nova = np.frombuffer(base, dtype=np.uint8).copy()
+        np.maximum.at(nova, rows_np, np.frombuffer(nova_groups, dtype=np.uint8)[cols_np])
+        penalty = np.bincount(rows_np, weights=np.frombuffer(penalties, dtype=np.uint16)[cols_np],
+                              minlength=len(base))
+        scores = np.clip(100 - penalty - np.array(NOVA_PENALTY)[nova], 0, 100).astype(int)
+        return nova.tolist(), scores.tolist()
+
+    nova = list(base)
+    penalty = [0] * len(base)
+    for row, col in zip(rows, cols):
+        nova[row] = max(nova[row], nova_groups[col])
+        penalty[row] += penalties[col]
+    scores = [max(0, min(100, 100 - p - NOVA_PENALTY[n])) for n, p in zip(nova, penalty)]
+    return nova, scores
+
+
+def add_processing_columns(conn: sqlite3.Connection):
+    """Add the score columns and their indexes to the foods table if missing"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(foods)")]
+    for column, sql_type in PROCESSING_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE foods ADD COLUMN {column} {sql_type}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_foods_processing ON foods (nova_group, processing_score)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_foods_processing_score ON foods (processing_score)")
+
+
+def score_foods(db_path: str, additives_path: Path = ADDITIVES_JSON, batch_size: int = 5000) -> Dict[int, int]:
+    """
+    Compute nova_group / processing_score / processing_grade for every food
+    with ingredients. Returns {nova group: food count}
+    """
+    additives = load_additives(additives_path)
+    matcher = AdditiveMatcher(additives)
+    nova_groups, penalties = additive_weights(matcher, additives)
+    additive_index = {key: i for i, key in enumerate(matcher.additive_ids)}
+
+    parse_foods(db_path)
+
+    # Pass 1: match each distinct ingredient list once
+    list_index: Dict[str, int] = {}
+    foods: List[Tuple[str, int]] = []
+    base = array('B')
+    rows = array('I')
+    cols = array('I')
+
+    read = sqlite3.connect(db_path)
+    for food_id, key, tree in iter_food_trees(read):
+        index = list_index.get(key)
+        if index is None:
+            index = list_index[key] = len(base)
+            base.append(base_nova(tree))
+            for additive in matcher.detect(additive_text(tree)):
+                rows.append(index)
+                cols.append(additive_index[additive])
+        foods.append((food_id, index))
+    read.close()
+
+    # Pass 2: aggregate all lists at once
+    nova, scores = aggregate(rows, cols, base, nova_groups, penalties)
+    grades = [score_to_grade(score) for score in scores]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    add_processing_columns(conn)
+    counts: Dict[int, int] = {}
+    with conn:
+        conn.execute("UPDATE foods SET nova_group = NULL, processing_score = NULL, processing_grade = NULL")
+        for start in range(0, len(foods), batch_size):
+            batch = [(nova[i], scores[i], grades[i], food_id) for food_id, i in foods[start:start + batch_size]]
+            conn.executemany(
+                "UPDATE foods SET nova_group = ?, processing_score = ?, processing_grade = ? WHERE id = ?", batch
+            )
+        for _, i in foods:
+            counts[nova[i]] = counts.get(nova[i], 0) + 1
+
+    conn.execute("ANALYZE foods")
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score foods for NOVA group and processing")
+    parser.add_argument("db_path", nargs="?", default=str(DEFAULT_DB_PATH))
+    parser.add_argument("--additives", default=str(ADDITIVES_JSON), help="ingredients_consolidated.json or a data_bundle.py bundle")
+    args = parser.parse_args()
+
+    print("🏭 NOVA / PROCESSING SCORES")
+    print("=" * 80)
+
+    if not Path(args.db_path).exists():
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    start = time.time()
+    counts = score_foods(args.db_path, Path(args.additives))
+    print(f"✅ {sum(counts.values())} foods scored in {time.time() - start:.1f}s"
+          f"{'' if NUMPY_AVAILABLE else ' (numpy not installed - pure Python aggregation)'}\n")
+    for group in sorted(counts):
+        print(f"   NOVA {group}: {counts[group]:7} foods")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Product Knowledge Rulebooks
+The known-product facts the GPT updaters apply (ingredients, serving size,
+nutrition per 100g) live in product_knowledge.json as rulebooks instead of
+if-chains. A rule is:
+
+    {
+      "id": "walkers/prawn-cocktail",
+      "priority": 60,                      lower wins; file order breaks ties
+      "when":   [["brand:walkers", "name:walkers"], ["name:prawn cocktail"]],
+      "unless": ["name:ready salted"],
+      "data":   {"ingredients": ..., "serving_size": ..., "energy_kcal_100g": ...}
+    }
+
+"when" is a list of clauses that must all hold; a clause holds if any of its
+terms occurs. "unless" terms veto the rule. Terms are "field:text" substring
+tests on the lowercased text, with three fields:
+
+    product   "<brand> <name>"
+    name      the product name
+    brand     the brand
+
+Every term of a rulebook is compiled into one Aho-Corasick automaton, so a
+product is matched with a single scan of its text: the hit set selects the
+candidate rules, which are checked in priority order. KnowledgeMatcher.
+match_all() and match_table() run a whole list or table in one pass.
+
+Usage:
+    python product_knowledge.py --rulebook dynamic "Walkers" "Prawn Cocktail Crisps"
+    python product_knowledge.py [db_path] --rulebook dynamic --table products
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCRIPT_DIR = Path(__file__).parent
+KNOWLEDGE_JSON = SCRIPT_DIR / "product_knowledge.json"
+DEFAULT_DB_PATH = "/Users/aaronkeen/Documents/Food database/Tesco/uk_foods.db"
+
+FIELDS = ('product', 'name', 'brand')
+SEPARATOR = '\x00'   # between field texts in the scanned string; never part of a term
+
+
+class Rule:
+    __slots__ = ('id', 'priority', 'section', 'data', 'when', 'unless')
+
+    def __init__(self, record: Dict):
+        self.id = record['id']
+        self.priority = record.get('priority', 0)
+        self.section = record.get('section')
+        self.data = record['data']
+        self.when: List[frozenset] = []
+        self.unless: frozenset = frozenset()
+
+    def __repr__(self):
+        return f"Rule({self.id!r})"
+
+
+def field_texts(name: Optional[str], brand: Optional[str]) -> Tuple[str, str, str]:
+    """(product, name, brand) texts in the form the rules test"""
+    name = name or ''
+    brand = brand or ''
+    return f"{brand} {name}".lower().strip(), name.lower().strip(), brand.lower()
+
+
+def parse_term(term: str) -> Tuple[int, str]:
+    field, _, text = term.partition(':')
+    if field not in FIELDS or not text:
+        raise ValueError(f"Bad knowledge term {term!r} (expected one of {', '.join(FIELDS)} followed by :text)")
+    return FIELDS.index(field), text
+
+
+class KnowledgeMatcher:
+    """One rulebook compiled into an automaton over (field, text) terms"""
+
+    def __init__(self, records: Iterable[Dict]):
+        indexed = sorted(enumerate(records), key=lambda item: (item[1].get('priority', 0), item[0]))
+        self.rules: List[Rule] = []
+
+        texts: Dict[str, int] = {}                 # term text -> text id
+        self.term_ids: Dict[Tuple[int, int], int] = {}   # (field, text id) -> term id
+
+        def term_id(term: str) -> int:
+            field, text = parse_term(term)
+            text_id = texts.setdefault(text, len(texts))
+            return self.term_ids.setdefault((field, text_id), len(self.term_ids))
+
+        # rules_by_term[term id] = rules whose first clause contains the term
+        self.rules_by_term: Dict[int, List[int]] = {}
+        self.unconditional: List[int] = []
+        for _, record in indexed:
+            rule = Rule(record)
+            rule.when = [frozenset(term_id(t) for t in clause) for clause in record.get('when') or []]
+            rule.unless = frozenset(term_id(t) for t in record.get('unless') or [])
+            index = len(self.rules)
+            self.rules.append(rule)
+            if rule.when:
+                for term in rule.when[0]:
+                    self.rules_by_term.setdefault(term, []).append(index)
+            else:
+                self.unconditional.append(index)
+
+        # goto[node] = {char: node}; fail[node]; out[node] = [text ids ending here]
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for text, text_id in texts.items():
+            self._add_pattern(text, text_id)
+        self._build_failure_links()
+
+        # field_out[field][node] = term ids recognised at node when scanning that field
+        self.field_out: List[List[Tuple[int, ...]]] = [
+            [tuple(self.term_ids[(field, t)] for t in texts_here if (field, t) in self.term_ids)
+             for texts_here in self.out]
+            for field in range(len(FIELDS))
+        ]
+
+    @classmethod
+    def load(cls, rulebook: str, path: Path = KNOWLEDGE_JSON) -> 'KnowledgeMatcher':
+        with open(path, 'r', encoding='utf-8') as f:
+            rulebooks = json.load(f)['rulebooks']
+        if rulebook not in rulebooks:
+            raise KeyError(f"No rulebook {rulebook!r} in {path} (have: {', '.join(rulebooks)})")
+        return cls(rulebooks[rulebook])
+
+    def _add_pattern(self, pattern: str, text_id: int):
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = next_node
+        self.out[node].append(text_id)
+
+    def _build_failure_links(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def hits(self, name: Optional[str], brand: Optional[str]) -> set:
+        """Term ids present in a product, from one scan over all three fields"""
+        goto, fail, field_out = self.goto, self.fail, self.field_out
+        found = set()
+        field = 0
+        out = field_out[0]
+        node = 0
+        for char in SEPARATOR.join(field_texts(name, brand)):
+            if char == SEPARATOR:
+                field += 1
+                out = field_out[field]
+                node = 0
+                continue
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def matches(self, name: Optional[str], brand: Optional[str]) -> List[Rule]:
+        """Every rule that holds for a product, best first"""
+        found = self.hits(name, brand)
+        candidates = set(self.unconditional)
+        for term in found:
+            candidates.update(self.rules_by_term.get(term, ()))
+        return [self.rules[i] for i in sorted(candidates) if self._holds(self.rules[i], found)]
+
+    def match(self, name: Optional[str], brand: Optional[str]) -> Optional[Rule]:
+        """Highest-priority rule that holds for a product, or None"""
+        found = self.hits(name, brand)
+        candidates = set(self.unconditional)
+        for term in found:
+            candidates.update(self.rules_by_term.get(term, ()))
+        for i in sorted(candidates):
+            if self._holds(self.rules[i], found):
+                return self.rules[i]
+        return None
+
+    @staticmethod
+    def _holds(rule: Rule, found: set) -> bool:
+        return rule.unless.isdisjoint(found) and all(not clause.isdisjoint(found) for clause in rule.when)
+
+    def match_all(self, products: Iterable[Tuple[Optional[str], Optional[str]]]) -> Iterator[Optional[Rule]]:
+        """match() over (name, brand) pairs; repeated pairs are matched once"""
+        cache: Dict[Tuple[Optional[str], Optional[str]], Optional[Rule]] = {}
+        for product in products:
+            if product not in cache:
+                cache[product] = self.match(*product)
+            yield cache[product]
+
+    def match_table(self, conn: sqlite3.Connection, table: str = 'products', where: Optional[str] = None,
+                    columns: str = 'id, name, brand') -> Iterator[Tuple[tuple, Rule]]:
+        """
+        (row, rule) for every matching row of a table, from one read. The
+        second and third selected columns must be name and brand.
+        """
+        sql = f"SELECT {columns} FROM {table}" + (f" WHERE {where}" if where else "")
+        rows = conn.execute(sql).fetchall()
+        for row, rule in zip(rows, self.match_all((row[1], row[2]) for row in rows)):
+            if rule is not None:
+                yield row, rule
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match products against a knowledge rulebook")
+    parser.add_argument("args", nargs="*", help="BRAND NAME to match one product, or a database path")
+    parser.add_argument("--rulebook", default="dynamic", help="dynamic, comprehensive or gpt_knowledge")
+    parser.add_argument("--knowledge", default=str(KNOWLEDGE_JSON))
+    parser.add_argument("--table", default="products")
+    args = parser.parse_args()
+
+    try:
+        matcher = KnowledgeMatcher.load(args.rulebook, Path(args.knowledge))
+    except (KeyError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if len(args.args) == 2:
+        brand, name = args.args
+        for rule in matcher.matches(name, brand):
+            print(f"   {rule.priority:5}  {rule.id}")
+        return
+
+    print("📚 PRODUCT KNOWLEDGE MATCH")
+    print("=" * 80)
+
+    db_path = args.args[0] if args.args else DEFAULT_DB_PATH
+    if not Path(db_path).exists():
+        print(f"❌ Database not found: {db_path}")
+        sys.exit(1)
+
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    counts = Counter(rule.id for _, rule in matcher.match_table(conn, args.table))
+    total = conn.execute(f"SELECT COUNT(*) FROM {args.table}").fetchone()[0]
+    conn.close()
+
+    print(f"✅ {sum(counts.values())} of {total} products matched {len(matcher.rules)} "
+          f"'{args.rulebook}' rules in {time.time() - start:.2f}s\n")
+    for rule_id, count in counts.most_common():
+        print(f"   {count:7}  {rule_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,19 +14,26 @@ SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 SOURCE_DB = Path("/Users/aaronkeen/Desktop/foods_full.db")
 TARGET_DB = PROJECT_ROOT / "NutraSafe Beta/Database/nutrasafe_foods.db"
+BATCH_SIZE = 5000
 
 def import_foods():
-    """Import foods from source database to NutraSafe database."""
+    """Import foods from source database to NutraSafe database.
+
+    Source rows are staged into a temp table with executemany, then copied
+    with one INSERT ... SELECT that skips names already present as generic
+    (brand IS NULL) foods, instead of a lookup and insert per row. Rows
+    without a name are not imported; they are counted and reported.
+
+    Returns (imported, skipped as duplicates, skipped without a name)
+    """
 
     # Connect to both databases
     source_conn = sqlite3.connect(SOURCE_DB)
     target_conn = sqlite3.connect(TARGET_DB)
-
-    source_cursor = source_conn.cursor()
-    target_cursor = target_conn.cursor()
+    target_conn.execute("PRAGMA journal_mode=WAL")
 
     # Get all foods from source database
-    source_cursor.execute("""
+    source_cursor = source_conn.execute("""
         SELECT
             name,
             category,
@@ -44,80 +51,70 @@ def import_foods():
         ORDER BY name
     """)
 
-    foods = source_cursor.fetchall()
-    total = len(foods)
-
-    print(f"📊 Found {total} foods to import\n")
-
-    imported_count = 0
-    skipped_count = 0
-
-    for idx, food_data in enumerate(foods, 1):
-        (name, category, serving_desc, serving_size,
-         calories, protein, carbs, fat, fiber, sugar, sodium, ingredients) = food_data
-
-        print(f"[{idx}/{total}] Processing: {name}")
-
-        # Check if food already exists (avoid duplicates)
-        target_cursor.execute(
-            "SELECT id FROM foods WHERE name = ? AND brand IS NULL",
-            (name,)
-        )
-
-        if target_cursor.fetchone():
-            print(f"   ⏭️  Already exists")
-            skipped_count += 1
-            continue
-
-        # Generate unique ID
-        food_id = f"generic-{uuid.uuid4()}"
-
-        # Get current timestamp
-        now = int(time.time())
-
-        try:
-            # Insert into NutraSafe database
+    # Get current timestamp
+    now = int(time.time())
+
+    with target_conn:
+        target_conn.execute("""
+            CREATE TEMP TABLE import_stage (
+                id TEXT, name TEXT, calories REAL, protein REAL, carbs REAL, fat REAL,
+                fiber REAL, sugar REAL, sodium REAL, serving_description TEXT,
+                serving_size_g REAL, ingredients TEXT
+            )
+        """)
+
+        total = 0
+        while True:
+            rows = source_cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
             # Note: NutraSafe uses 'fiber' not 'fibre', and sodium is in mg (already correct)
-            target_cursor.execute("""
-                INSERT INTO foods (
-                    id, name, brand, barcode,
-                    calories, protein, carbs, fat, fiber, sugar, sodium,
-                    serving_description, serving_size_g,
-                    ingredients,
-                    created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                food_id,
-                name,
-                None,  # brand - generic foods have no brand
-                None,  # barcode
-                calories,
-                protein,
-                carbs,
-                fat,
-                fiber,
-                sugar,
-                sodium,  # Already in mg
-                serving_desc,
-                serving_size,
+            target_conn.executemany(
+                "INSERT INTO import_stage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(f"generic-{uuid.uuid4()}", name, calories, protein, carbs, fat, fiber, sugar, sodium,
+                  serving_desc, serving_size, ingredients)
+                 for (name, category, serving_desc, serving_size,
+                      calories, protein, carbs, fat, fiber, sugar, sodium, ingredients) in rows]
+            )
+            total += len(rows)
+
+        print(f"📊 Found {total} foods to import\n")
+        target_conn.execute("CREATE INDEX temp.idx_import_stage_name ON import_stage (name)")
+        # One scan of foods for existing generic names, rather than a lookup per row
+        target_conn.execute("""
+            CREATE TEMP TABLE existing_names AS
+            SELECT DISTINCT name FROM foods WHERE brand IS NULL AND name IS NOT NULL
+        """)
+        target_conn.execute("CREATE INDEX temp.idx_existing_names ON existing_names (name)")
+
+        # Check if food already exists (avoid duplicates, including repeats within the source)
+        cursor = target_conn.execute("""
+            INSERT INTO foods (
+                id, name, brand, barcode,
+                calories, protein, carbs, fat, fiber, sugar, sodium,
+                serving_description, serving_size_g,
                 ingredients,
-                now,  # created_at
-                now   # updated_at
-            ))
-
-            print(f"   ✅ Imported (Sugar: {sugar:.1f}g, Sodium: {sodium:.0f}mg)")
-            imported_count += 1
-
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-            continue
+                created_at, updated_at
+            )
+            SELECT id, name, NULL, NULL,
+                   calories, protein, carbs, fat, fiber, sugar, sodium,
+                   serving_description, serving_size_g,
+                   ingredients,
+                   ?, ?
+            FROM import_stage s
+            WHERE TRIM(s.name) != ''
+              AND s.rowid = (SELECT MIN(rowid) FROM import_stage WHERE name = s.name)
+              AND s.name NOT IN (SELECT name FROM existing_names)
+        """, (now, now))
+        imported_count = cursor.rowcount
+        unnamed_count = target_conn.execute(
+            "SELECT COUNT(*) FROM import_stage WHERE name IS NULL OR TRIM(name) = ''"
+        ).fetchone()[0]
 
-    # Commit and close
-    target_conn.commit()
     source_conn.close()
     target_conn.close()
 
-    return imported_count, skipped_count
+    return imported_count, total - imported_count - unnamed_count, unnamed_count
 
 def main():
     print("🍎 NutraSafe Foods Import (foods_full.db)")
@@ -137,13 +134,15 @@ def main():
     print(f"💾 Target: {TARGET_DB}\n")
 
     # Import foods
-    imported, skipped = import_foods()
+    imported, skipped, unnamed = import_foods()
 
     print("\n" + "=" * 50)
     print(f"✅ Import complete!")
     print(f"   Imported: {imported}")
     print(f"   Skipped:  {skipped}")
-    print(f"   Total:    {imported + skipped}")
+    if unnamed:
+        print(f"   ⚠️  No name (not imported): {unnamed}")
+    print(f"   Total:    {imported + skipped + unnamed}")
 
 if __name__ == "__main__":
     main()
@@ -6,12 +6,7 @@ This replaces generic template content with real, researched information.
 
 import json
 
-# Load the database
-with open('NutraSafe Beta/ingredients_comprehensive.json', 'r') as f:
-    db = json.load(f)
-
-print(f"Loaded {len(db['ingredients'])} additives")
-print("Writing comprehensive descriptions...\n")
+DB_PATH = 'NutraSafe Beta/ingredients_comprehensive.json'
 
 # Dictionary to store all comprehensive data
 # Format: "Name": {whatItIs, whereItComesFrom, whyItsUsed, whatYouNeedToKnow, fullDescription}
@@ -154,9 +149,8 @@ comprehensive_data["Xanthan gum"] = {
 }
 
 # Continue with more additives...
-print(f"Prepared {len(comprehensive_data)} comprehensive entries so far")
-print("Applying updates to database...")
 
+# ============================================================================
 # BATCH 2: COMMON SWEETENERS & COLORS
 # ============================================================================
 
@@ -308,26 +302,40 @@ comprehensive_data["Erythrosine"] = {
 }
 
 
-# Apply the updates
-updated_count = 0
-for ingredient in db['ingredients']:
-    name = ingredient['name']
-    if name in comprehensive_data:
-        data = comprehensive_data[name]
-        ingredient['whatItIs'] = data['whatItIs']
-        ingredient['whereItComesFrom'] = data['whereItComesFrom']
-        ingredient['whyItsUsed'] = data['whyItsUsed']
-        ingredient['whatYouNeedToKnow'] = data['whatYouNeedToKnow']
-        ingredient['fullDescription'] = data['fullDescription']
-        updated_count += 1
-        print(f"  ✓ {name}")
-
-# Save the updated database
-with open('NutraSafe Beta/ingredients_comprehensive.json', 'w', encoding='utf-8') as f:
-    json.dump(db, f, indent=2, ensure_ascii=False)
-
-print(f"\n✅ Updated {updated_count} additives with comprehensive descriptions")
-print(f"📊 Remaining to update: {414 - updated_count}")
-print("\nDatabase saved to: NutraSafe Beta/ingredients_comprehensive.json")
+def apply_comprehensive_data(ingredients):
+    """Apply comprehensive_data to matching ingredients in place; returns count updated"""
+    updated_count = 0
+    for ingredient in ingredients:
+        name = ingredient['name']
+        if name in comprehensive_data:
+            data = comprehensive_data[name]
+            ingredient['whatItIs'] = data['whatItIs']
+            ingredient['whereItComesFrom'] = data['whereItComesFrom']
+            ingredient['whyItsUsed'] = data['whyItsUsed']
+            ingredient['whatYouNeedToKnow'] = data['whatYouNeedToKnow']
+            ingredient['fullDescription'] = data['fullDescription']
+            updated_count += 1
+            print(f"  ✓ {name}")
+    return updated_count
 
-# ============================================================================
+
+def main():
+    with open(DB_PATH, 'r') as f:
+        db = json.load(f)
+
+    print(f"Loaded {len(db['ingredients'])} additives")
+    print("Writing comprehensive descriptions...\n")
+
+    updated_count = apply_comprehensive_data(db['ingredients'])
+
+    # Save the updated database
+    with open(DB_PATH, 'w', encoding='utf-8') as f:
+        json.dump(db, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ Updated {updated_count} additives with comprehensive descriptions")
+    print(f"📊 Remaining to update: {414 - updated_count}")
+    print(f"\nDatabase saved to: {DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()